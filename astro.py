@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytz
+
+from profiling import stage
+
+# --- 天文引擎 (共用) ---
+# 請確保目錄下有 'de421.bsp' 文件 (可用環境變數 BCCAL_EPHEMERIS 指定其他星曆，如 de440s.bsp)
+# skyfield 與星曆都在第一次需要天文計算時才載入，匯入本模組不需 skyfield。
+EPHEMERIS_FILE = os.environ.get("BCCAL_EPHEMERIS", "de421.bsp")
+# 太陽黃經來源：auto = 有星曆檔時用 skyfield，否則改用 solar_cheb 的 Chebyshev 模型 (只需 NumPy)
+#               (此時農曆改用 solar_cheb 資料檔內附的朔望月表，整個日曆都不需 skyfield)
+#               skyfield / cheb = 強制指定
+SOLAR_BACKEND = os.environ.get("BCCAL_SOLAR_BACKEND", "auto")
+
+_ENGINE = {}
+
+def get_engine():
+    """載入 timescale 與星曆，只在第一次使用時載入一次；星曆檔不存在時拋出 FileNotFoundError"""
+    if not _ENGINE:
+        if not os.path.exists(EPHEMERIS_FILE):
+            raise FileNotFoundError(f"找不到星曆檔 {EPHEMERIS_FILE}，請確保該文件在同一目錄下 (或以 BCCAL_EPHEMERIS 指定路徑)")
+        from skyfield import api
+        from skyfield.framelib import ecliptic_frame
+        ts = api.load.timescale()
+        eph = api.load(EPHEMERIS_FILE)
+        _ENGINE.update(ts=ts, eph=eph, sun=eph['sun'], earth=eph['earth'], moon=eph['moon'], ecliptic_frame=ecliptic_frame)
+    return _ENGINE
+
+def solar_backend():
+    """目前太陽黃經的計算來源：'skyfield' 或 'cheb'"""
+    if SOLAR_BACKEND == "auto":
+        return "skyfield" if os.path.exists(EPHEMERIS_FILE) else "cheb"
+    if SOLAR_BACKEND not in ("skyfield", "cheb"):
+        raise ValueError(f"BCCAL_SOLAR_BACKEND 須為 auto / skyfield / cheb，目前為 {SOLAR_BACKEND!r}")
+    return SOLAR_BACKEND
+
+def to_time_array(utc_instants):
+    """將一組 UTC 時刻轉為單一 skyfield Time 陣列
+
+    接受 aware datetime 列表，或 numpy datetime64 陣列 (視為 UTC)。
+    """
+    ts = get_engine()["ts"]
+    arr = np.asarray(utc_instants)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        # 拆成日數與日內秒數，讓 skyfield 按各自日期套用閏秒
+        days = arr.astype("datetime64[D]")
+        secs = (arr - days) / np.timedelta64(1, "s")
+        return ts.utc(1970, 1, 1 + days.astype(np.int64), 0, 0, secs)
+    return ts.from_datetimes([dt.astimezone(pytz.utc) for dt in utc_instants])
+
+def solar_longitudes(utc_instants):
+    """批次計算太陽 J2000 黃經 (度，與 get_solar_lon 同定義，非視黃經)，整段時間只做一次 skyfield 呼叫"""
+    if len(utc_instants) == 0:
+        return np.empty(0)
+    with stage("ephemeris"):
+        if solar_backend() == "cheb":
+            from solar_cheb import get_solar_cheb
+            return get_solar_cheb().longitudes(utc_instants, "j2000")
+        e = get_engine()
+        t = to_time_array(utc_instants)
+        _, lon, _ = e["earth"].at(t).observe(e["sun"]).ecliptic_latlon()
+    return np.atleast_1d(lon.degrees)
+
+def apparent_longitudes(utc_instants, body="sun"):
+    """批次計算天體的視黃經 (度)，以真黃道與真春分點 (of date) 為準
+
+    農曆 (定朔、中氣) 依此定義；solar_longitudes 則沿用 get_solar_lon 的 J2000 黃道。
+    """
+    if len(utc_instants) == 0:
+        return np.empty(0)
+    with stage("ephemeris"):
+        if body == "sun" and solar_backend() == "cheb":
+            from solar_cheb import get_solar_cheb
+            return get_solar_cheb().longitudes(utc_instants, "apparent")
+        e = get_engine()
+        t = to_time_array(utc_instants)
+        _, lon, _ = e["earth"].at(t).observe(e[body]).apparent().frame_latlon(e["ecliptic_frame"])
+    return np.atleast_1d(lon.degrees)
+
+def apparent_solar_longitudes(utc_instants):
+    return apparent_longitudes(utc_instants, "sun")
+
+def lunar_elongations(utc_instants):
+    """月日視黃經差 (度，0 = 朔)"""
+    return (apparent_longitudes(utc_instants, "moon") - apparent_longitudes(utc_instants, "sun")) % 360
@@ -0,0 +1,14 @@
+import os
+import sys
+import time
+
+# 讓 benchmarks/ 內的腳本可以直接 import 專案根目錄的模組 (含 parallel.load_script)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def timed(fn, *args, **kwargs):
+    """回傳 (結果, 耗時秒數)"""
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
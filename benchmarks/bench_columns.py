@@ -0,0 +1,49 @@
+"""欄位投影：run_final_calendar 全部欄位 vs 只要部分欄位 (略過農曆、時區換算、交節表等階段)
+
+暖身後的執行時間在同一行程中量測；「首次執行」在全新子行程中量測 (含匯入與載入交節表、朔望月表)。
+"""
+import argparse
+import subprocess
+import sys
+
+from _util import ROOT, timed
+from parallel import load_script
+
+CASES = [
+    ("全部欄位", None),
+    ("日柱、時柱", ["日期", "時段", "日柱", "時柱"]),
+    ("四柱", ["日期", "時段", "年柱", "月柱", "日柱", "時柱"]),
+    ("四柱 + 農曆", ["日期", "農曆", "時段", "年柱", "月柱", "日柱", "時柱"]),
+    ("飛星", ["日期", "時段", "年星", "月星", "日星", "時星"]),
+]
+
+COLD = (f"import sys, time; sys.path.insert(0, {ROOT!r}); t0 = time.perf_counter()\n"
+        "from parallel import load_script\n"
+        "load_script('main3.1').run_final_calendar('1976-01-01', {days}, 'Asia/Hong_Kong', columns={columns!r})\n"
+        "print((time.perf_counter() - t0) * 1000, 'skyfield' in sys.modules)")
+
+def cold_run(days, columns):
+    """全新子行程：回傳 (耗時 ms, 是否載入 skyfield)"""
+    out = subprocess.run([sys.executable, "-c", COLD.format(days=days, columns=columns)],
+                         capture_output=True, text=True, check=True, cwd=ROOT).stdout.split()
+    return float(out[-2]), out[-1] == "True"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    m = load_script("main3.1")
+    days = 365 * args.years
+    m.run_final_calendar("1976-01-01", 1, "Asia/Hong_Kong")  # 暖身：載入交節表、朔望月表
+    print(f"{args.years} 年 ({days} 日 x 13 時段)")
+    print(f"{'欄位':<14} {'欄數':>4} {'秒':>8} {'加速':>7} {'首次執行 ms':>12} {'skyfield':>9}")
+    base = None
+    for label, columns in CASES:
+        sec = min(timed(m.run_final_calendar, "1976-01-01", days, "Asia/Hong_Kong", columns=columns)[1]
+                  for _ in range(args.repeat))
+        base = base or sec
+        cold_ms, sky = min(cold_run(days, columns) for _ in range(args.repeat))
+        n_cols = len(columns or m.COLUMNS)
+        print(f"{label:<14} {n_cols:>4} {sec:>8.3f} {base / sec:>6.1f}x {cold_ms:>12.0f} {('是' if sky else '否'):>9}")
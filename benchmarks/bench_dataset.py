@@ -0,0 +1,35 @@
+"""比較讀取單一年份 時柱 的時間：解析整份 XLSX vs 讀取 Parquet 分區的單一欄位"""
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from _util import ROOT, timed
+from parallel import load_script
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from export import iter_year_chunks, read_partition, write_dataset, write_xlsx_stream
+    m = load_script("main3.1")
+    year = 1976 + args.years // 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx, root = os.path.join(tmp, "calendar.xlsx"), os.path.join(tmp, "dataset")
+        chunks = list(iter_year_chunks(m.run_final_calendar, "1976-01-01", 365 * args.years, tz_name=args.tz))
+        write_xlsx_stream(xlsx, chunks)
+        write_dataset(root, chunks, args.tz)
+
+        size_xlsx = os.path.getsize(xlsx) / 1e6
+        size_ds = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs) / 1e6
+        _, t_xlsx = timed(pd.read_excel, xlsx, sheet_name=None)
+        _, t_part = timed(read_partition, root, args.tz, year, columns=["時柱"])
+
+    print(f"{args.years} 年，讀取 {year} 年的 時柱")
+    print(f"XLSX (整份解析)   {size_xlsx:>7.2f} MB {t_xlsx * 1000:>10.1f} ms")
+    print(f"Parquet (單欄分區) {size_ds:>7.2f} MB {t_part * 1000:>10.1f} ms")
@@ -0,0 +1,50 @@
+"""比較每日基礎數據的計算次數：舊寫法 (prev / curr / next 各算一次) vs 滾動窗口"""
+import argparse
+import os
+from datetime import datetime, timedelta
+
+import pytz
+
+from _util import ROOT, load_script, timed
+
+def count_calls(module, attr):
+    """包裝模組函數並計數，回傳計數用的 dict"""
+    counter = {"calls": 0}
+    original = getattr(module, attr)
+    def wrapper(*args, **kwargs):
+        counter["calls"] += 1
+        return original(*args, **kwargs)
+    setattr(module, attr, wrapper)
+    return counter
+
+def legacy_loop(m, start_d, days, tz):
+    """舊寫法：每日分別計算當日、翌日、前一日"""
+    for i in range(days):
+        curr_date = start_d + timedelta(days=i)
+        m.get_day_basic_data(curr_date, tz)
+        m.get_day_basic_data(curr_date + timedelta(days=1), tz)
+        m.get_day_basic_data(curr_date - timedelta(days=1), tz)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    m = load_script("main3")
+    start_d = datetime.strptime(args.start, "%Y-%m-%d").date()
+    tz = pytz.timezone(args.tz)
+
+    counter = count_calls(m, "get_day_basic_data")
+    _, t_legacy = timed(legacy_loop, m, start_d, args.days, tz)
+    legacy_calls = counter["calls"]
+
+    counter["calls"] = 0
+    _, t_window = timed(m.run_final_calendar, args.start, args.days, args.tz)
+    window_calls = counter["calls"]
+
+    print(f"天數: {args.days}")
+    print(f"舊寫法   get_day_basic_data 呼叫: {legacy_calls:>8} ({legacy_calls / args.days:.3f} 次/日, 僅基礎數據 {t_legacy:.2f}s)")
+    print(f"滾動窗口 get_day_basic_data 呼叫: {window_calls:>8} ({window_calls / args.days:.3f} 次/日, 完整生成 {t_window:.2f}s)")
@@ -0,0 +1,44 @@
+"""比較 XLSX 匯出的時間與峰值記憶體：整表 DataFrame + to_excel vs 逐年串流寫入"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from _util import ROOT, timed
+from parallel import load_script
+
+def run_mode(mode, years, tz, path):
+    m = load_script("main3.1")
+    from export import iter_year_chunks, write_xlsx_stream
+    if mode == "pandas":
+        df = m.run_final_calendar("1976-01-01", 365 * years, tz_name=tz)
+        df.to_excel(path, index=False)
+    else:
+        write_xlsx_stream(path, iter_year_chunks(m.run_final_calendar, "1976-01-01", 365 * years, tz_name=tz))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    parser.add_argument("--mode", choices=["pandas", "stream"], help="(內部使用) 在子行程中執行單一模式")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if args.mode:
+        _, sec = timed(run_mode, args.mode, args.years[0], args.tz, args.out)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{sec:.2f} {peak_mb:.0f}")
+        sys.exit()
+
+    # 每個模式在獨立子行程中執行，峰值 RSS 才不會互相影響
+    print(f"{'年數':>4} {'模式':>8} {'秒':>8} {'峰值 RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in args.years:
+            for mode in ("pandas", "stream"):
+                out = os.path.join(tmp, f"{mode}_{years}.xlsx")
+                res = subprocess.run([sys.executable, __file__, "--mode", mode, "--years", str(years), "--tz", args.tz, "--out", out],
+                                     capture_output=True, text=True, check=True, cwd=ROOT)
+                sec, peak = res.stdout.split()[-2:]
+                print(f"{years:>4} {mode:>8} {float(sec):>8.2f} {float(peak):>14.0f}")
@@ -0,0 +1,47 @@
+"""時間網格：iter_grid 的列/秒與峰值 RSS (每個案例在全新子行程中執行)
+
+峰值 RSS 應只隨 chunk_rows 變化，與總列數無關。
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from _util import ROOT
+
+CHILD = (f"import sys, time, resource, json; sys.path.insert(0, {ROOT!r})\n"
+         "from grid import iter_grid, write_grid_parquet\n"
+         "from solar_terms import get_term_table\n"
+         "get_term_table()\n"
+         "rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+         "chunks = iter_grid({start!r}, {end!r}, {step!r}, 'Asia/Hong_Kong', {chunk_rows})\n"
+         "t0 = time.perf_counter()\n"
+         "rows = write_grid_parquet({out!r}, chunks) if {out!r} else sum(len(c['utc']) for c in chunks)\n"
+         "sec = time.perf_counter() - t0\n"
+         "print(json.dumps({{'rows': rows, 'seconds': sec, 'base_mb': rss0,"
+         " 'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))")
+
+def run_case(start, end, step, chunk_rows, out=None):
+    code = CHILD.format(start=start, end=end, step=step, chunk_rows=chunk_rows, out=out)
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(res.stdout.splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parquet", help="另外量測寫入此 Parquet 檔 (需要 pyarrow)")
+    args = parser.parse_args()
+
+    cases = [
+        ("1976-01-01", "2026-01-01", "15min", 1_000_000),
+        ("1976-01-01", "1986-01-01", "1min", 1_000_000),
+        ("1976-01-01", "1996-01-01", "1min", 1_000_000),
+        ("1976-01-01", "1996-01-01", "1min", 250_000),
+    ]
+    print(f"{'範圍':<22} {'間隔':>6} {'每塊列數':>10} {'總列數':>12} {'秒':>7} {'列/秒':>12} {'基礎 MB':>8} {'峰值 MB':>8}")
+    for start, end, step, chunk_rows in cases:
+        r = run_case(start, end, step, chunk_rows)
+        print(f"{start[:4]}-{end[:4]:<17} {step:>6} {chunk_rows:>10,} {r['rows']:>12,} {r['seconds']:>7.2f} "
+              f"{r['rows'] / r['seconds']:>12,.0f} {r['base_mb']:>8.0f} {r['peak_mb']:>8.0f}")
+    if args.parquet:
+        r = run_case("1976-01-01", "1996-01-01", "1min", 1_000_000, args.parquet)
+        print(f"寫入 Parquet: {r['rows']:,} 列 {r['seconds']:.2f} 秒，峰值 {r['peak_mb']:.0f} MB -> {args.parquet}")
@@ -0,0 +1,50 @@
+"""平行分年生成 vs 單行程：計時，並驗證合併結果與 XLSX 內容逐位元組相同"""
+import argparse
+import hashlib
+import os
+import tempfile
+import zipfile
+
+from _util import ROOT, timed
+from parallel import load_script
+
+def csv_digest(df):
+    return hashlib.sha1(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+def sheet_digest(path):
+    """XLSX 內除 docProps (建立時間) 以外所有成員的雜湊"""
+    h = hashlib.sha1()
+    with zipfile.ZipFile(path) as z:
+        for name in sorted(z.namelist()):
+            if not name.startswith("docProps/"):
+                h.update(name.encode() + z.read(name))
+    return h.hexdigest()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", default="1976-01-01")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--tz", nargs="+", default=["Europe/London", "Asia/Hong_Kong"])
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from export import iter_year_chunks, write_xlsx_stream
+    from parallel import iter_parallel_chunks, run_parallel
+    m = load_script("main3.1")
+    days = 365 * args.years
+
+    serial, t_serial = timed(m.run_final_calendar, args.start, days, args.tz)
+    merged, t_par = timed(run_parallel, "main3.1", "run_final_calendar", args.start, days, tz_name=args.tz, workers=args.workers)
+    print(f"{args.years} 年 x {len(args.tz)} 時區，{args.workers} 個工作行程")
+    print(f"單行程 {t_serial:.2f}s，平行 {t_par:.2f}s (含行程啟動與載入)")
+    for tz in args.tz:
+        same = serial[tz].equals(merged[tz]) and csv_digest(serial[tz]) == csv_digest(merged[tz])
+        print(f"  {tz:<16} DataFrame/CSV 相同: {same}")
+
+    tz = args.tz[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b = os.path.join(tmp, "serial.xlsx"), os.path.join(tmp, "parallel.xlsx")
+        write_xlsx_stream(a, iter_year_chunks(m.run_final_calendar, args.start, days, tz_name=tz))
+        write_xlsx_stream(b, iter_parallel_chunks("main3.1", "run_final_calendar", args.start, days, tz_name=tz, workers=args.workers))
+        print(f"  {tz:<16} XLSX 工作表內容相同: {sheet_digest(a) == sheet_digest(b)}")
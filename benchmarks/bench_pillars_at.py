@@ -0,0 +1,33 @@
+"""pillars_at 單點查詢延遲 (首次建表時間 + 隨機時刻的 p50 / p99 / 平均)"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from _util import timed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    parser.add_argument("--policy", default="split")
+    parser.add_argument("--aware", action="store_true", help="以 UTC aware datetime 查詢 (含時區換算)")
+    args = parser.parse_args()
+
+    from pillars import get_zone_days, pillars_at
+    _, t_build = timed(get_zone_days, args.tz)
+
+    random.seed(0)
+    base = datetime(1900, 1, 2)
+    instants = [base + timedelta(minutes=random.randrange(0, 150 * 365 * 1440)) for _ in range(args.n)]
+    if args.aware:
+        instants = [pytz.utc.localize(dt) for dt in instants]
+
+    lat = np.empty(args.n)
+    for j, dt in enumerate(instants):
+        _, lat[j] = timed(pillars_at, dt, args.tz, args.policy)
+    us = lat * 1e6
+    print(f"{args.tz} 首次建表: {t_build * 1000:.1f} ms")
+    print(f"{args.n} 次查詢: 平均 {us.mean():.1f} µs, p50 {np.percentile(us, 50):.1f} µs, p99 {np.percentile(us, 99):.1f} µs")
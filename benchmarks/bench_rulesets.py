@@ -0,0 +1,40 @@
+"""規則變體引擎：一次執行 N 個規則集 vs 分別執行對應的舊腳本 / 單一規則集"""
+import argparse
+
+from _util import timed
+from parallel import load_script
+
+# 規則集 -> 對應的舊腳本與產生函式
+SCRIPTS = {"main3.1": ("main3.1", "run_final_calendar"), "main3": ("main3", "run_final_calendar"),
+           "main4": ("main4", "run_metaphysics_calendar")}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    parser.add_argument("--rulesets", nargs="+", default=["main3.1", "main3", "main4"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from rules import run_rulesets
+    days = 365 * args.years
+    run_rulesets("1976-01-01", 1, args.tz, args.rulesets)  # 暖身：載入交節表、朔望月表
+    best = lambda fn, *a, **kw: min(timed(fn, *a, **kw)[1] for _ in range(args.repeat))
+
+    t_scripts = {}
+    for r in args.rulesets:
+        if r in SCRIPTS:
+            script, func = SCRIPTS[r]
+            t_scripts[r] = best(getattr(load_script(script), func), "1976-01-01", days, args.tz)
+    t_single = best(run_rulesets, "1976-01-01", days, args.tz, args.rulesets[:1])
+    t_all = best(run_rulesets, "1976-01-01", days, args.tz, args.rulesets)
+    t_ints = best(run_rulesets, "1976-01-01", days, args.tz, args.rulesets, decode=False)
+
+    n = len(args.rulesets)
+    print(f"{args.years} 年 ({days} 日 x 13 時段), {args.tz}")
+    for r, t in t_scripts.items():
+        print(f"  舊腳本 {SCRIPTS[r][0]:<10} {t:>8.3f} s")
+    print(f"  舊腳本合計         {sum(t_scripts.values()):>8.3f} s")
+    print(f"  單一規則集 ({args.rulesets[0]})  {t_single:>8.3f} s")
+    print(f"  {n} 個規則集 (DataFrame)   {t_all:>8.3f} s  (單一規則集的 ×{t_all / t_single:.2f})")
+    print(f"  {n} 個規則集 (整數陣列)    {t_ints:>8.3f} s  (單一規則集的 ×{t_ints / t_single:.2f})")
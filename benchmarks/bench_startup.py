@@ -0,0 +1,41 @@
+"""啟動時間：各模組的匯入時間與第一次查詢時間 (每項在全新子行程中量測，取最小值)"""
+import argparse
+import subprocess
+import sys
+
+from _util import ROOT
+
+SETUP = f"import sys, time; sys.path.insert(0, {ROOT!r}); t0 = time.perf_counter()\n"
+
+CASES = [
+    ("import ganzhi (純邏輯)", "import ganzhi", None),
+    ("import pillars", "import pillars", None),
+    ("import main3.1 (腳本)", "from parallel import load_script; load_script('main3.1')", None),
+    ("skyfield + de421 載入 (舊版匯入成本)", "from skyfield import api; api.load.timescale(); api.load('de421.bsp')", None),
+    ("首次 pillars_at (含匯入、快取映射)", "from pillars import pillars_at; from datetime import datetime",
+     "pillars_at(datetime(2025, 3, 5, 23, 10), 'Asia/Hong_Kong')"),
+    ("首次 get_term_table().classify", "from solar_terms import get_term_table; from datetime import datetime; import pytz",
+     "get_term_table().classify([pytz.utc.localize(datetime(2025, 3, 5))])"),
+    ("首次 get_solar_lon (載入星曆)", "from parallel import load_script; m = load_script('main3.1'); from datetime import datetime; import pytz",
+     "m.get_solar_lon(pytz.utc.localize(datetime(2025, 3, 5)))"),
+]
+
+def measure(imports, first_call):
+    """回傳 (匯入 ms, 首次呼叫 ms)"""
+    code = SETUP + imports + "\nt1 = time.perf_counter()\n"
+    code += (first_call + "\n") if first_call else ""
+    code += "t2 = time.perf_counter(); print((t1 - t0) * 1000, (t2 - t1) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    return tuple(float(x) for x in out.split()[-2:])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'項目':<36} {'匯入 ms':>9} {'首次呼叫 ms':>12}")
+    for label, imports, first_call in CASES:
+        runs = [measure(imports, first_call) for _ in range(args.repeat)]
+        t_import = min(r[0] for r in runs)
+        t_first = min(r[1] for r in runs)
+        print(f"{label:<36} {t_import:>9.1f} {(f'{t_first:.1f}' if first_call else '-'):>12}")
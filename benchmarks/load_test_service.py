@@ -0,0 +1,99 @@
+"""HTTP 曆法服務壓力測試：各端點的 p50 / p99 延遲與每秒請求數
+
+預設在本行程內啟動服務；--url 可改為測試已在執行的服務。
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import numpy as np
+
+from _util import ROOT
+
+def random_instant(rng):
+    return (datetime(1950, 1, 1) + timedelta(minutes=rng.randrange(0, 90 * 365 * 1440))).isoformat(timespec="minutes")
+
+def make_request(kind, rng, batch_size):
+    tz = rng.choice(["Asia/Hong_Kong", "Europe/London"])
+    if kind == "single":
+        return "GET", f"/pillars?t={random_instant(rng)}&tz={tz}", None
+    if kind == "range":
+        start = (datetime(1950, 1, 1) + timedelta(days=rng.randrange(0, 90 * 365))).date()
+        return "GET", f"/range?start={start}&days=7&tz={tz}", None
+    body = json.dumps({"tz": tz, "instants": [random_instant(rng) for _ in range(batch_size)]})
+    return "POST", "/batch", body
+
+def worker(host, port, kind, n, batch_size, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port)  # keep-alive
+    for _ in range(n):
+        method, path, body = make_request(kind, rng, batch_size)
+        headers = {"Content-Type": "application/json"} if body else {}
+        t0 = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - t0)
+        if resp.status != 200:
+            errors.append(resp.status)
+    conn.close()
+
+def run_load(host, port, kind, requests, concurrency, batch_size):
+    latencies, errors = [], []
+    per_thread = max(1, requests // concurrency)
+    threads = [threading.Thread(target=worker, args=(host, port, kind, per_thread, batch_size, s, latencies, errors))
+               for s in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": kind, "requests": len(ms), "errors": len(errors), "concurrency": concurrency,
+        "p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)), "rps": len(ms) / elapsed,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="已在執行的服務 (如 http://127.0.0.1:8765)；省略時於本行程內啟動")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--endpoints", nargs="+", default=["single", "range", "batch"], choices=["single", "range", "batch"])
+    parser.add_argument("--json", help="另存結果為 JSON 檔")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        u = urlparse(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        import os
+        os.chdir(ROOT)
+        from service import make_server
+        server = make_server(port=0)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = []
+    print(f"{'端點':<8} {'請求數':>8} {'錯誤':>5} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for kind in args.endpoints:
+        n = args.requests if kind != "batch" else max(args.concurrency, args.requests // 10)
+        r = run_load(host, port, kind, n, args.concurrency, args.batch_size)
+        results.append(r)
+        print(f"{kind:<8} {r['requests']:>8} {r['errors']:>5} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rps']:>9.0f}")
+    if "batch" in args.endpoints:
+        print(f"(batch 每個請求 {args.batch_size} 個時刻)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if server:
+        server.shutdown()
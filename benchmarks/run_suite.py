@@ -0,0 +1,196 @@
+"""完整效能測試：八個產生器 (1 / 10 / 70 年) 的 days/sec 與峰值 RSS，加上各階段的微基準，結果存成 JSON
+
+每個產生器案例在全新子行程中執行 (峰值 RSS 互不影響)；微基準則在另一個子行程中一起執行。
+以 --baseline 指定先前的結果檔，可列出各項與該次 commit 的比值，比值超過 --threshold 視為退步。
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from _util import ROOT, timed
+from parallel import load_script
+
+START = "1976-01-01"
+TZ = "Asia/Hong_Kong"
+# (腳本, 產生函式, 額外參數)
+GENERATORS = [
+    ("main", "run_comparison", (TZ,)),
+    ("main1", "run_pro_calendar", ()),
+    ("main2", "run_pro_calendar", ()),
+    ("main3", "run_final_calendar", (TZ,)),
+    ("main3.1", "run_final_calendar", (TZ,)),
+    ("main.3.2", "run_final_calendar", (TZ,)),
+    ("main4", "run_metaphysics_calendar", (TZ,)),
+    ("main5", "run_metaphysics_calendar", (TZ,)),
+]
+SCRIPTS = [g[0] for g in GENERATORS]
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_generator(script, years, repeat):
+    """(子行程內) 執行單一產生器，回傳結果 dict"""
+    func, args = next((f, a) for s, f, a in GENERATORS if s == script)
+    m = load_script(script)
+    fn = getattr(m, func)
+    rss_import = peak_rss_mb()
+    days = 365 * years
+    fn(START, 1, *args)  # 暖身：載入交節表、朔望月表快取
+    runs, df = [], None
+    for _ in range(repeat):
+        df = None  # 先釋放上一次的結果，峰值 RSS 才不會包含兩份
+        df, sec = timed(fn, START, days, *args)
+        runs.append(sec)
+    sec = min(runs)
+    return {
+        "script": script, "func": func, "years": years, "days": days, "rows": len(df),
+        "seconds": sec, "days_per_sec": days / sec, "rows_per_sec": len(df) / sec,
+        "import_rss_mb": rss_import, "peak_rss_mb": peak_rss_mb(),
+    }
+
+def micro(name, fn, n, unit):
+    """執行 fn() 一次 (內含 n 次操作)，回傳每次操作的耗時"""
+    _, sec = timed(fn)
+    return {"name": name, "n": n, "seconds": sec, "per_op_us": sec / n * 1e6, "ops_per_sec": n / sec, "unit": unit}
+
+def run_micro(n_solar, n_lunar):
+    """(子行程內) 各階段微基準"""
+    import numpy as np
+    import pytz
+    from datetime import date, timedelta
+
+    import ganzhi
+    from solar_terms import get_term_table, local_times_utc
+
+    m = load_script("main3.1")
+    results = []
+
+    base = pytz.utc.localize(datetime(1976, 1, 1, 12))
+    instants = [base + timedelta(hours=7 * i) for i in range(n_solar)]
+    m.get_solar_lon(base)  # 暖身：載入星曆
+    results.append(micro("get_solar_lon", lambda: [m.get_solar_lon(dt) for dt in instants], n_solar, "call"))
+
+    dates = [date(1976, 1, 1) + timedelta(days=i) for i in range(n_lunar)]
+    m.get_lunar_str(dates[0])
+    results.append(micro("get_lunar_str", lambda: [m.get_lunar_str(d) for d in dates], n_lunar, "call"))
+
+    # 時辰展開：每日 13 個時段的時柱、時星、命宮 (整數) + 解碼為字串
+    for years in (1, 70):
+        all_dates = np.arange(np.datetime64(START), np.datetime64(START) + 365 * years + 1)
+        noon_utc, _ = local_times_utc(all_dates, TZ)
+        d = ganzhi.day_arrays(all_dates, get_term_table().classify(noon_utc))
+        day = {k: v[:-1] for k, v in d.items()}
+        nxt = {k: v[1:] for k, v in d.items()}
+
+        def expand():
+            h = ganzhi.hour_arrays(day, nxt)
+            ganzhi.GZ_NAMES[h["h_gz"]].ravel(), ganzhi.STAR_NAMES[h["h_s"]].ravel(), ganzhi.GONG_NAMES[h["ming_gong"]].ravel()
+        results.append(micro(f"hour_expansion_{years}y", expand, 365 * years * 13, "row"))
+
+    df = m.run_final_calendar(START, 365, TZ)
+    with tempfile.TemporaryDirectory() as tmp:
+        results.append(micro("to_csv_1y", lambda: df.to_csv(os.path.join(tmp, "c.csv"), index=False, encoding="utf-8-sig"), len(df), "row"))
+        results.append(micro("to_excel_1y", lambda: df.to_excel(os.path.join(tmp, "c.xlsx"), index=False), len(df), "row"))
+    return results
+
+def child(args_list):
+    res = subprocess.run([sys.executable, os.path.abspath(__file__), *args_list], capture_output=True, text=True, cwd=ROOT)
+    if res.returncode != 0:
+        raise RuntimeError(f"子行程失敗 {args_list}:\n{res.stderr}")
+    return json.loads(res.stdout.splitlines()[-1])
+
+def git_commit():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    import numpy
+    import pandas
+
+    from astro import solar_backend
+    return {
+        "commit": git_commit(), "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(), "numpy": numpy.__version__, "pandas": pandas.__version__,
+        "platform": platform.platform(), "cpus": os.cpu_count(), "solar_backend": solar_backend(),
+    }
+
+def result_keys(report):
+    """結果檔 -> {項目名稱: (數值, 越大越好?)}，供與基準比較"""
+    out = {}
+    for g in report.get("generators", []):
+        out[f"{g['script']} {g['years']}y days/sec"] = (g["days_per_sec"], True)
+        out[f"{g['script']} {g['years']}y peak MB"] = (g["peak_rss_mb"], False)
+    for r in report.get("micro", []):
+        out[f"{r['name']} µs/{r['unit']}"] = (r["per_op_us"], False)
+    return out
+
+def compare(report, baseline, threshold):
+    """列出與基準結果的比值 (>1 表示變慢或用量變大)，回傳退步項目數"""
+    cur, base = result_keys(report), result_keys(baseline)
+    print(f"\n與基準 {baseline['env'].get('commit')} 比較 (比值 > 1 = 較差):")
+    regressions = 0
+    for key, (value, higher_better) in cur.items():
+        if key not in base:
+            continue
+        ratio = base[key][0] / value if higher_better else value / base[key][0]
+        flag = "  ⚠" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"  {key:<36} {base[key][0]:>12.1f} -> {value:>12.1f}  ×{ratio:.2f}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10, 70])
+    parser.add_argument("--scripts", nargs="+", default=SCRIPTS, choices=SCRIPTS)
+    parser.add_argument("--repeat", type=int, default=1, help="每個產生器案例重複次數 (取最小值)")
+    parser.add_argument("--n-solar", type=int, default=500, help="get_solar_lon 微基準的呼叫次數")
+    parser.add_argument("--n-lunar", type=int, default=20000, help="get_lunar_str 微基準的呼叫次數")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--out", help="結果 JSON 路徑 (預設 benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="先前的結果 JSON，列出比值")
+    parser.add_argument("--threshold", type=float, default=1.2, help="比值超過此值視為退步")
+    parser.add_argument("--case", choices=["generator", "micro"], help="(內部使用) 在子行程中執行單一案例")
+    args = parser.parse_args()
+
+    if args.case == "generator":
+        print(json.dumps(run_generator(args.scripts[0], args.years[0], args.repeat)))
+        sys.exit()
+    if args.case == "micro":
+        print(json.dumps(run_micro(args.n_solar, args.n_lunar)))
+        sys.exit()
+
+    report = {"env": environment(), "generators": [], "micro": []}
+    print(f"{'腳本':<10} {'年':>3} {'列數':>9} {'秒':>8} {'days/sec':>10} {'峰值 RSS MB':>12}")
+    for script in args.scripts:
+        for years in args.years:
+            r = child(["--case", "generator", "--scripts", script, "--years", str(years), "--repeat", str(args.repeat)])
+            report["generators"].append(r)
+            print(f"{script:<10} {years:>3} {r['rows']:>9} {r['seconds']:>8.2f} {r['days_per_sec']:>10.0f} {r['peak_rss_mb']:>12.0f}")
+
+    if not args.skip_micro:
+        report["micro"] = child(["--case", "micro", "--n-solar", str(args.n_solar), "--n-lunar", str(args.n_lunar)])
+        print(f"\n{'微基準':<22} {'次數':>9} {'µs/次':>10} {'次/秒':>12}")
+        for r in report["micro"]:
+            print(f"{r['name']:<22} {r['n']:>9} {r['per_op_us']:>10.2f} {r['ops_per_sec']:>12.0f}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['env']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"\n結果已存至 {out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,131 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import ganzhi
+from export import XlsxStreamWriter
+from parallel import load_script
+from profiling import stage
+from solar_terms import SOLAR_TERMS, get_term_table, local_times_utc, slot_bounds_utc
+
+# --- 兩個時區以真實 UTC 時刻對照 ---
+# 同一個當地時段在不同時區是不同的 UTC 區間，按當地日期並排會把不同的時刻放在同一列。
+# 這裡把兩邊的時段表各自換算成 UTC 區間後疊合：兩邊的時段邊界合併排序成一串小區間，
+# 每個小區間以 searchsorted 找出兩邊各自所在的時段，再對整段範圍逐欄向量化比較。
+# 產生器只執行一次 (run_final_calendar 的多時區模式，日柱、時柱等共用欄位只算一次)。
+# 節氣欄比較的是當時所屬的節氣 (每日模式依當地中午、精確交節模式依時段起點分類)，
+# 而非產生器只在交節那天標出的名稱。
+
+ZONES = ("Asia/Hong_Kong", "Europe/London")
+ZONE_LABELS = {"Asia/Hong_Kong": "HK", "Europe/London": "UK"}
+COMPARE_COLUMNS = ["節氣", "年柱", "月柱", "日柱", "時柱", "胎元", "命宮", "年星", "月星", "日星", "時星"]
+TERM_NAMES = np.array(SOLAR_TERMS, dtype=object)
+
+def zone_label(tz_name):
+    """輸出欄名用的短標籤 (HK / UK，其餘取時區名稱最後一段)"""
+    return ZONE_LABELS.get(tz_name, tz_name.rsplit("/", 1)[-1])
+
+def _zone_terms(dates, tz_name, starts, exact_terms):
+    """各時段當時所屬的節氣名稱 (攤平成一維，與產生器的列順序相同)"""
+    table = get_term_table()
+    if exact_terms:
+        return TERM_NAMES[table.classify(starts.ravel())["term_idx"]]
+    noon = table.classify(local_times_utc(dates, tz_name)[0])["term_idx"]
+    return np.repeat(TERM_NAMES[noon], starts.shape[1])
+
+def compare_zones(start_str, days, zones=ZONES, columns=COMPARE_COLUMNS, exact_terms=False):
+    """兩個時區 [start, start+days) 的時段表以 UTC 區間疊合後逐欄比較，回傳 (detail, summary)
+
+    detail：兩邊有任一欄不同的 UTC 區間 (相鄰且兩邊數值都不變的小區間合併為一列)，
+    含 UTC 起訖、時數、兩邊的當地起點、各欄兩邊的值與有差異的欄位。
+    summary：每欄 (及任一欄) 的差異區間數、差異時數與佔整段疊合時間的比例。
+    只比較兩邊當地日期都涵蓋的 UTC 範圍。
+    """
+    tz_a, tz_b = zones
+    if tz_a == tz_b:
+        raise ValueError("兩個時區不可相同")
+    columns = list(columns)
+    gen_cols = [c for c in columns if c != "節氣"]
+    m = load_script("main3.1")
+    frames = m.run_final_calendar(start_str, days, [tz_a, tz_b], columns=gen_cols or ["時段"], exact_terms=exact_terms)
+    dates = np.arange(np.datetime64(start_str, "D"), np.datetime64(start_str, "D") + days)
+    starts, end, values = {}, {}, {}
+    with stage("terms"):
+        for tz in zones:
+            s, e = slot_bounds_utc(dates, tz, ganzhi.SLOT_START_HOURS)
+            starts[tz], end[tz] = s.ravel(), e[-1, -1]
+            values[tz] = {c: frames[tz][c].values for c in gen_cols}
+            if "節氣" in columns:
+                values[tz]["節氣"] = _zone_terms(dates, tz, s, exact_terms)
+
+    with stage("overlay"):
+        # 疊合：兩邊時段起點的聯集切成小區間，每個小區間在兩邊各屬一個時段
+        lo, hi = max(starts[tz_a][0], starts[tz_b][0]), min(end[tz_a], end[tz_b])
+        bounds = np.unique(np.concatenate([starts[tz_a], starts[tz_b], [hi]]))
+        bounds = bounds[(bounds >= lo) & (bounds <= hi)]
+        t0, t1 = bounds[:-1], bounds[1:]
+        # 夏令時間切換可能產生零長度的時段，side="right" 會略過它取同一起點的下一個時段
+        a = {c: v[np.searchsorted(starts[tz_a], t0, "right") - 1] for c, v in values[tz_a].items()}
+        b = {c: v[np.searchsorted(starts[tz_b], t0, "right") - 1] for c, v in values[tz_b].items()}
+
+        # 相鄰小區間兩邊數值都相同時合併 (如晚子時接翌日早子時)
+        new = np.zeros(len(t0), dtype=bool)
+        new[:1] = True
+        for c in columns:
+            new[1:] |= (a[c][1:] != a[c][:-1]) | (b[c][1:] != b[c][:-1])
+        first = np.flatnonzero(new)
+        last = np.r_[first[1:] - 1, len(t0) - 1]
+        hours = (t1[last] - t0[first]) / np.timedelta64(1, "h")
+        diff = {c: a[c][first] != b[c][first] for c in columns}
+        any_diff = np.logical_or.reduce(list(diff.values())) if columns else np.zeros(len(first), dtype=bool)
+
+    total = hours.sum()
+    rows = [{"欄位": "任一欄位", "差異區間數": int(any_diff.sum()), "差異時數": hours[any_diff].sum()}]
+    rows += [{"欄位": c, "差異區間數": int(diff[c].sum()), "差異時數": hours[diff[c]].sum()} for c in columns]
+    summary = pd.DataFrame(rows)
+    summary["時間比例"] = summary["差異時數"] / total if total else 0.0
+
+    with stage("frame"):
+        keep = first[any_diff]
+        utc0, utc1 = t0[keep], t1[last[any_diff]]
+        detail = {"UTC開始": utc0, "UTC結束": utc1, "時數": hours[any_diff]}
+        for tz in zones:
+            local = pd.DatetimeIndex(utc0).tz_localize("UTC").tz_convert(tz).tz_localize(None)
+            detail[f"{zone_label(tz)}_開始"] = local.values
+        for c in columns:
+            detail[f"{zone_label(tz_a)}_{c}"] = a[c][keep]
+            detail[f"{zone_label(tz_b)}_{c}"] = b[c][keep]
+        names = np.full(len(keep), "", dtype=object)
+        for c in columns:
+            names = names + np.where(diff[c][any_diff], c + " ", "")
+        detail["差異欄位"] = pd.Series(names, dtype=object).str.rstrip().values
+        detail = pd.DataFrame(detail)
+    return detail, summary
+
+def write_report(path, detail, summary):
+    """摘要一頁在前，明細依 UTC 年份分頁 (串流寫入)"""
+    with XlsxStreamWriter(path, date_column="UTC開始") as writer:
+        writer.add_sheet("摘要", summary)
+        writer.write(detail)
+    return writer.sheets
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="兩個時區的時段表以真實 UTC 時刻對照，找出柱、星與節氣不同的區間")
+    parser.add_argument("--start", default="1976-01-01")
+    parser.add_argument("--days", type=int, default=365 * 70)
+    parser.add_argument("--zones", nargs=2, default=list(ZONES), metavar=("TZ_A", "TZ_B"))
+    parser.add_argument("--columns", nargs="+", default=COMPARE_COLUMNS, help="比較的欄位 (main3.1 的欄名；節氣 = 當時所屬節氣)")
+    parser.add_argument("--exact-terms", action="store_true", help="以每個時段起點的精確交節分類 (同 run_final_calendar(exact_terms=True))")
+    parser.add_argument("--out", default="HK_UK_Full_Comparison.xlsx")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    detail, summary = compare_zones(args.start, args.days, args.zones, args.columns, args.exact_terms)
+    t_cmp = time.perf_counter() - t0
+    print(f"{' vs '.join(args.zones)}，{args.start} 起 {args.days} 日，比較 {t_cmp:.2f} 秒")
+    print(summary.to_string(index=False, formatters={"差異時數": "{:.1f}".format, "時間比例": "{:.2%}".format}))
+    if args.out:
+        write_report(args.out, detail, summary)
+        print(f"✅ 已寫入 {args.out} (明細 {len(detail)} 列，{time.perf_counter() - t0:.2f} 秒)")
@@ -0,0 +1,37 @@
+from profiling import stage
+
+# --- 滾動日記錄 (前一日 / 當日 / 翌日) ---
+# 每一日的基礎數據只計算一次，之後沿窗口往前傳遞，
+# 取代每日分別為 prev / curr / next 重新計算三次。
+
+class DayWindow:
+    """滾動窗口：compute(k) 計算第 k 日 (相對起始日) 的記錄，每個 k 只呼叫一次"""
+
+    def __init__(self, compute, behind=True, ahead=True):
+        self.compute = compute
+        self.behind = behind
+        self.ahead = ahead
+        self.calls = 0
+        self.days = 0
+
+    def _get(self, k):
+        self.calls += 1
+        with stage("day"):
+            return self.compute(k)
+
+    def __call__(self, days):
+        """依序產生 (i, prev, curr, next)；未啟用的一側為 None"""
+        prev = self._get(-1) if self.behind else None
+        curr = self._get(0) if days > 0 else None
+        for i in range(days):
+            nxt = self._get(i + 1) if self.ahead or i + 1 < days else None
+            yield i, prev, curr, nxt
+            if self.behind:
+                prev = curr
+            curr = nxt
+            self.days = i + 1
+
+    @property
+    def calls_per_day(self):
+        """每日平均計算次數 (舊寫法為每日 3 次)"""
+        return self.calls / self.days if self.days else 0.0
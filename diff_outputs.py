@@ -0,0 +1,179 @@
+import argparse
+import os
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from export import load_manifest, read_partition
+
+# --- 兩份輸出的逐欄比較 ---
+# 讀入兩份輸出 (XLSX / CSV / 分區資料集)，以 (日期, 時段) 對齊後逐欄做向量化比較，
+# 列出有差異的欄位、差異列數與前幾個例子。
+# XLSX 以 openpyxl read_only 模式逐列串流讀取 (共用字串、inline 字串與跳脫字元由 openpyxl 處理)；
+# 所有值一律當字串比較 (空白格 = 空字串)，日期欄統一為 YYYY-MM-DD。
+
+KEYS = ("日期", "時段")
+_EXCEL_EPOCH = date(1899, 12, 30)
+
+def _sheet_frame(rows, width):
+    """工作表的資料列 (tuple 列表) -> 字串 DataFrame (空白格 = 空字串，列長不足的補空白)"""
+    df = pd.DataFrame(rows, columns=range(max(width, max(map(len, rows)))), dtype=object).iloc[:, :width]
+    return df.where(df.notna(), "").astype(str)
+
+def read_xlsx(path):
+    """串流讀取 XLSX 的所有工作表 (第一列為標題，各頁標題須一致)，回傳字串 DataFrame"""
+    from openpyxl import load_workbook  # 延後載入，只讀 CSV / 資料集時不需 openpyxl
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    frames, header = [], None
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            first = next(rows, None)
+            if first is None:
+                continue
+            names = ["" if v is None else str(v) for v in first]
+            while names and not names[-1]:
+                names.pop()
+            if header is None:
+                header = names
+            elif names != header:
+                raise ValueError(f"{path} 工作表 {ws.title} 的標題與第一頁不同")
+            data = list(rows)
+            if data:
+                frames.append(_sheet_frame(data, len(header)))
+    finally:
+        wb.close()
+    if not frames:
+        return pd.DataFrame(columns=header or [])
+    df = pd.concat(frames, ignore_index=True)
+    df.columns = header
+    if "日期" in df.columns:
+        df["日期"] = _excel_dates(df["日期"].values)
+    return df
+
+def _excel_dates(values):
+    """日期欄：Excel 序號 (數值格) 轉成 YYYY-MM-DD，"1976-01-01 00:00:00" 之類的字串取日期部分"""
+    out = np.asarray(values, dtype=object).copy()
+    numeric = np.array([bool(v) and v.replace(".", "", 1).isdigit() for v in out])
+    if numeric.any():
+        serial = np.array(out[numeric], dtype=float).astype(np.int64)
+        out[numeric] = (np.datetime64(_EXCEL_EPOCH) + serial.astype("timedelta64[D]")).astype(str)
+    text = ~numeric
+    out[text] = [v[:10] for v in out[text]]
+    return out
+
+def read_output(path):
+    """依副檔名讀取一份輸出 (.xlsx / .csv / 分區資料集目錄)，回傳字串 DataFrame"""
+    if os.path.isdir(path):
+        manifest = load_manifest(path)
+        frames = [read_partition(path, p["tz"], p["year"]) for p in manifest["partitions"]]
+        df = pd.concat(frames, ignore_index=True).astype(str) if frames else pd.DataFrame()
+    elif path.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(path)
+    elif path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    else:
+        raise ValueError(f"不支援的檔案格式: {path}")
+    if "日期" in df.columns:
+        df["日期"] = df["日期"].str[:10]
+    return df
+
+def diff_frames(a, b, keys=KEYS, examples=5):
+    """以 keys 對齊兩個 DataFrame 後逐欄比較 (依 A 的列順序)
+
+    回傳 dict：summary (每個共同欄位的差異列數與比例)、examples (每欄前幾個差異)、
+    only_a / only_b (只在一邊出現的列)、columns_only_a / columns_only_b、aligned (對齊的列數)。
+    """
+    keys = list(keys)
+    index = {}
+    for name, df in (("A", a), ("B", b)):
+        missing = [k for k in keys if k not in df.columns]
+        if missing:
+            raise ValueError(f"{name} 缺少對齊欄位 {', '.join(missing)} (可用 --rename 或 --keys 調整)")
+        index[name] = pd.MultiIndex.from_frame(df[keys].astype(str))
+        if index[name].has_duplicates:
+            raise ValueError(f"{name} 的 ({', '.join(keys)}) 有重複列，無法對齊")
+    pos = index["B"].get_indexer(index["A"])  # A 的每一列在 B 中的位置 (-1 = 沒有)
+    ia = np.flatnonzero(pos >= 0)
+    ib = pos[ia]
+    only_b = np.ones(len(b), dtype=bool)
+    only_b[ib] = False
+
+    common = [c for c in a.columns if c in b.columns and c not in keys]
+    key_values = {k: a[k].values[ia] for k in keys}
+    rows, samples = [], []
+    for c in common:
+        va = a[c].fillna("").astype(str).values[ia]
+        vb = b[c].fillna("").astype(str).values[ib]
+        changed = np.flatnonzero(va != vb)
+        rows.append({"欄位": c, "差異列數": len(changed), "比例": len(changed) / max(len(ia), 1)})
+        for i in changed[:examples]:
+            samples.append({**{k: key_values[k][i] for k in keys}, "欄位": c, "A": va[i], "B": vb[i]})
+    return {
+        "aligned": len(ia),
+        "summary": pd.DataFrame(rows, columns=["欄位", "差異列數", "比例"]),
+        "examples": pd.DataFrame(samples, columns=keys + ["欄位", "A", "B"]),
+        "only_a": a.loc[pos < 0, keys].reset_index(drop=True),
+        "only_b": b.loc[only_b, keys].reset_index(drop=True),
+        "columns_only_a": [c for c in a.columns if c not in b.columns],
+        "columns_only_b": [c for c in b.columns if c not in a.columns],
+    }
+
+def print_report(result, examples=5):
+    s = result["summary"]
+    changed = s[s["差異列數"] > 0]
+    print(f"對齊 {result['aligned']} 列；只在 A: {len(result['only_a'])} 列，只在 B: {len(result['only_b'])} 列")
+    if result["columns_only_a"]:
+        print(f"只在 A 的欄位: {', '.join(result['columns_only_a'])}")
+    if result["columns_only_b"]:
+        print(f"只在 B 的欄位: {', '.join(result['columns_only_b'])}")
+    for label in ("only_a", "only_b"):
+        if len(result[label]):
+            print(f"{'只在 A' if label == 'only_a' else '只在 B'} 的列 (前 {examples} 筆):")
+            print(result[label].head(examples).to_string(index=False))
+    if changed.empty:
+        print(f"共同的 {len(s)} 個欄位全部相同 ✅")
+        return
+    print(f"\n有差異的欄位 ({len(changed)}/{len(s)}):")
+    print(changed.to_string(index=False, formatters={"比例": "{:.2%}".format}))
+    print(f"\n差異例子 (每欄前 {examples} 筆):")
+    print(result["examples"].to_string(index=False))
+
+def _parse_renames(items):
+    renames = {}
+    for item in items or []:
+        old, sep, new = item.partition("=")
+        if not sep:
+            raise ValueError(f"--rename 格式須為 舊欄名=新欄名: {item}")
+        renames[old] = new
+    return renames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較兩份輸出 (XLSX / CSV / 分區資料集)，以 (日期, 時段) 對齊逐欄比較")
+    parser.add_argument("a")
+    parser.add_argument("b")
+    parser.add_argument("--keys", nargs="+", default=list(KEYS), help="對齊欄位 (預設: 日期 時段)")
+    parser.add_argument("--rename", nargs="+", metavar="舊=新", help="比較前改欄名 (兩份都套用)，如 時段名稱=時段 月飛星=月星")
+    parser.add_argument("--examples", type=int, default=5, help="每個欄位列出的差異例子數")
+    parser.add_argument("--out", help="另存摘要與差異例子為 XLSX")
+    args = parser.parse_args()
+
+    renames = _parse_renames(args.rename)
+    t0 = time.perf_counter()
+    a, b = (read_output(p).rename(columns=renames) for p in (args.a, args.b))
+    t_read = time.perf_counter() - t0
+    result = diff_frames(a, b, args.keys, args.examples)
+    t_diff = time.perf_counter() - t0 - t_read
+    print(f"A: {args.a} ({len(a)} 列 x {len(a.columns)} 欄)\nB: {args.b} ({len(b)} 列 x {len(b.columns)} 欄)")
+    print(f"讀取 {t_read:.2f} 秒，比較 {t_diff:.2f} 秒\n")
+    print_report(result, args.examples)
+    if args.out:
+        with pd.ExcelWriter(args.out) as xw:
+            result["summary"].to_excel(xw, sheet_name="摘要", index=False)
+            result["examples"].to_excel(xw, sheet_name="差異例子", index=False)
+            pd.concat([result["only_a"].assign(來源="A"), result["only_b"].assign(來源="B")]).to_excel(
+                xw, sheet_name="未對齊的列", index=False)
+        print(f"✅ 已寫入 {args.out}")
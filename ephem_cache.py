@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from importlib.metadata import version
+
+import numpy as np
+
+from astro import EPHEMERIS_FILE, solar_backend
+
+# --- 天文結果磁碟快取 (交節時刻 + 每日黃經、朔望月表) ---
+# 檔案格式：MAGIC + 8 位元組表頭長度 + JSON 表頭 + 對齊的原始陣列；
+# 讀取時先驗證表頭內的 key，再以 np.memmap 映射陣列，完全不需載入星曆。
+
+CACHE_DIR = os.environ.get("BCCAL_CACHE_DIR", "ephem_cache")
+CACHE_FORMAT = 1
+MAGIC = b"BCCALEPH"
+_ALIGN = 64
+
+_FINGERPRINTS = {}
+
+def kernel_fingerprint(path=EPHEMERIS_FILE):
+    """星曆檔的識別資料 (檔名、大小、SHA1)；檔案不存在時回傳 None"""
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _FINGERPRINTS:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _FINGERPRINTS[memo] = {"name": os.path.basename(path), "size": st.st_size, "sha1": h.hexdigest()}
+    return _FINGERPRINTS[memo]
+
+def cache_key(kind, span, kernel=None):
+    """快取 key：資料種類、星曆檔、年份範圍、skyfield 版本、快取格式"""
+    return {
+        "kind": kind,
+        "kernel": kernel if kernel is not None else kernel_fingerprint(),
+        "span": list(span),
+        "skyfield": version("skyfield"),
+        "format": CACHE_FORMAT,
+    }
+
+def cache_path(key):
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{key['kind']}_{key['span'][0]}_{key['span'][1]}_{digest}.bin")
+
+def save_arrays(path, key, arrays):
+    """寫入快取檔 (先寫暫存檔再 os.replace，避免半寫入的檔案)"""
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({"key": key, "arrays": layout}, sort_keys=True).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+
+def load_arrays(path, key):
+    """讀取並驗證快取檔；key 不符或檔案損壞時回傳 None，陣列以唯讀 memmap 回傳"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            n = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(n))
+        if header["key"] != json.loads(json.dumps(key)):
+            return None
+        data_start = -(-(len(MAGIC) + 8 + n) // _ALIGN) * _ALIGN
+        size = os.path.getsize(path)
+        arrays = {}
+        for name, info in header["arrays"].items():
+            dtype, shape = np.dtype(info["dtype"]), tuple(info["shape"])
+            start = data_start + info["offset"]
+            if start + dtype.itemsize * int(np.prod(shape)) > size:
+                return None
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=start, shape=shape)
+        return arrays
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _key_or_none(kind, span):
+    """需要快取時回傳 key；Chebyshev 模式 (建表很快) 或沒有星曆檔時回傳 None
+    先判斷再建 key，cheb 模式不必安裝 skyfield"""
+    if solar_backend() == "cheb":
+        return None
+    kernel = kernel_fingerprint()
+    return None if kernel is None else cache_key(kind, span, kernel)
+
+def load_cached(kind, span):
+    """讀取指定種類與年份範圍的快取 (如 'terms'、'lunar')，沒有有效快取時回傳 None"""
+    key = _key_or_none(kind, span)
+    return None if key is None else load_arrays(cache_path(key), key)
+
+def save_cached(kind, span, arrays):
+    key = _key_or_none(kind, span)
+    if key is None:
+        return None
+    path = cache_path(key)
+    save_arrays(path, key, arrays)
+    return path
@@ -0,0 +1,273 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from profiling import stage
+
+# --- 串流匯出 (XLSX) ---
+# 生成器逐段產出 DataFrame，直接寫入 openpyxl 的 write-only 活頁簿；
+# 每段寫完即可釋放，記憶體用量與總天數無關。
+
+EXCEL_MAX_ROWS = 1048576  # 單一工作表上限 (含標題列)
+
+def year_spans(start_str, days):
+    """把 [start, start+days) 依西曆年切段，產生 (起始日字串, 天數)"""
+    d = datetime.strptime(start_str, "%Y-%m-%d").date()
+    end = d + timedelta(days=days)
+    while d < end:
+        nxt = min(date(d.year + 1, 1, 1), end)
+        yield d.isoformat(), (nxt - d).days
+        d = nxt
+
+def iter_year_chunks(run, start_str, days, *args, **kwargs):
+    """逐年呼叫 run(起始日, 天數, ...)，每次只產出一年的 DataFrame
+
+    產生器在 df.attrs 留下的跨段狀態 (如 main4 的 last_term_idx) 以關鍵字參數傳給下一年，
+    結果與一次生成相同。
+    """
+    for chunk_start, chunk_days in year_spans(start_str, days):
+        df = run(chunk_start, chunk_days, *args, **kwargs)
+        kwargs.update(getattr(df, "attrs", {}))
+        yield df
+
+def _header_row(ws, columns):
+    """標題列樣式與 pandas.to_excel 相同 (粗體、細框、置中)"""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    font, border = Font(bold=True), Border(*(Side(style="thin"),) * 4)
+    align = Alignment(horizontal="center", vertical="top")
+    cells = []
+    for name in columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font, cell.border, cell.alignment = font, border, align
+        cells.append(cell)
+    return cells
+
+def _sheet_key(value, split):
+    """依日期決定工作表名稱：split='year' 以年份分頁，None 則全部寫入同一頁"""
+    if split == "year" and isinstance(value, date):
+        return str(value.year)
+    return "Calendar"
+
+class XlsxStreamWriter:
+    """逐段寫入的 XLSX 匯出器；同一工作表超過 max_rows 時自動開新頁 (如 1976_2)"""
+
+    def __init__(self, path, split="year", max_rows=EXCEL_MAX_ROWS - 1, date_column="日期"):
+        self.path = path
+        self.split = split
+        self.max_rows = max_rows
+        self.date_column = date_column
+        from openpyxl import Workbook  # 延後載入，匯入本模組不需 openpyxl
+        self.wb = Workbook(write_only=True)
+        self.sheets = []   # [(工作表名稱, 資料列數)]
+        self.rows = 0
+        self._ws, self._key, self._part, self._count = None, None, 0, 0
+        self._columns = None
+
+    def _open_sheet(self, key):
+        if key != self._key:
+            self._key, self._part = key, 1
+        else:
+            self._part += 1
+        title = key if self._part == 1 else f"{key}_{self._part}"
+        self._ws = self.wb.create_sheet(title)
+        self._ws.append(_header_row(self._ws, self._columns))
+        self._count = 0
+        self.sheets.append([title, 0])
+
+    def write(self, df):
+        """寫入一段 DataFrame (欄位須與第一段相同)"""
+        if self._columns is None:
+            self._columns = list(df.columns)
+        elif list(df.columns) != self._columns:
+            raise ValueError("各段 DataFrame 的欄位必須一致")
+        date_pos = self._columns.index(self.date_column) if self.date_column in self._columns else None
+        with stage("export"):
+            for row in df.itertuples(index=False, name=None):
+                key = _sheet_key(row[date_pos] if date_pos is not None else None, self.split)
+                if self._ws is None or key != self._key or self._count >= self.max_rows:
+                    self._open_sheet(key)
+                self._ws.append(row)
+                self._count += 1
+                self.sheets[-1][1] += 1
+                self.rows += 1
+
+    def add_sheet(self, title, df):
+        """另寫一個獨立的小工作表 (如摘要)，不影響分頁狀態；應在 write 之前呼叫以排在最前"""
+        ws = self.wb.create_sheet(title)
+        ws.append(_header_row(ws, list(df.columns)))
+        with stage("export"):
+            for row in df.itertuples(index=False, name=None):
+                ws.append(row)
+
+    def close(self):
+        if self._ws is None:
+            # 沒有任何資料時仍輸出一個空白工作表，避免產生無法開啟的檔案
+            self._columns = self._columns or []
+            self._open_sheet("Calendar")
+        with stage("export"):
+            self.wb.save(self.path)
+        return self.sheets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+def write_xlsx_stream(path, chunks, split="year", max_rows=EXCEL_MAX_ROWS - 1):
+    """將 DataFrame 生成器逐段寫入 XLSX，回傳 [(工作表名稱, 資料列數)]"""
+    with XlsxStreamWriter(path, split, max_rows) as writer:
+        for df in chunks:
+            writer.write(df)
+    return writer.sheets
+
+# --- 分區欄式輸出 (Parquet / Arrow IPC) ---
+# 目錄結構：root/tz=<時區>/year=<年>/part-0.parquet，另有 root/manifest.json 記錄每個分區。
+# 字串欄位一律以 dictionary 編碼 (干支、星名等只有幾十種值)；pyarrow 為選用套件，只在呼叫時載入。
+
+MANIFEST = "manifest.json"
+DATASET_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet / Arrow 輸出需要 pyarrow：pip install pyarrow") from e
+    return pyarrow
+
+def _tz_dir(tz_name):
+    return "tz=" + tz_name.replace("/", "_")
+
+def _to_arrow(df):
+    """DataFrame -> pyarrow.Table，字串欄位轉為 dictionary 編碼，日期轉為 date32"""
+    pa = _require_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table.replace_schema_metadata(None)
+
+def _clear_partition(part_dir):
+    """刪除分區目錄內既有的 part-N 檔案 (只刪本模組寫出的格式)"""
+    if not os.path.isdir(part_dir):
+        return
+    for name in os.listdir(part_dir):
+        if name.startswith("part-") and name.endswith(tuple(DATASET_FORMATS.values())):
+            os.remove(os.path.join(part_dir, name))
+
+def load_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {"format": None, "partitions": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+class DatasetWriter:
+    """逐段寫入依 (時區, 年) 分區的欄式資料集；close() 時更新 manifest (同分區覆寫，舊的 part-N 檔案一併刪除)
+
+    append=True 時接在該時區既有的分區之後 (同一年追加 part-N 檔案，不覆寫)；
+    generation 若有設定，close() 時一併記入 manifest["generation"][時區] (供接續生成)。
+    """
+
+    def __init__(self, root, tz_name, fmt="parquet", date_column="日期", append=False):
+        if fmt not in DATASET_FORMATS:
+            raise ValueError(f"不支援的格式: {fmt} (可用: {', '.join(DATASET_FORMATS)})")
+        _require_pyarrow()
+        self.root, self.tz_name, self.fmt, self.date_column = root, tz_name, fmt, date_column
+        self.append = append
+        self.partitions = {}  # 年 -> manifest 項目
+        self._parts = {}      # 年 -> 已寫入的檔案數
+        self.columns = None
+        self.manifest = None
+        self.generation = None
+        if append:
+            for p in load_manifest(root)["partitions"]:
+                if p["tz"] == tz_name:
+                    self.partitions[p["year"]] = p
+                    self._parts[p["year"]] = len(p["files"])
+
+    def _write_table(self, table, path):
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, path, use_dictionary=True, compression="zstd")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path, compression="zstd")
+
+    def write(self, df):
+        years = np.array([d.year for d in df[self.date_column]])
+        for year in np.unique(years):
+            part = df[years == year]
+            year = int(year)
+            n = self._parts.get(year, 0)
+            rel = os.path.join(_tz_dir(self.tz_name), f"year={year}", f"part-{n}{DATASET_FORMATS[self.fmt]}")
+            part_dir = os.path.dirname(os.path.join(self.root, rel))
+            if n == 0 and not self.append:
+                _clear_partition(part_dir)  # 覆寫分區：先刪除先前 (可能較長的) 寫入留下的 part-N
+            os.makedirs(part_dir, exist_ok=True)
+            with stage("export"):
+                table = _to_arrow(part)
+                self._write_table(table, os.path.join(self.root, rel))
+            self._parts[year] = n + 1
+
+            entry = self.partitions.setdefault(year, {
+                "tz": self.tz_name, "year": year, "files": [], "rows": 0,
+                "first_date": str(part[self.date_column].iloc[0]),
+            })
+            entry["files"].append(rel.replace(os.sep, "/"))
+            entry["rows"] += len(part)
+            entry["last_date"] = str(part[self.date_column].iloc[-1])
+            self.columns = list(table.column_names)
+
+    def close(self):
+        manifest = load_manifest(self.root)
+        if manifest["format"] not in (None, self.fmt):
+            raise ValueError(f"{self.root} 已是 {manifest['format']} 資料集")
+        keep = [p for p in manifest["partitions"] if not (p["tz"] == self.tz_name and p["year"] in self.partitions)]
+        manifest["format"] = self.fmt
+        manifest["columns"] = self.columns or manifest.get("columns", [])
+        manifest["partitions"] = sorted(keep + list(self.partitions.values()), key=lambda p: (p["tz"], p["year"]))
+        if self.generation is not None:
+            manifest.setdefault("generation", {})[self.tz_name] = self.generation
+        tmp = os.path.join(self.root, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(self.root, MANIFEST))
+        self.manifest = manifest
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+def write_dataset(root, chunks, tz_name, fmt="parquet"):
+    """將 DataFrame 生成器寫成分區資料集，回傳更新後的 manifest"""
+    with DatasetWriter(root, tz_name, fmt) as writer:
+        for df in chunks:
+            writer.write(df)
+    return writer.manifest
+
+def read_partition(root, tz_name, year, columns=None):
+    """依 manifest 讀取單一 (時區, 年) 分區，可只讀指定欄位；回傳 DataFrame"""
+    pa = _require_pyarrow()
+    manifest = load_manifest(root)
+    for p in manifest["partitions"]:
+        if p["tz"] == tz_name and p["year"] == year:
+            break
+    else:
+        raise KeyError(f"資料集中沒有 {tz_name} {year} 的分區")
+    if manifest["format"] == "parquet":
+        import pyarrow.parquet as pq
+        tables = [pq.read_table(os.path.join(root, f), columns=columns) for f in p["files"]]
+    else:
+        import pyarrow.feather as feather
+        tables = [feather.read_table(os.path.join(root, f), columns=columns, memory_map=True) for f in p["files"]]
+    return pa.concat_tables(tables).to_pandas()
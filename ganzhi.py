@@ -0,0 +1,193 @@
+import numpy as np
+
+from profiling import stage
+
+# --- 干支整數核心 ---
+# 柱以 0-59 的六十甲子序號表示 (甲子=0, 乙丑=1 ... 癸亥=59)，星以 1-9 表示；
+# 屬性、納音、胎元、五行皆為預先計算的查找表，字串只在輸出時才解碼。
+# 本模組只依賴 numpy，不載入任何天文資料 (匯入只需數十毫秒)。
+
+STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
+STAR_WUXING = {"一白": "水", "二黑": "土", "三碧": "木", "四綠": "木", "五黃": "土", "六白": "金", "七赤": "金", "八白": "土", "九紫": "火"}
+
+GAN = list("甲乙丙丁戊己庚辛壬癸")
+ZHI = list("子丑寅卯辰巳午未申酉戌亥")
+
+GAN_PROPS = {"甲": "陽木", "乙": "陰木", "丙": "陽火", "丁": "陰火", "戊": "陽土", "己": "陰土", "庚": "陽金", "辛": "陰金", "壬": "陽水", "癸": "陰水"}
+ZHI_PROPS = {"子": "陽水", "丑": "陰土", "寅": "陽木", "卯": "陰木", "辰": "陽土", "巳": "陰火", "午": "陽火", "未": "陰土", "申": "陽金", "酉": "陰金", "戌": "陽土", "亥": "陰水"}
+
+NAYIN = {
+    "甲子": "海中金", "乙丑": "海中金", "丙寅": "爐中火", "丁卯": "爐中火", "戊辰": "大林木", "己巳": "大林木",
+    "庚午": "路旁土", "辛未": "路旁土", "壬申": "劍鋒金", "癸酉": "劍鋒金", "甲戌": "山頭火", "乙亥": "山頭火",
+    "丙子": "澗下水", "丁丑": "澗下水", "戊寅": "城頭土", "己卯": "城頭土", "庚辰": "白蠟金", "辛巳": "白蠟金",
+    "壬午": "楊柳木", "癸未": "楊柳木", "甲申": "泉中水", "乙酉": "泉中水", "丙戌": "屋上土", "丁亥": "屋上土",
+    "戊子": "霹靂火", "己丑": "霹靂火", "庚寅": "松柏木", "辛卯": "松柏木", "壬辰": "長流水", "癸巳": "長流水",
+    "甲午": "砂中金", "乙未": "砂中金", "丙申": "山下火", "丁酉": "山下火", "戊戌": "平地木", "己亥": "平地木",
+    "庚子": "壁上土", "辛丑": "壁上土", "壬寅": "金箔金", "癸卯": "金箔金", "甲辰": "覆燈火", "乙巳": "覆燈火",
+    "丙午": "天河水", "丁未": "天河水", "戊申": "大驛土", "己酉": "大驛土", "庚戌": "釵釧金", "辛亥": "釵釧金",
+    "壬子": "桑柘木", "癸丑": "桑柘木", "甲寅": "大溪水", "乙卯": "大溪水", "丙辰": "沙中土", "丁巳": "沙中土",
+    "戊午": "天上火", "己未": "天上火", "庚申": "石榴木", "辛酉": "石榴木", "壬戌": "大海水", "癸亥": "大海水"
+}
+
+# 日柱基準日：2025-12-21 為甲子日 (序號 0)
+DAY_REF = np.datetime64("2025-12-21", "D")
+
+# --- 60 甲子查找表 ---
+# 解碼表為 object 陣列 (Python 字串)，查表結果可直接交給 pandas，不需再轉換
+SEXAGENARY = np.arange(60, dtype=np.int8)
+GZ_GAN = SEXAGENARY % 10
+GZ_ZHI = SEXAGENARY % 12
+
+def sexagenary(gan_idx, zhi_idx):
+    """(天干序, 地支序) -> 六十甲子序號 (兩者奇偶須一致)"""
+    return (6 * np.asarray(gan_idx, dtype=np.int16) - 5 * np.asarray(zhi_idx, dtype=np.int16)) % 60
+
+GZ_NAMES = np.array([GAN[g] + ZHI[z] for g, z in zip(GZ_GAN, GZ_ZHI)], dtype=object)
+GZ_PROPS = np.array([GAN_PROPS[GAN[g]] + ZHI_PROPS[ZHI[z]] for g, z in zip(GZ_GAN, GZ_ZHI)], dtype=object)
+GZ_NAYIN = np.array([NAYIN[name] for name in GZ_NAMES], dtype=object)
+# 胎元：月干進一，月支配三
+TAI_YUAN = sexagenary((GZ_GAN + 1) % 10, (GZ_ZHI + 3) % 12).astype(np.int8)
+
+# 星：索引 1-9 (索引 0 保留)
+STAR_NAMES = np.array([""] + [STARS[v] for v in range(1, 10)], dtype=object)
+STAR_WUXING_TABLE = np.array([""] + [STAR_WUXING[STARS[v]] for v in range(1, 10)], dtype=object)
+
+ZHI_NAMES = np.array(ZHI, dtype=object)
+GONG_NAMES = np.array([z + "宮" for z in ZHI], dtype=object)
+
+def star9(v):
+    """任意整數 -> 1-9 的星數 (0 視為 9)"""
+    return ((np.asarray(v) - 1) % 9 + 1).astype(np.int8)
+
+def zhi_group(zhi_idx):
+    """地支分組：0=子午卯酉, 1=寅申巳亥, 2=辰戌丑未"""
+    z = np.asarray(zhi_idx)
+    return np.where(z % 3 == 0, 0, np.where(z % 3 == 2, 1, 2)).astype(np.int8)
+
+# --- 日級規則 (main3.1 版本) ---
+
+def year_pillar(logic_year):
+    return ((np.asarray(logic_year, dtype=np.int32) - 4) % 60).astype(np.int8)
+
+MONTH_STEM_RULES = ("year_gan", "logic_year")
+
+def month_pillar(logic_year, zhi_yue, stem="year_gan"):
+    """五虎遁：寅月天干 = 年干 % 5 * 2 + 2；zhi_yue 1=寅 ... 12=丑
+
+    stem="logic_year" 為 main / main3 / main4 的寫法 (以術數年 % 5 代替年干 % 5)。
+    """
+    logic_year = np.asarray(logic_year, dtype=np.int32)
+    base = (logic_year - 4) % 10 if stem == "year_gan" else logic_year
+    zhi_yue = np.asarray(zhi_yue, dtype=np.int32)
+    return sexagenary((base % 5 * 2 + zhi_yue + 1) % 10, (zhi_yue + 1) % 12).astype(np.int8)
+
+def day_offset(dates, ref=DAY_REF):
+    """距基準日的日數 (int64)"""
+    return (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(ref, "D")).astype(np.int64)
+
+def day_pillar(d_diff):
+    return (np.asarray(d_diff) % 60).astype(np.int8)
+
+def year_star(logic_year, start=3, ref_year=2024):
+    """年星逆飛：ref_year 為 start 星 (2024 = 三碧)"""
+    return star9(start - (np.asarray(logic_year, dtype=np.int32) - ref_year))
+
+MONTH_STAR_BASE = np.array([8, 2, 5], dtype=np.int8)  # 年支 子午卯酉 / 寅申巳亥 / 辰戌丑未
+
+def month_star(logic_year, zhi_yue, base=MONTH_STAR_BASE):
+    y_zhi = (np.asarray(logic_year, dtype=np.int32) - 4) % 12
+    return star9(base[zhi_group(y_zhi)] - (np.asarray(zhi_yue, dtype=np.int32) - 1))
+
+def day_star(d_diff, is_yang, yang_start=1, yin_start=9):
+    """日星：陽遁由基準日 yang_start 順飛，陰遁由 yin_start 逆飛"""
+    d_diff = np.asarray(d_diff)
+    return star9(np.where(is_yang, yang_start + d_diff, yin_start - d_diff))
+
+def day_arrays(dates, terms):
+    """整段日期的日級數據 (整數陣列)；terms 為交節表 classify 的結果 (每日一筆)"""
+    with stage("day"):
+        d_diff = day_offset(dates)
+        logic_y, zhi_yue, is_yang = terms["logic_year"], terms["zhi_yue"], terms["is_yang"]
+        return {
+            "y_gz": year_pillar(logic_y), "m_gz": month_pillar(logic_y, zhi_yue), "d_gz": day_pillar(d_diff),
+            "y_s": year_star(logic_y), "m_s": month_star(logic_y, zhi_yue), "d_s": day_star(d_diff, is_yang),
+            "is_yang": np.asarray(is_yang, dtype=np.bool_), "term_idx": np.asarray(terms["term_idx"], dtype=np.int8),
+            "zhi_yue": np.asarray(zhi_yue, dtype=np.int8),
+        }
+
+# --- 時級規則 ---
+
+# 五鼠遁：子時天干 = 日干 % 5 * 2
+def hour_pillar(day_gz, hour_zhi):
+    day_gan = np.asarray(day_gz) % 10
+    hour_zhi = np.asarray(hour_zhi)
+    return sexagenary((day_gan % 5 * 2 + hour_zhi) % 10, hour_zhi).astype(np.int8)
+
+HOUR_STAR_START = {True: np.array([1, 7, 4], dtype=np.int8), False: np.array([9, 3, 6], dtype=np.int8)}
+
+def hour_star(is_yang, day_gz, hour_idx):
+    """時星：陽遁由子時起 1/7/4 順飛，陰遁起 9/3/6 逆飛 (依日支分組)"""
+    group = zhi_group(np.asarray(day_gz) % 12)
+    hour_idx = np.asarray(hour_idx)
+    yang = HOUR_STAR_START[True][group] + hour_idx
+    yin = HOUR_STAR_START[False][group] - hour_idx
+    return star9(np.where(is_yang, yang, yin))
+
+def ming_gong(zhi_yue, hour_zhi):
+    """命宮地支序：(14 - (月支數 + 時支數)) % 12，0 視為 12"""
+    m_val = (np.asarray(zhi_yue) + 1) % 12 + 1
+    h_val = np.asarray(hour_zhi) + 1
+    mg = (14 - (m_val + h_val)) % 12
+    return (np.where(mg <= 0, mg + 12, mg) - 1).astype(np.int8)
+
+# --- 13 時段展開 (早子、丑 ... 亥、晚子) ---
+# 晚子時 (第 13 段) 以翌日日干起時柱、以翌日陰陽遁與日支起時星 (時序歸零)
+
+# 13 個時段：(時支序, 名稱, 時間, 是否晚子時)
+TIME_SLOTS = [
+    (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False),
+    (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False),
+    (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False),
+    (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False),
+    (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False),
+    (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
+    (0, "晚子時", "23:00-24:00", True)
+]
+SLOT_NAMES = np.array([s[1] for s in TIME_SLOTS], dtype=object)
+SLOT_PERIODS = np.array([s[2] for s in TIME_SLOTS], dtype=object)
+SLOT_ZHI = np.array([s[0] for s in TIME_SLOTS], dtype=np.int8)
+SLOT_LATE = np.array([s[3] for s in TIME_SLOTS])
+SLOT_START_HOURS = np.array([int(s[2][:2]) for s in TIME_SLOTS], dtype=np.int8)  # 各時段起點 (當地時)
+_SLOTS = np.arange(len(SLOT_ZHI))
+
+HOUR_GZ_TABLE = hour_pillar(np.arange(10)[:, None], SLOT_ZHI[None, :])                        # [日干, 時段]
+HOUR_STAR_TABLE = np.stack([hour_star(yang, np.arange(12)[:, None], SLOT_ZHI[None, :])
+                            for yang in (False, True)])                                         # [陽遁, 日支, 時段]
+MING_GONG_TABLE = ming_gong(np.arange(1, 13)[:, None], SLOT_ZHI[None, :])                      # [支月-1, 時段]
+
+def hour_arrays(day, next_day):
+    """(日數 x 13) 的時柱、時星、命宮；day / next_day 為 day_arrays 的結果 (翌日錯位一日)"""
+    with stage("hours"):
+        src_gz = np.where(SLOT_LATE, next_day["d_gz"][:, None], day["d_gz"][:, None])
+        src_yang = np.where(SLOT_LATE, next_day["is_yang"][:, None], day["is_yang"][:, None])
+        return {
+            "h_gz": HOUR_GZ_TABLE[src_gz % 10, _SLOTS],
+            "h_s": HOUR_STAR_TABLE[src_yang.astype(np.intp), src_gz % 12, _SLOTS],
+            "ming_gong": MING_GONG_TABLE[np.asarray(day["zhi_yue"], dtype=np.intp)[:, None] - 1, _SLOTS],
+        }
+
+def slot_of_hour(hour):
+    """當地時 (0-23) -> 時段序 (0=早子 ... 12=晚子)"""
+    return 12 if hour == 23 else (hour + 1) // 2
+
+# --- 字串版輔助函數 (逐筆使用；匯入本模組不需星曆或 pandas) ---
+
+def get_gz_prop(gz_str):
+    """獲取干支屬性 (如: 陽木陽水)"""
+    if not gz_str or len(gz_str) < 2: return ""
+    return f"{GAN_PROPS.get(gz_str[0], '')}{ZHI_PROPS.get(gz_str[1], '')}"
+
+def get_tai_yuan(m_gz):
+    """胎元：月干進一，月支配三"""
+    if not m_gz: return ""
+    return GAN[(GAN.index(m_gz[0]) + 1) % 10] + ZHI[(ZHI.index(m_gz[1]) + 3) % 12]
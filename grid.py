@@ -0,0 +1,139 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import ganzhi
+from export import _require_pyarrow
+from profiling import stage
+from solar_terms import SOLAR_TERMS, get_term_table
+
+# --- 任意解析度的時間網格 (串流輸出) ---
+# 由 start 到 end (不含)，每隔 step 取一個時刻，逐塊產出固定列數的整數陣列 (柱 0-59、星 1-9)；
+# 每塊獨立計算，記憶體用量只與 chunk_rows 有關，與總列數無關。
+# 網格在 UTC 上等距 (夏令時間切換時當地時間會跳過或重複一小時，不會少算或重算時刻)。
+# 規則與 main3.1 相同 (ganzhi 的日級、時級規則)，但每個時刻以自身的精確交節分類：
+# 年、月柱與飛星、陰陽遁即該時刻所屬的節氣 (同 run_final_calendar(exact_terms=True))；
+# 晚子時 (23:00-24:00) 日柱屬當日，時柱、時星以翌日日干、日支起算。
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# 每塊的欄位與型別
+GRID_DTYPES = {
+    "utc": "datetime64[ns]", "local": "datetime64[ns]", "slot": np.int8, "term_idx": np.int8, "is_yang": np.bool_,
+    "y_gz": np.int8, "m_gz": np.int8, "d_gz": np.int8, "h_gz": np.int8,
+    "y_s": np.int8, "m_s": np.int8, "d_s": np.int8, "h_s": np.int8, "ming_gong": np.int8,
+}
+
+# 解碼：欄位 -> (輸出欄名, 查找表)
+DECODE = {
+    "slot": ("時段", ganzhi.SLOT_NAMES), "term_idx": ("節氣", np.array(SOLAR_TERMS, dtype=object)),
+    "y_gz": ("年柱", ganzhi.GZ_NAMES), "m_gz": ("月柱", ganzhi.GZ_NAMES), "d_gz": ("日柱", ganzhi.GZ_NAMES),
+    "h_gz": ("時柱", ganzhi.GZ_NAMES), "y_s": ("年星", ganzhi.STAR_NAMES), "m_s": ("月星", ganzhi.STAR_NAMES),
+    "d_s": ("日星", ganzhi.STAR_NAMES), "h_s": ("時星", ganzhi.STAR_NAMES), "ming_gong": ("命宮", ganzhi.GONG_NAMES),
+}
+
+def _to_utc(value, tz_name):
+    """字串 / datetime -> UTC datetime64[ns]；naive 時視為 tz 的當地時間"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(tz_name, ambiguous=False, nonexistent="shift_forward")
+    return np.datetime64(ts.tz_convert("UTC").tz_localize(None).to_datetime64(), "ns")
+
+def grid_chunk(utc, tz_name):
+    """一塊 UTC 時刻 -> 各欄位的整數陣列 (dict，欄位見 GRID_DTYPES)"""
+    with stage("terms"):
+        local = pd.DatetimeIndex(utc).tz_localize("UTC").tz_convert(tz_name).tz_localize(None).values
+        terms = get_term_table().classify(utc)
+    with stage("hours"):
+        hour = (local - local.astype("datetime64[D]")) // np.timedelta64(1, "h")
+        slot = np.where(hour == 23, 12, (hour + 1) // 2).astype(np.int8)
+        d_diff = ganzhi.day_offset(local.astype("datetime64[D]"))
+        d_gz = ganzhi.day_pillar(d_diff)
+        src_gz = np.where(slot == 12, ganzhi.day_pillar(d_diff + 1), d_gz).astype(np.intp)  # 晚子時取翌日
+        logic_y, zhi_yue, yang = terms["logic_year"], terms["zhi_yue"], terms["is_yang"]
+        return {
+            "utc": utc, "local": local, "slot": slot, "term_idx": terms["term_idx"], "is_yang": yang,
+            "y_gz": ganzhi.year_pillar(logic_y), "m_gz": ganzhi.month_pillar(logic_y, zhi_yue), "d_gz": d_gz,
+            "h_gz": ganzhi.HOUR_GZ_TABLE[src_gz % 10, slot],
+            "y_s": ganzhi.year_star(logic_y), "m_s": ganzhi.month_star(logic_y, zhi_yue),
+            "d_s": ganzhi.day_star(d_diff, yang), "h_s": ganzhi.HOUR_STAR_TABLE[yang.astype(np.intp), src_gz % 12, slot],
+            "ming_gong": ganzhi.MING_GONG_TABLE[zhi_yue.astype(np.intp) - 1, slot],
+        }
+
+def grid_size(start, end, step, tz_name="Asia/Hong_Kong"):
+    """網格的總列數"""
+    step = pd.Timedelta(step).to_timedelta64().astype("timedelta64[ns]")
+    span = _to_utc(end, tz_name) - _to_utc(start, tz_name)
+    return max(0, int(-(-span // step)))
+
+def iter_grid(start, end, step="15min", tz_name="Asia/Hong_Kong", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """[start, end) 每隔 step 的時刻，逐塊產出 grid_chunk 的結果 (除最後一塊外每塊 chunk_rows 列)
+
+    start / end 為日期字串、datetime 或 Timestamp (naive 視為 tz_name 的當地時間)；
+    step 為 pandas 可解析的時間長度 ("15min"、"1min"、"1h" 或 timedelta)。
+    """
+    step = pd.Timedelta(step).to_timedelta64().astype("timedelta64[ns]")
+    if step <= np.timedelta64(0, "ns"):
+        raise ValueError("step 須大於 0")
+    t0 = _to_utc(start, tz_name)
+    total = grid_size(start, end, step, tz_name)
+    for i in range(0, total, chunk_rows):
+        yield grid_chunk(t0 + np.arange(i, min(i + chunk_rows, total)) * step, tz_name)
+
+def decode_chunk(chunk, columns=None):
+    """(輸出用) 一塊整數陣列 -> 字串 DataFrame；columns 為 GRID_DTYPES 的欄位子集"""
+    columns = columns or list(GRID_DTYPES)
+    out = {}
+    for c in columns:
+        if c in DECODE:
+            name, table = DECODE[c]
+            out[name] = table[chunk[c]]
+        else:
+            out[c] = chunk[c]
+    with stage("frame"):
+        return pd.DataFrame(out)
+
+def write_grid_parquet(path, chunks):
+    """逐塊寫入單一 Parquet 檔 (整數欄位，不解碼)，回傳總列數"""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            table = pa.table(chunk)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            with stage("export"):
+                writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="任意解析度的時間網格：逐塊計算四柱、飛星 (整數陣列)")
+    parser.add_argument("--start", default="1976-01-01")
+    parser.add_argument("--end", default="1977-01-01")
+    parser.add_argument("--step", default="15min")
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--out", help="寫入 Parquet 檔 (需要 pyarrow)；省略時只計算並預覽")
+    args = parser.parse_args()
+
+    chunks = iter_grid(args.start, args.end, args.step, args.tz, args.chunk_rows)
+    t0 = time.perf_counter()
+    if args.out:
+        rows = write_grid_parquet(args.out, chunks)
+    else:
+        rows, first = 0, None
+        for chunk in chunks:
+            first = first if first is not None else chunk
+            rows += len(chunk["utc"])
+        if first is not None:
+            print(decode_chunk({k: v[:8] for k, v in first.items()}).to_string())
+    sec = time.perf_counter() - t0
+    print(f"✅ {rows} 列 ({args.step})，{sec:.2f} 秒，{rows / max(sec, 1e-9):,.0f} 列/秒" + (f"，已寫入 {args.out}" if args.out else ""))
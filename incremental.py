@@ -0,0 +1,118 @@
+import argparse
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from export import DatasetWriter, load_manifest, year_spans
+from parallel import load_script
+
+# --- 可接續、可追加的分年生成 ---
+# 輸出為 export.DatasetWriter 的分區資料集 (root/tz=<時區>/year=<年>/part-N)。每完成一個年度分片，
+# 立即寫入該分片並更新 manifest["generation"][時區]：產生器、目標範圍、下一個待算日期 (next)
+# 與跨分片狀態 (產生器留在 df.attrs 的值，如 main4 / main5 的 last_term_idx)。
+#   resume : 中斷後只算 next ~ end 尚未完成的部分
+#   extend : 把 end 往後延 N 日，只算新增的範圍並追加到既有資料集
+# 分片寫到一半中斷時，manifest 仍指向上一個完成的分片；重算時沿用同一個 part 編號覆寫殘檔。
+
+# 腳本 -> (產生函式, 是否接受時區參數)
+GENERATORS = {
+    "main": ("run_comparison", True),
+    "main1": ("run_pro_calendar", False),
+    "main2": ("run_pro_calendar", False),
+    "main3": ("run_final_calendar", True),
+    "main3.1": ("run_final_calendar", True),
+    "main.3.2": ("run_final_calendar", True),
+    "main4": ("run_metaphysics_calendar", True),
+    "main5": ("run_metaphysics_calendar", True),
+}
+
+def _days_between(a, b):
+    return (date.fromisoformat(b) - date.fromisoformat(a)).days
+
+def _generation(root, tz_name):
+    gen = load_manifest(root).get("generation", {}).get(tz_name)
+    if gen is None:
+        raise ValueError(f"{root} 沒有 {tz_name} 的生成紀錄 (請先執行 run)")
+    return gen
+
+def _continue(root, tz_name, gen, progress=None):
+    """從 gen["next"] 算到 gen["end"]，逐年寫入並更新 manifest；回傳最後的生成紀錄"""
+    func, takes_tz = GENERATORS[gen["script"]]
+    fn = getattr(load_script(gen["script"]), func)
+    args = (tz_name,) if takes_tz else ()
+    for chunk_start, chunk_days in year_spans(gen["next"], _days_between(gen["next"], gen["end"])):
+        df = fn(chunk_start, chunk_days, *args, **gen["state"])
+        state = dict(df.attrs)
+        with DatasetWriter(root, tz_name, gen["format"], append=True) as writer:
+            writer.write(df)
+            shard = {"start": chunk_start, "days": chunk_days, "rows": len(df), "state": state}
+            gen = {**gen, "next": (date.fromisoformat(chunk_start) + timedelta(days=chunk_days)).isoformat(),
+                   "state": state, "shards": gen["shards"] + [shard],
+                   "updated": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            writer.generation = gen
+        if progress:
+            progress(tz_name, shard)
+    return gen
+
+def run(root, script, start_str, days, tz_name="Asia/Hong_Kong", fmt="parquet", progress=None):
+    """新建一次生成 (該時區在 root 中不可已有紀錄)"""
+    if script not in GENERATORS:
+        raise ValueError(f"未知腳本 {script} (可用: {', '.join(GENERATORS)})")
+    if tz_name in load_manifest(root).get("generation", {}):
+        raise ValueError(f"{root} 已有 {tz_name} 的生成紀錄，請改用 resume / extend")
+    start = date.fromisoformat(start_str)
+    gen = {
+        "script": script, "format": fmt, "start": start.isoformat(),
+        "end": (start + timedelta(days=days)).isoformat(), "next": start.isoformat(), "state": {}, "shards": [],
+    }
+    return _continue(root, tz_name, gen, progress)
+
+def resume(root, tz_name, progress=None):
+    """接續未完成的範圍 (已完成時不做任何事)"""
+    return _continue(root, tz_name, _generation(root, tz_name), progress)
+
+def extend(root, tz_name, days, progress=None):
+    """在目標範圍之後追加 days 日 (若前次尚未完成，一併補完)"""
+    gen = _generation(root, tz_name)
+    gen["end"] = (date.fromisoformat(gen["end"]) + timedelta(days=days)).isoformat()
+    return _continue(root, tz_name, gen, progress)
+
+def _print_shard(tz_name, shard):
+    print(f"  {tz_name} {shard['start']} +{shard['days']} 日: {shard['rows']} 列 {shard['state'] or ''}", flush=True)
+
+def _print_status(tz_name, gen):
+    done = _days_between(gen["start"], gen["next"])
+    total = _days_between(gen["start"], gen["end"])
+    print(f"{tz_name}: {gen['script']} {gen['start']} ~ {gen['end']} (不含)，已完成 {done}/{total} 日，"
+          f"下一個分片 {gen['next'] if done < total else '—'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="可接續、可追加的分年生成 (輸出為分區資料集)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="新建生成")
+    p.add_argument("root")
+    p.add_argument("--script", default="main3.1", choices=list(GENERATORS))
+    p.add_argument("--start", default="1976-01-01")
+    p.add_argument("--days", type=int, default=365 * 70)
+    p.add_argument("--tz", nargs="+", default=["Asia/Hong_Kong"])
+    p.add_argument("--format", default="parquet", choices=["parquet", "arrow"])
+    for name, help_text in (("resume", "接續中斷的生成"), ("extend", "在既有範圍之後追加"), ("status", "顯示進度")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("root")
+        p.add_argument("--tz", nargs="+", help="預設為資料集中所有有生成紀錄的時區")
+        if name == "extend":
+            p.add_argument("--days", type=int, required=True)
+    args = parser.parse_args()
+
+    zones = args.tz or list(load_manifest(args.root).get("generation", {}))
+    if not zones:
+        sys.exit(f"{args.root} 沒有任何生成紀錄")
+    for tz in zones:
+        if args.cmd == "run":
+            gen = run(args.root, args.script, args.start, args.days, tz, args.format, _print_shard)
+        elif args.cmd == "resume":
+            gen = resume(args.root, tz, _print_shard)
+        elif args.cmd == "extend":
+            gen = extend(args.root, tz, args.days, _print_shard)
+        else:
+            gen = _generation(args.root, tz)
+        _print_status(tz, gen)
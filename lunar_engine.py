@@ -0,0 +1,161 @@
+import numpy as np
+
+from astro import EPHEMERIS_FILE, apparent_solar_longitudes, lunar_elongations, solar_backend
+from ephem_cache import load_cached, save_cached
+from profiling import stage
+from solar_cheb import LUNAR_ARRAYS, get_solar_cheb
+from solar_terms import TERM_SPAN, find_term_instants
+
+# --- 農曆 (定朔定氣) 朔望月表 ---
+# 規則 (以東八區日期為準；1929 年以前用北京地方平時 UTC+7:45:40)：
+#   1. 合朔所在日為初一
+#   2. 冬至所在月為十一月
+#   3. 兩個十一月之間有 13 個月時，第一個不含中氣的月為閏月，沿用上月月名
+# 朔與中氣皆以真黃道 (of date) 視黃經計算，與 lunar_python 的定義一致。
+
+# 月名、日名 (與 lunar_python 的 getMonthInChinese / getDayInChinese 相同)
+MONTH_NAMES = ["", "正", "二", "三", "四", "五", "六", "七", "八", "九", "十", "冬", "腊"]
+DAY_NAMES = ["", "初一", "初二", "初三", "初四", "初五", "初六", "初七", "初八", "初九", "初十",
+             "十一", "十二", "十三", "十四", "十五", "十六", "十七", "十八", "十九", "二十",
+             "廿一", "廿二", "廿三", "廿四", "廿五", "廿六", "廿七", "廿八", "廿九", "三十"]
+LEAP_PREFIX = "闰"
+MONTH_LABELS = np.array(MONTH_NAMES)
+DAY_LABELS = np.array(DAY_NAMES)
+
+CHINA_OFFSET = np.timedelta64(8, "h")
+BEIJING_LMT_OFFSET = np.timedelta64(7 * 3600 + 45 * 60 + 40, "s")  # 東經 116°25'
+LMT_UNTIL = np.datetime64("1929-01-01T00:00", "ns")
+
+# 實際頒行曆書與定朔推算不同的月份 (推算初一 -> 曆書初一)
+#   1906: 清《時憲曆》合朔在子夜前數分鐘，曆書仍以翌日為初一
+MONTH_START_CORRECTIONS = {
+    np.datetime64("1906-04-23"): np.datetime64("1906-04-24"),
+}
+DONGZHI = 18  # 冬至 (270 度)
+
+_NS_PER_DAY = 86400 * 10**9
+
+def find_new_moons(t0, t1, tol_seconds=1e-3):
+    """找出 [t0, t1] 之間每一次合朔的 UTC 時刻 (datetime64[ns])
+
+    每日取樣月日黃經差，找出 360 -> 0 的折返，再對所有合朔同時做牛頓迭代。
+    """
+    days = np.arange(np.datetime64(t0, "D"), np.datetime64(t1, "D") + 1).astype("datetime64[ns]")
+    elong = lunar_elongations(days)
+    cross = np.nonzero(elong[1:] < elong[:-1])[0]
+
+    rate = (elong[cross + 1] - elong[cross]) % 360  # 約 10 ~ 15 度/日
+    t = days[cross] + (((360 - elong[cross]) / rate) * _NS_PER_DAY).astype("timedelta64[ns]")
+    for _ in range(12):
+        err = (lunar_elongations(t) + 180) % 360 - 180
+        step = (err / rate * _NS_PER_DAY).astype("timedelta64[ns]")
+        t = t - step
+        if np.abs(step / np.timedelta64(1, "s")).max() < tol_seconds:
+            break
+    return t
+
+def china_days(instants):
+    """UTC 時刻 -> 中國曆法日期 (datetime64[D])"""
+    t = np.asarray(instants, dtype="datetime64[ns]")
+    offset = np.where(t < LMT_UNTIL, BEIJING_LMT_OFFSET.astype("timedelta64[ns]"), CHINA_OFFSET.astype("timedelta64[ns]"))
+    return (t + offset).astype("datetime64[D]")
+
+def build_month_table(start_year, end_year):
+    """計算 span 內每個農曆月的 (初一日期, 月序 1-12, 是否閏月)"""
+    term_t, term_k = find_term_instants(start_year, end_year, lon_fn=apparent_solar_longitudes)
+    term_days = china_days(term_t)
+    zhongqi = term_days[term_k % 2 == 0]        # 中氣：黃經為 30 的倍數
+    dongzhi = term_days[term_k == DONGZHI]
+
+    new_moons = find_new_moons(f"{start_year - 1}-11-01", f"{end_year + 1}-03-01")
+    nm_days = china_days(new_moons)
+    for computed, recorded in MONTH_START_CORRECTIONS.items():
+        nm_days[nm_days == computed] = recorded
+
+    # 每個月 [初一, 下月初一) 內的中氣數
+    zq_pos = np.searchsorted(zhongqi, nm_days, side="left")
+    zq_count = np.diff(zq_pos)
+
+    # 各冬至所在月的位置
+    m11 = np.searchsorted(nm_days, dongzhi, side="right") - 1
+
+    starts, nums, leaps = [], [], []
+    for ia, ib in zip(m11[:-1], m11[1:]):
+        leap_at = -1
+        if ib - ia == 13:
+            no_zq = np.nonzero(zq_count[ia + 1:ib] == 0)[0]
+            if len(no_zq):
+                leap_at = ia + 1 + no_zq[0]
+        num = 10
+        for i in range(ia, ib):
+            if i != leap_at:
+                num = num % 12 + 1
+            starts.append(nm_days[i])
+            nums.append(num)
+            leaps.append(i == leap_at)
+    # 最後一個月的結束日 (下一個十一月的初一) 作為表尾
+    starts.append(nm_days[m11[-1]])
+    return np.array(starts, dtype="datetime64[D]"), np.array(nums, dtype=np.int8), np.array(leaps, dtype=np.bool_)
+
+class LunarTable:
+    """朔望月表：整段日期以 searchsorted 一次對應到農曆月、日"""
+
+    def __init__(self, month_start, month_num, is_leap, span):
+        self.month_start = np.asarray(month_start, dtype="datetime64[D]")  # 比月數多一筆 (表尾)
+        self.month_num = np.asarray(month_num, dtype=np.int8)
+        self.is_leap = np.asarray(is_leap, dtype=np.bool_)
+        self.span = tuple(span)
+
+    def lookup(self, dates):
+        """回傳 (月序, 是否閏月, 日) 三個陣列；dates 為 date 列表或 datetime64 陣列"""
+        d = np.asarray(dates, dtype="datetime64[D]")
+        pos = np.searchsorted(self.month_start, d, side="right") - 1
+        if len(pos) and (pos.min() < 0 or pos.max() >= len(self.month_num)):
+            raise ValueError(f"日期超出農曆表範圍 {self.month_start[0]} ~ {self.month_start[-1]}")
+        day = (d - self.month_start[pos]).astype(np.int64) + 1
+        return self.month_num[pos], self.is_leap[pos], day.astype(np.int8)
+
+    def labels(self, dates):
+        """回傳 (月名, 日名) 兩個字串陣列，如 ('闰六', '初六')"""
+        month, leap, day = self.lookup(dates)
+        month_label = np.where(leap, np.char.add(LEAP_PREFIX, MONTH_LABELS[month]), MONTH_LABELS[month])
+        return month_label, DAY_LABELS[day]
+
+    def strings(self, dates, month_suffix="月", sep=""):
+        """批次產生農曆字串，預設格式 '正月初一'"""
+        month_label, day_label = self.labels(dates)
+        return np.char.add(np.char.add(np.char.add(month_label, month_suffix), sep), day_label).tolist()
+
+_TABLES = {}
+
+def _shipped_arrays(span):
+    """沒有星曆時 (Chebyshev 模式) 改用 solar_cheb 資料檔內附的朔望月表 (年份範圍須相同)"""
+    model = get_solar_cheb()
+    if model.lunar is None or tuple(model.meta["span"]) != span:
+        raise FileNotFoundError(f"沒有星曆檔 {EPHEMERIS_FILE}，且 Chebyshev 資料檔未附 {span[0]}-{span[1]} 的朔望月表")
+    return {k: model.lunar[k] for k in LUNAR_ARRAYS}
+
+def build_lunar_table(span=TERM_SPAN, use_cache=True):
+    """建立朔望月表；有效的磁碟快取存在時直接映射，不載入星曆；Chebyshev 模式時用資料檔內附的表"""
+    span = tuple(span)
+    arrays = load_cached("lunar", span) if use_cache else None
+    if arrays is None and solar_backend() == "cheb":
+        arrays = _shipped_arrays(span)
+    if arrays is None:
+        starts, nums, leaps = build_month_table(*span)
+        arrays = {"month_start": starts.astype(np.int64), "month_num": nums, "is_leap": leaps}
+        if use_cache:
+            save_cached("lunar", span, arrays)
+    return LunarTable(arrays["month_start"].view("datetime64[D]"), arrays["month_num"], arrays["is_leap"], span)
+
+def get_lunar_table(span=TERM_SPAN):
+    """取得 (並在本行程內重用) 指定年份範圍的朔望月表"""
+    span = tuple(span)
+    if span not in _TABLES:
+        _TABLES[span] = build_lunar_table(span)
+    return _TABLES[span]
+
+def lunar_strings(dates, month_suffix="月", sep=""):
+    """整段日期轉農曆字串 (如 '正月初一')"""
+    with stage("lunar"):
+        return get_lunar_table().strings(dates, month_suffix, sep)
@@ -1,17 +1,17 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
-from skyfield import api
-from lunar_python import Lunar
-
-# --- 初始化天文引擎 ---
-ts = api.load.timescale()
-try:
-    eph = api.load('de421.bsp')
-except:
-    print("❌ 找不到 de421.bsp 文件，請確保該文件在同一目錄下。")
-    exit()
-sun, earth = eph['sun'], eph['earth']
+from astro import solar_longitudes
+from solar_terms import get_term_table, local_times_utc
+from day_window import DayWindow
+from lunar_engine import lunar_strings
+from export import DatasetWriter, XlsxStreamWriter, iter_year_chunks
+from parallel import WORKERS, iter_parallel_chunks
+from profiling import stage, staged
+
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 1. 基礎字典與對照表 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -41,20 +41,15 @@ NAYIN = {
 # --- 2. 核心計算函數 ---
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    lon = earth.at(t).observe(sun).ecliptic_latlon()[1].degrees
-    return lon
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_gz_prop(gz_str):
     if not gz_str or len(gz_str) < 2: return ""
     return f"{GAN_PROPS.get(gz_str[0], '')}{ZHI_PROPS.get(gz_str[1], '')}"
 
 def get_lunar_str(dt_date):
-    try:
-        dt_val = datetime.combine(dt_date, time(12, 0))
-        lunar = Lunar.fromDate(dt_val)
-        return f"{lunar.getMonthInChinese()}月{lunar.getDayInChinese()}"
-    except: return ""
+    return lunar_strings([dt_date])[0]
 
 def get_hour_gz_detailed(day_gan, hour_name, is_late_rat=False, next_day_gan=None):
     offset = {"甲": 0, "己": 0, "乙": 2, "庚": 2, "丙": 4, "辛": 4, "丁": 6, "壬": 6, "戊": 8, "癸": 8}
@@ -63,19 +58,17 @@ def get_hour_gz_detailed(day_gan, hour_name, is_late_rat=False, next_day_gan=Non
     zhi_idx = ZHI.index(hour_name[0]) if "子" not in hour_name else 0
     return GAN[(start_gan_idx + zhi_idx) % 10] + ZHI[zhi_idx]
 
-def get_day_basic_data(dt_date, tz_info):
+def get_day_basic_data(dt_date, tz_info, term=None):
     utc_dt = tz_info.localize(datetime.combine(dt_date, time(12, 0))).astimezone(pytz.utc)
-    lon = get_solar_lon(utc_dt)
+    if term is None: term = get_term_table().classify([utc_dt])[0]
     
     # 1. 邏輯年 (立春界定) 與 年納音修正
-    logic_y = dt_date.year
-    if lon < 315 and dt_date.month <= 3: logic_y -= 1
+    logic_y = int(term["logic_year"])
     y_gz = GAN[(logic_y - 4) % 10] + ZHI[(logic_y - 4) % 12]
     y_nayin = NAYIN.get(y_gz, "") # 2025年1月1日會得到甲辰年的覆燈火 (佛燈火)
 
     # 2. 月柱與月飛星修正
-    shifted_lon = (lon - 315) % 360
-    zhi_yue = int(shifted_lon // 30) + 1 # 1=寅, 2=卯... 11=子, 12=丑
+    zhi_yue = int(term["zhi_yue"]) # 1=寅, 2=卯... 11=子, 12=丑
     m_gz = GAN[((logic_y % 5 * 2) + zhi_yue + 1) % 10] + ZHI[(zhi_yue + 1) % 12]
     
     # 月飛星規則：子午卯酉年起8，辰戌丑未年起5，寅申巳亥年起2 (逆行)
@@ -88,7 +81,7 @@ def get_day_basic_data(dt_date, tz_info):
     ref_day = datetime(2025, 12, 21).date()
     d_diff = (dt_date - ref_day).days
     day_gz = GAN[d_diff % 10] + ZHI[d_diff % 12]
-    is_yang = not (90 <= lon < 270)
+    is_yang = bool(term["is_yang"])
     
     return {
         "y_gz": y_gz, "y_nayin": y_nayin, "m_gz": m_gz, "m_s": m_s, 
@@ -96,37 +89,68 @@ def get_day_basic_data(dt_date, tz_info):
         "is_yang": is_yang, "day_gan": day_gz[0], "day_zhi": day_gz[1]
     }
 
-def run_final_calendar(start_str, days, tz_name):
-    start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
+def _zone_rows(start_d, days, lunar_strs, tz_name):
+    """單一時區的投影：當地中午 -> UTC 查交節表，逐日展開時段"""
     target_tz = pytz.timezone(tz_name)
     rows = []
+    # 一次向量化換算 [當日 ... 翌日] 的當地中午並查表分類
+    noon_utc, _ = local_times_utc(np.arange(np.datetime64(start_d), np.datetime64(start_d) + days + 1), tz_name)
+    noon_terms = get_term_table().classify(noon_utc)
+    window = DayWindow(lambda k: get_day_basic_data(start_d + timedelta(days=k), target_tz, noon_terms[k]), behind=False)
     
-    for i in range(days):
+    for i, _, d, d_next in staged("rows", window(days)):
         curr_date = start_d + timedelta(days=i)
-        d = get_day_basic_data(curr_date, target_tz)
-        d_next = get_day_basic_data(curr_date + timedelta(days=1), target_tz)
         
         time_slots = [(0, "早子時", "00-01", False), (6, "午時", "11-13", False), (0, "晚子時", "23-24", True)] # 簡化範例，實際可補全13時段
         
         for idx, name, period, is_late in time_slots:
             h_gz = get_hour_gz_detailed(d["day_gan"], name, is_late, d_next["day_gan"])
             rows.append({
-                "日期": curr_date, "農曆": get_lunar_str(curr_date), "時段": name,
+                "日期": curr_date, "農曆": lunar_strs[i], "時段": name,
                 "年柱": d["y_gz"], "年納音": d["y_nayin"], 
                 "月柱": d["m_gz"], "月飛星": d["m_s"], "月星五行": d["m_s_wuxing"],
                 "日柱": d["d_gz"], "時柱": h_gz, "時區": tz_name
             })
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        return pd.DataFrame(rows)
+
+def run_final_calendar(start_str, days, tz_name):
+    """tz_name 可為單一時區或時區列表；列表時回傳 {時區: DataFrame}，農曆只計算一次"""
+    start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
+    lunar_strs = lunar_strings([start_d + timedelta(days=i) for i in range(days)])
+    if isinstance(tz_name, str):
+        return _zone_rows(start_d, days, lunar_strs, tz_name)
+    return {tz: _zone_rows(start_d, days, lunar_strs, tz) for tz in tz_name}
+
+DATASET_ROOT = "calendar_dataset"
+
+def export_calendar(outputs, start_str="1976-01-01", days=365*70, dataset_root=DATASET_ROOT):
+    """outputs 為 {時區: XLSX 路徑}；逐年只生成一次 (農曆共用)，同時串流寫入各時區的 XLSX
+    與 (時區, 年) 分區的 Parquet 資料集；未安裝 pyarrow 時只寫 XLSX"""
+    try:
+        datasets = {tz: DatasetWriter(dataset_root, tz) for tz in outputs}
+    except ImportError as e:
+        print(f"⚠️ {e}，略過 Parquet 輸出")
+        datasets = {}
+    writers = {tz: XlsxStreamWriter(path) for tz, path in outputs.items()}
+    if WORKERS > 1:  # BCCAL_WORKERS > 1 時以行程池分年平行生成
+        chunks = iter_parallel_chunks("main.3.2", "run_final_calendar", start_str, days, list(outputs), workers=WORKERS)
+    else:
+        chunks = iter_year_chunks(run_final_calendar, start_str, days, list(outputs))
+    for frames in chunks:
+        for tz, df in frames.items():
+            writers[tz].write(df)
+            if datasets:
+                datasets[tz].write(df)
+    for w in list(writers.values()) + list(datasets.values()):
+        w.close()
 
 if __name__ == "__main__":
-    # 輸出 1: 香港
-    print("正在生成香港 (HK) 曆法...")
-    df_hk = run_final_calendar("1976-01-01", 365*70, "Asia/Hong_Kong")
-    df_hk.to_excel("3.2Calendar_1976_HK_Updated.xlsx", index=False)
-    
-    # 輸出 2: 英國
-    print("正在生成英國 (UK) 曆法...")
-    df_uk = run_final_calendar("1976-01-01", 365*70, "Europe/London")
-    df_uk.to_excel("3.2Calendar_1976_UK_Updated.xlsx", index=False)
+    # 逐年生成並串流寫入 (每年一個工作表；Parquet 資料集見 calendar_dataset/manifest.json)
+    # 香港與英國一次生成，分別輸出
+    print("正在生成香港 (HK) 與英國 (UK) 曆法...")
+    export_calendar({"Asia/Hong_Kong": "3.2Calendar_1976_HK_Updated.xlsx",
+                     "Europe/London": "3.2Calendar_1976_UK_Updated.xlsx"})
     
     print("✅ 重做完成！已生成 HK 與 UK 兩份檔案。")
\ No newline at end of file
@@ -2,12 +2,13 @@ import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
 import os
-from skyfield import api
+from astro import solar_longitudes
+from solar_terms import get_term_table
+from day_window import DayWindow
+from profiling import stage, staged
 
-# --- 初始化天文引擎 ---
-ts = api.load.timescale()
-eph = api.load('de421.bsp')
-sun, earth = eph['sun'], eph['earth']
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 常數與對照表定義 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -40,16 +41,13 @@ SOLAR_TERMS = [
 ]
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
-def get_day_star(dt_utc, lon):
+def get_day_star(dt_utc, is_yang):
     """計算日飛星"""
     ref_date = datetime(2025, 12, 21, tzinfo=pytz.utc)
     diff = (dt_utc.date() - ref_date.date()).days
-    is_yang = not (90 <= lon < 270)
     val = (1 + diff) % 9 if is_yang else (9 - diff) % 9
     return STARS[val if val > 0 else val + 9]
 
@@ -58,22 +56,20 @@ def get_gz_prop(gz_str):
     if len(gz_str) != 2: return ""
     return f"{GAN_PROPS.get(gz_str[0], '')}{ZHI_PROPS.get(gz_str[1], '')}"
 
-def get_ts_data(dt_date, tz_str):
+def get_ts_data(dt_date, tz_str, term=None):
     tz = pytz.timezone(tz_str)
     # 取當地中午 12:00 作為觀測點
     local_dt = tz.localize(datetime.combine(dt_date, time(12, 0)))
     utc_dt = local_dt.astimezone(pytz.utc)
 
-    lon = get_solar_lon(utc_dt)
-    term_idx = int(lon // 15) # 節氣索引
+    if term is None:
+        term = get_term_table().classify([utc_dt])[0]
+    term_idx = int(term["term_idx"]) # 節氣索引
 
     # 1. 支月與術數年 (立春315為界)
-    shifted_lon = (lon - 315) % 360
-    zhi_yue = int(shifted_lon // 30) + 1
+    zhi_yue = int(term["zhi_yue"])
 
-    logic_y = dt_date.year
-    if lon < 315 and dt_date.month <= 3:
-        logic_y -= 1
+    logic_y = int(term["logic_year"])
 
     # 2. 年月日干支
     y_idx = (logic_y - 4) % 12
@@ -90,7 +86,7 @@ def get_ts_data(dt_date, tz_str):
     base = 8 if ZHI[y_idx] in "子午卯酉" else (2 if ZHI[y_idx] in "寅申巳亥" else 5)
     m_star_val = (base - (zhi_yue - 1)) % 9
     m_star = STARS[m_star_val if m_star_val > 0 else m_star_val + 9]
-    d_star = get_day_star(utc_dt, lon)
+    d_star = get_day_star(utc_dt, bool(term["is_yang"]))
 
     return {
         "term_idx": term_idx,
@@ -102,12 +98,21 @@ def run_comparison(start_str, days, input_tz):
     start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
     rows = []
     
-    for i in range(days):
+    # 一次查表分類 [前一日 ... 最後一日] 的當地中午
+    tz = pytz.timezone(input_tz)
+    with stage("terms"):
+        noon_terms = get_term_table().classify([
+            tz.localize(datetime.combine(start_d + timedelta(days=i), time(12, 0)))
+            for i in range(-1, days)
+        ])
+    
+    # 滾動窗口：每日數據只計算一次，前一日沿窗口傳遞
+    window = DayWindow(lambda k: get_ts_data(start_d + timedelta(days=k), input_tz, noon_terms[k + 1]), ahead=False)
+    
+    for i, prev_d, d, _ in staged("rows", window(days)):
         curr = start_d + timedelta(days=i)
-        d = get_ts_data(curr, input_tz)
         
         # 節氣顯示邏輯：比對前一天，若索引改變則顯示節氣名稱
-        prev_d = get_ts_data(curr - timedelta(days=1), input_tz)
         display_term = SOLAR_TERMS[d["term_idx"]] if d["term_idx"] != prev_d["term_idx"] else ""
 
         rows.append({
@@ -120,7 +125,9 @@ def run_comparison(start_str, days, input_tz):
             "月星": d["month_star"], "月星五行": STAR_WUXING[d["month_star"]],
             "日星": d["day_star"], "日星五行": STAR_WUXING[d["day_star"]]
         })
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        return pd.DataFrame(rows)
 
 # --- 執行與匯出 ---
 if __name__ == "__main__":
@@ -133,11 +140,13 @@ if __name__ == "__main__":
 
     # 1. 匯出 CSV (utf_8_sig 確保 Excel 中文不亂碼)
     csv_file = "calendar_output.csv"
-    df.to_csv(csv_file, index=False, encoding='utf_8_sig')
+    with stage("export"):
+        df.to_csv(csv_file, index=False, encoding='utf_8_sig')
     
     # 2. 匯出 Excel
     excel_file = "calendar_output.xlsx"
-    df.to_excel(excel_file, index=False, engine='openpyxl')
+    with stage("export"):
+        df.to_excel(excel_file, index=False, engine='openpyxl')
 
     print(f"--- 數據計算完成 ---")
     print(f"1. CSV 已儲存至: {os.path.abspath(csv_file)}")
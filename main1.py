@@ -2,12 +2,13 @@ import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
 import os
-from skyfield import api
+from astro import solar_longitudes
+from solar_terms import get_term_table
+from day_window import DayWindow
+from profiling import stage, staged
 
-# --- 初始化天文引擎 ---
-ts = api.load.timescale()
-eph = api.load('de421.bsp')
-sun, earth = eph['sun'], eph['earth']
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 常數與對照表 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -19,10 +20,8 @@ ZHI_PROPS = {"子": "陽水", "丑": "陰土", "寅": "陽木", "卯": "陰木",
 SOLAR_TERMS = ["春分", "清明", "穀雨", "立夏", "小滿", "芒種", "夏至", "小暑", "大暑", "立秋", "處暑", "白露", "秋分", "寒露", "霜降", "立冬", "小雪", "大雪", "冬至", "小寒", "大寒", "立春", "雨水", "驚蟄"]
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_gz_prop(gz_str):
     if not gz_str or len(gz_str) < 2: return ""
@@ -53,21 +52,19 @@ def get_hour_star(is_yang, day_zhi, hour_idx):
         val = (start_val - hour_idx - 1) % 9 + 1
     return STARS[val]
 
-def get_day_basic_data(dt_date):
+def get_day_basic_data(dt_date, term=None):
     # 這裡計算當天的基本年、月、日柱與順逆
     # 為簡化邏輯，假設中午 12:00 為基準點
     utc_noon = pytz.utc.localize(datetime.combine(dt_date, time(12, 0)))
-    lon = get_solar_lon(utc_noon)
-    term_idx = int(lon // 15)
-    is_yang = not (90 <= lon < 270)
+    if term is None: term = get_term_table().classify([utc_noon])[0]
+    term_idx = int(term["term_idx"])
+    is_yang = bool(term["is_yang"])
     
     # 年、月柱 (立春換年)
-    logic_y = dt_date.year
-    if lon < 315 and dt_date.month <= 3: logic_y -= 1
+    logic_y = int(term["logic_year"])
     y_gz = GAN[(logic_y - 4) % 10] + ZHI[(logic_y - 4) % 12]
     
-    shifted_lon = (lon - 315) % 360
-    zhi_yue = int(shifted_lon // 30) + 1
+    zhi_yue = int(term["zhi_yue"])
     m_gz = GAN[(logic_y % 5 * 2 + zhi_yue + 1) % 10] + ZHI[(zhi_yue + 1) % 12]
     
     # 日柱
@@ -90,15 +87,20 @@ def run_pro_calendar(start_str, days):
     start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
     rows = []
     
-    for i in range(days):
+    # 一次查表分類 [前一日 ... 翌日] 的 UTC 中午
+    with stage("terms"):
+        noon_terms = get_term_table().classify([
+            pytz.utc.localize(datetime.combine(start_d + timedelta(days=i), time(12, 0)))
+            for i in range(-1, days + 1)
+        ])
+    
+    # 滾動窗口：每日基礎數據只計算一次，前一日 / 翌日沿窗口傳遞
+    window = DayWindow(lambda k: get_day_basic_data(start_d + timedelta(days=k), noon_terms[k + 1]))
+    
+    for i, prev_d_data, d, d_next in staged("rows", window(days)):
         curr_date = start_d + timedelta(days=i)
-        next_date = curr_date + timedelta(days=1)
-        
-        d = get_day_basic_data(curr_date)
-        d_next = get_day_basic_data(next_date)
         
         # 節氣顯示
-        prev_d_data = get_day_basic_data(curr_date - timedelta(days=1))
         display_term = SOLAR_TERMS[d["term_idx"]] if d["term_idx"] != prev_d_data["term_idx"] else ""
 
         # 定義 13 個時段
@@ -137,16 +139,19 @@ def run_pro_calendar(start_str, days):
                 "日星": d["d_s"], "日星五行": STAR_WUXING[d["d_s"]],
                 "時星": h_s, "時星五行": STAR_WUXING[h_s]
             })
-            
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        return pd.DataFrame(rows)
 
 # --- 執行 ---
 if __name__ == "__main__":
     df = run_pro_calendar("1978-01-01", 365) # 測試 5 天，每天 13 行
     
     # 匯出
-    df.to_csv("calendar_early_late_rat.csv", index=False, encoding='utf_8_sig')
-    df.to_excel("calendar_early_late_rat.xlsx", index=False, engine='openpyxl')
+    with stage("export"):
+        df.to_csv("calendar_early_late_rat.csv", index=False, encoding='utf_8_sig')
+    with stage("export"):
+        df.to_excel("calendar_early_late_rat.xlsx", index=False, engine='openpyxl')
     
     print("✅ 已修正早子時、晚子時邏輯並匯出檔案。")
     print(df.head(13).to_string()) # 預覽第一天的完整 13 個時段
\ No newline at end of file
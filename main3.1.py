@@ -1,159 +1,46 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta, time
-import pytz
-from skyfield import api
-from lunar_python import Lunar  # 需安裝: pip install lunar_python
-
-# --- 初始化天文引擎 ---
-# 請確保目錄下有 'de421.bsp' 文件
-ts = api.load.timescale()
-try:
-    eph = api.load('de421.bsp')
-except:
-    print("❌ 找不到 de421.bsp 文件，請確保該文件在同一目錄下。")
-    exit()
-    
-sun, earth = eph['sun'], eph['earth']
+from datetime import datetime, time
+from astro import solar_longitudes
+from solar_terms import SOLAR_TERMS, get_term_table, local_times_utc, slot_bounds_utc
+from lunar_engine import lunar_strings
+from export import XlsxStreamWriter, iter_year_chunks
+from parallel import WORKERS, iter_parallel_chunks
+from profiling import stage
+import ganzhi
+from ganzhi import STARS, TIME_SLOTS, SLOT_NAMES, SLOT_PERIODS
+
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 1. 基礎字典與對照表 ---
-STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
-STAR_WUXING = {"一白": "水", "二黑": "土", "三碧": "木", "四綠": "木", "五黃": "土", "六白": "金", "七赤": "金", "八白": "土", "九紫": "火"}
-
-GAN = list("甲乙丙丁戊己庚辛壬癸")
-ZHI = list("子丑寅卯辰巳午未申酉戌亥")
-
-# 五行屬性字典
-GAN_PROPS = {"甲": "陽木", "乙": "陰木", "丙": "陽火", "丁": "陰火", "戊": "陽土", "己": "陰土", "庚": "陽金", "辛": "陰金", "壬": "陽水", "癸": "陰水"}
-ZHI_PROPS = {"子": "陽水", "丑": "陰土", "寅": "陽木", "卯": "陰木", "辰": "陽土", "巳": "陰火", "午": "陽火", "未": "陰土", "申": "陽金", "酉": "陰金", "戌": "陽土", "亥": "陰水"}
-
-SOLAR_TERMS = ["春分", "清明", "穀雨", "立夏", "小滿", "芒種", "夏至", "小暑", "大暑", "立秋", "處暑", "白露", "秋分", "寒露", "霜降", "立冬", "小雪", "大雪", "冬至", "小寒", "大寒", "立春", "雨水", "驚蟄"]
-
-# 納音表
-NAYIN = {
-    "甲子": "海中金", "乙丑": "海中金", "丙寅": "爐中火", "丁卯": "爐中火", "戊辰": "大林木", "己巳": "大林木",
-    "庚午": "路旁土", "辛未": "路旁土", "壬申": "劍鋒金", "癸酉": "劍鋒金", "甲戌": "山頭火", "乙亥": "山頭火",
-    "丙子": "澗下水", "丁丑": "澗下水", "戊寅": "城頭土", "己卯": "城頭土", "庚辰": "白蠟金", "辛巳": "白蠟金",
-    "壬午": "楊柳木", "癸未": "楊柳木", "甲申": "泉中水", "乙酉": "泉中水", "丙戌": "屋上土", "丁亥": "屋上土",
-    "戊子": "霹靂火", "己丑": "霹靂火", "庚寅": "松柏木", "辛卯": "松柏木", "壬辰": "長流水", "癸巳": "長流水",
-    "甲午": "砂中金", "乙未": "砂中金", "丙申": "山下火", "丁酉": "山下火", "戊戌": "平地木", "己亥": "平地木",
-    "庚子": "壁上土", "辛丑": "壁上土", "壬寅": "金箔金", "癸卯": "金箔金", "甲辰": "覆燈火", "乙巳": "覆燈火",
-    "丙午": "天河水", "丁未": "天河水", "戊申": "大驛土", "己酉": "大驛土", "庚戌": "釵釧金", "辛亥": "釵釧金",
-    "壬子": "桑柘木", "癸丑": "桑柘木", "甲寅": "大溪水", "乙卯": "大溪水", "丙辰": "沙中土", "丁巳": "沙中土",
-    "戊午": "天上火", "己未": "天上火", "庚申": "石榴木", "辛酉": "石榴木", "壬戌": "大海水", "癸亥": "大海水"
-}
+# 干支、星、屬性、納音、13 時段等對照表統一定義於 ganzhi.py (整數核心 + 60 甲子查找表)
+TERM_NAMES = np.array(SOLAR_TERMS, dtype=object)
 
 # --- 2. 核心計算函數 ---
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
-
-def get_gz_prop(gz_str):
-    """獲取干支屬性 (如: 陽木陽水)"""
-    if not gz_str or len(gz_str) < 2: return ""
-    return f"{GAN_PROPS.get(gz_str[0], '')}{ZHI_PROPS.get(gz_str[1], '')}"
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_lunar_str(dt_date):
-    """(新增) 獲取農曆字串，如 '正月初一'"""
-    try:
-        # 將 date 轉為 datetime 以避免庫報錯
-        dt_val = datetime.combine(dt_date, time(12, 0))
-        lunar = Lunar.fromDate(dt_val)
-        return f"{lunar.getMonthInChinese()}月{lunar.getDayInChinese()}"
-    except Exception as e:
-        return ""
-
-def get_tai_yuan(m_gz):
-    """胎元：月干進一，月支配三"""
-    if not m_gz: return ""
-    g_idx = (GAN.index(m_gz[0]) + 1) % 10
-    z_idx = (ZHI.index(m_gz[1]) + 3) % 12
-    return GAN[g_idx] + ZHI[z_idx]
-
-def get_ming_gong(zhi_yue, h_zhi):
-    """命宮：(14 或 26) - (月支數 + 時支數)"""
-    m_val = (ZHI.index(ZHI[(zhi_yue + 1) % 12]) + 1) 
-    h_val = ZHI.index(h_zhi) + 1
-    mg_idx = (14 - (m_val + h_val)) % 12
-    if mg_idx <= 0: mg_idx += 12
-    return ZHI[mg_idx-1] + "宮"
-
-def get_hour_gz_detailed(day_gan, hour_name, is_late_rat=False, next_day_gan=None):
-    """時柱計算 (含早晚子時邏輯)"""
-    offset = {"甲": 0, "己": 0, "乙": 2, "庚": 2, "丙": 4, "辛": 4, "丁": 6, "壬": 6, "戊": 8, "癸": 8}
-    target_gan = next_day_gan if is_late_rat else day_gan
-    start_gan_idx = offset.get(target_gan, 0)
-    zhi_idx = ZHI.index(hour_name[0]) if "子" not in hour_name else 0
-    h_gan = GAN[(start_gan_idx + zhi_idx) % 10]
-    return h_gan + ZHI[zhi_idx]
-
-def get_hour_star_pro(is_yang, day_zhi, hour_idx, is_late_rat=False, next_day_is_yang=None, next_day_zhi=None):
-    """時星計算 (含晚子時隔日邏輯)"""
-    u_yang = next_day_is_yang if is_late_rat else is_yang
-    u_zhi = next_day_zhi if is_late_rat else day_zhi
-    u_h_idx = 0 if is_late_rat else hour_idx
-    
-    if u_yang: # 陽遁
-        start_val = 1 if u_zhi in "子午卯酉" else (7 if u_zhi in "寅申巳亥" else 4)
-        val = (start_val + u_h_idx - 1) % 9 + 1
-    else: # 陰遁
-        start_val = 9 if u_zhi in "子午卯酉" else (3 if u_zhi in "寅申巳亥" else 6)
-        val = (start_val - u_h_idx - 1) % 9 + 1
-    return STARS[val]
-
-def get_day_basic_data(dt_date, tz_info):
-    """計算當日基礎參數，需傳入時區以轉換UTC計算節氣"""
-    # 構造當日中午時間，並轉為UTC以獲取精確太陽黃經
-    local_noon = datetime.combine(dt_date, time(12, 0))
-    local_dt = tz_info.localize(local_noon)
-    utc_dt = local_dt.astimezone(pytz.utc)
-    
-    lon = get_solar_lon(utc_dt)
-    term_idx = int(lon // 15)
-    is_yang = not (90 <= lon < 270)
-    
-    # 1. 計算邏輯年 (立春分界)
-    logic_y = dt_date.year
-    if lon < 315 and dt_date.month <= 3: logic_y -= 1
-    
-    # 年柱 (年干支)
-    y_gan_idx = (logic_y - 4) % 10 # 獲取年干索引 (甲=0)
-    y_gz = GAN[y_gan_idx] + ZHI[(logic_y - 4) % 12]
-    
-    # 2. 月柱計算 (修正版)
-    # 立春 315 度 = 寅月 (1)
-    shifted_lon = (lon - 315) % 360
-    zhi_yue = int(shifted_lon // 30) + 1
-    
-    # 五虎遁：甲己之年丙作首。即 (年干索引 % 5) * 2 + 2 = 寅月天干索引
-    # zhi_yue 為 1 (寅), 2 (卯)...
-    # 公式：(年干索引 % 5 * 2 + 2 + (zhi_yue - 1)) % 10
-    # 簡化後：(年干索引 % 5 * 2 + zhi_yue + 1) % 10
-    m_gan_idx = (y_gan_idx % 5 * 2 + zhi_yue + 1) % 10
-    m_gz = GAN[m_gan_idx] + ZHI[(zhi_yue + 1) % 12]
-    
-    # 日柱
-    ref_day = datetime(2025, 12, 21).date()
-    d_diff = (dt_date - ref_day).days
-    day_gz = GAN[d_diff % 10] + ZHI[d_diff % 12]
-    
-    # 飛星
-    y_s_val = (3 - (logic_y - 2024)) % 9
-    y_s = STARS[y_s_val if y_s_val > 0 else y_s_val + 9]
-    base = 8 if ZHI[(logic_y - 4) % 12] in "子午卯酉" else (2 if ZHI[(logic_y - 4) % 12] in "寅申巳亥" else 5)
-    m_s_val = (base - (zhi_yue - 1)) % 9
-    m_s = STARS[m_s_val if m_s_val > 0 else m_s_val + 9]
-    d_s_val = (1 + d_diff) % 9 if is_yang else (9 - d_diff) % 9
-    d_s = STARS[d_s_val if d_s_val > 0 else d_s_val + 9]
-
+    """獲取農曆字串，如 '正月初一' (查朔望月表，超出範圍時拋出 ValueError)"""
+    return lunar_strings([dt_date])[0]
+
+def get_day_basic_data(dt_date, tz_info, term=None):
+    """計算當日基礎參數，需傳入時區以轉換UTC計算節氣 (term 可由交節表批次預先分類)"""
+    if term is None:
+        # 構造當日中午時間，並轉為UTC後查交節表
+        local_noon = tz_info.localize(datetime.combine(dt_date, time(12, 0)))
+        term = get_term_table().classify([local_noon])[0]
+    d = {k: v[0] for k, v in ganzhi.day_arrays([dt_date], np.array([term])).items()}
+    y_gz, m_gz, d_gz = (str(ganzhi.GZ_NAMES[d[k]]) for k in ("y_gz", "m_gz", "d_gz"))
     return {
-        "y_gz": y_gz, "m_gz": m_gz, "d_gz": day_gz, 
-        "y_s": y_s, "m_s": m_s, "d_s": d_s, 
-        "is_yang": is_yang, "term_idx": term_idx, 
-        "day_gan": day_gz[0], "day_zhi": day_gz[1],
-        "zhi_yue": zhi_yue
+        "y_gz": y_gz, "m_gz": m_gz, "d_gz": d_gz,
+        "y_s": STARS[d["y_s"]], "m_s": STARS[d["m_s"]], "d_s": STARS[d["d_s"]],
+        "is_yang": bool(d["is_yang"]), "term_idx": int(d["term_idx"]),
+        "day_gan": d_gz[0], "day_zhi": d_gz[1],
+        "zhi_yue": int(d["zhi_yue"])
     }
 
 def get_tz_label(dt_date, tz_info):
@@ -163,81 +50,180 @@ def get_tz_label(dt_date, tz_info):
     localized = tz_info.localize(dt)
     return localized.tzname()
 
-def run_final_calendar(start_str, days, tz_name="Europe/London"):
-    start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
-    target_tz = pytz.timezone(tz_name)
-    rows = []
+# --- 3. 輸出欄位 ---
+# 柱、星等解碼欄位：欄名 -> (整數陣列名稱, 查找表)
+DECODED = {}
+for _label, _key in (("年", "y_gz"), ("月", "m_gz"), ("日", "d_gz"), ("時", "h_gz")):
+    DECODED.update({_label + "柱": (_key, ganzhi.GZ_NAMES), _label + "屬性": (_key, ganzhi.GZ_PROPS), _label + "納音": (_key, ganzhi.GZ_NAYIN)})
+DECODED.update({"胎元": ("tai", ganzhi.GZ_NAMES), "胎元屬性": ("tai", ganzhi.GZ_PROPS), "命宮": ("ming_gong", ganzhi.GONG_NAMES)})
+for _label, _key in (("年星", "y_s"), ("月星", "m_s"), ("日星", "d_s"), ("時星", "h_s")):
+    DECODED.update({_label: (_key, ganzhi.STAR_NAMES), _label + "五行": (_key, ganzhi.STAR_WUXING_TABLE)})
+COLUMNS = ["日期", "農曆", "時段", "時間", "時區", "節氣", *DECODED]
+# 精確交節模式 (exact_terms=True) 另有的欄位：只在段內交節的時段填值，其餘為空字串
+EXACT_DECODED = {
+    "交節後年柱": ("post_y_gz", ganzhi.GZ_NAMES), "交節後月柱": ("post_m_gz", ganzhi.GZ_NAMES),
+    "交節後年星": ("post_y_s", ganzhi.STAR_NAMES), "交節後月星": ("post_m_s", ganzhi.STAR_NAMES),
+    "交節後日星": ("post_d_s", ganzhi.STAR_NAMES), "交節後時星": ("post_h_s", ganzhi.STAR_NAMES),
+}
+EXACT_COLUMNS = ["交節時刻", *EXACT_DECODED]
+
+def select_columns(columns=None, exact_terms=False):
+    """檢查欄位選擇 (None = 全部)，回傳欄位列表"""
+    available = COLUMNS + EXACT_COLUMNS if exact_terms else COLUMNS
+    if columns is None:
+        return list(available)
+    if not columns:
+        raise ValueError(f"至少須選擇一個欄位 (可用: {', '.join(available)})")
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"未知欄位: {', '.join(unknown)} (可用: {', '.join(available)})")
+    return list(columns)
+
+def _exact_slot_terms(all_dates, tz_name):
+    """每個時段 (起點, 終點] 換算 UTC 後查交節表：回傳 (起點分類, 終點分類, 交節時刻)，皆為 (日數 x 13)"""
+    starts, ends = slot_bounds_utc(all_dates[1:-1], tz_name, ganzhi.SLOT_START_HOURS)
+    pre, post, instants = get_term_table().transitions(starts.ravel(), ends.ravel())
+    return pre.reshape(starts.shape), post.reshape(starts.shape), instants.reshape(starts.shape)
+
+def _slot_ints(cls, src_gz, d_diff):
+    """(日數 x 13) 的逐時段分類 -> 年、月柱、胎元、飛星、命宮整數陣列 (時星以該時段本身的陰陽遁起算)"""
+    y, zhi_yue, yang = cls["logic_year"], cls["zhi_yue"], cls["is_yang"]
+    m_gz = ganzhi.month_pillar(y, zhi_yue)
+    slots = np.arange(len(TIME_SLOTS))
+    return {
+        "y_gz": ganzhi.year_pillar(y), "m_gz": m_gz, "tai": ganzhi.TAI_YUAN[m_gz],
+        "y_s": ganzhi.year_star(y), "m_s": ganzhi.month_star(y, zhi_yue), "d_s": ganzhi.day_star(d_diff[:, None], yang),
+        "h_s": ganzhi.HOUR_STAR_TABLE[yang.astype(np.intp), src_gz % 12, slots],
+        "ming_gong": ganzhi.MING_GONG_TABLE[zhi_yue.astype(np.intp) - 1, slots],
+    }
+
+def _zone_columns(all_dates, shared, tz_name, want, exact_terms=False):
+    """單一時區的投影：當地中午 -> UTC 查交節表，再展開年、月柱、星與時星 (共用欄位直接引用)
+
+    只需要共用欄位時不做時區換算；只需要時區時不查交節表。
+    exact_terms=True 時改以每個時段的起點分類，並標出段內的精確交節時刻與交節後的柱、星。
+    """
+    days, n = len(all_dates) - 2, len(TIME_SLOTS)
+    rep = lambda a: np.repeat(a, n)
+    zone_cols = [c for c in want if c not in shared]
+    if not zone_cols:
+        return {c: shared[c] for c in want}
     
-    for i in range(days):
-        curr_date = start_d + timedelta(days=i)
-        next_date = curr_date + timedelta(days=1)
-        
-        # 獲取基礎數據
-        d = get_day_basic_data(curr_date, target_tz)
-        d_next = get_day_basic_data(next_date, target_tz)
+    # [前一日 ... 翌日] 的當地中午，一次向量化換算 UTC 並查表分類
+    with stage("terms"):
+        noon_utc, tz_labels = local_times_utc(all_dates, tz_name)
+        need_terms = zone_cols != ["時區"]
+        noon_terms = get_term_table().classify(noon_utc) if need_terms and not exact_terms else None
+        slot_terms = _exact_slot_terms(all_dates, tz_name) if need_terms and exact_terms else None
+    
+    ints = {}
+    if slot_terms is not None:
+        # 精確交節：每個時段以起點分類，段內有交節時另給交節後 (終點) 的柱、星
+        pre, post, instants = slot_terms
+        dp = ganzhi.day_pillar(ganzhi.day_offset(all_dates))
+        src_gz = np.where(ganzhi.SLOT_LATE, dp[2:, None], dp[1:-1, None])
+        d_diff = ganzhi.day_offset(all_dates[1:-1])
+        ints = {k: v.ravel() for k, v in _slot_ints(pre, src_gz, d_diff).items()}
+        ints.update({"post_" + k: v.ravel() for k, v in _slot_ints(post, src_gz, d_diff).items()})
+        changed = ~np.isnat(instants)
+        terms_col = np.where(changed, TERM_NAMES[post["term_idx"]], "")
+        instant_col = np.full(changed.shape, "", dtype=object)
+        local = pd.DatetimeIndex(instants[changed]).round("s").tz_localize("UTC").tz_convert(tz_name)  # 先在 UTC 取整，避免夏令時間重複的鐘點
+        instant_col[changed] = local.strftime("%Y-%m-%d %H:%M:%S%z")  # 附 UTC 偏移，夏令時間重複的鐘點仍可區分
+        changed = changed.ravel()
+    elif noon_terms is not None:
+        # 日級數據：整段日期的整數陣列 (柱 0-59、星 1-9)，前一日 / 翌日即為錯位切片
+        core = ganzhi.day_arrays(all_dates, noon_terms)
+        d = {k: v[1:-1] for k, v in core.items()}
+        d_next = {k: v[2:] for k, v in core.items()}
         
-        # 獲取農曆 (新增)
-        lunar_str = get_lunar_str(curr_date)
+        # 節氣顯示：與前一日不同時，標在早子時
+        new_term = core["term_idx"][1:-1] != core["term_idx"][:-2]
+        terms_col = np.full((days, n), "", dtype=object)
+        terms_col[:, 0] = np.where(new_term, TERM_NAMES[d["term_idx"]], "")
         
-        # 獲取時區標籤 (如 BST, GMT, HKT)
-        tz_label = get_tz_label(curr_date, target_tz)
-
-        # 節氣顯示
-        prev_d_data = get_day_basic_data(curr_date - timedelta(days=1), target_tz)
-        display_term = SOLAR_TERMS[d["term_idx"]] if d["term_idx"] != prev_d_data["term_idx"] else ""
-
-        # 定義 13 個時段
-        time_slots = [
-            (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False), 
-            (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False), 
-            (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False), 
-            (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False), 
-            (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False), 
-            (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
-            (0, "晚子時", "23:00-24:00", True)
-        ]
-
-        for idx, name, period, is_late in time_slots:
-            # 時柱
-            h_gz = get_hour_gz_detailed(d["day_gan"], name, is_late, d_next["day_gan"])
-            # 時星
-            h_s = get_hour_star_pro(d["is_yang"], d["day_zhi"], idx, is_late, d_next["is_yang"], d_next["day_zhi"])
-            
-            rows.append({
-                "日期": curr_date,
-                "農曆": lunar_str, # 加入農曆欄位
-                "時段": name,
-                "時間": period,
-                "時區": tz_label,
-                "節氣": display_term if name == "早子時" else "",
-                
-                "年柱": d["y_gz"], "年屬性": get_gz_prop(d["y_gz"]), "年納音": NAYIN.get(d["y_gz"]),
-                "月柱": d["m_gz"], "月屬性": get_gz_prop(d["m_gz"]), "月納音": NAYIN.get(d["m_gz"]),
-                "日柱": d["d_gz"], "日屬性": get_gz_prop(d["d_gz"]), "日納音": NAYIN.get(d["d_gz"]),
-                "時柱": h_gz,      "時屬性": get_gz_prop(h_gz),      "時納音": NAYIN.get(h_gz),
-                
-                "胎元": get_tai_yuan(d["m_gz"]), "胎元屬性": get_gz_prop(get_tai_yuan(d["m_gz"])),
-                "命宮": get_ming_gong(d["zhi_yue"], h_gz[1]),
-                
-                "年星": d["y_s"], "年星五行": STAR_WUXING[d["y_s"]],
-                "月星": d["m_s"], "月星五行": STAR_WUXING[d["m_s"]],
-                "日星": d["d_s"], "日星五行": STAR_WUXING[d["d_s"]],
-                "時星": h_s,      "時星五行": STAR_WUXING[h_s]
-            })
-            
-    return pd.DataFrame(rows)
+        # 時星、命宮：(日數 x 13) 一次查表展開 (晚子時取翌日)
+        hours = ganzhi.hour_arrays(d, d_next)
+        ints = {k: rep(d[k]) for k in ("y_gz", "m_gz", "y_s", "m_s", "d_s")}
+        ints["tai"] = ganzhi.TAI_YUAN[ints["m_gz"]]
+        ints["h_s"], ints["ming_gong"] = hours["h_s"].ravel(), hours["ming_gong"].ravel()
+    
+    # 輸出：日級欄位重複 13 次，字串只在此處由查找表解碼 (只解碼要求的欄位)
+    with stage("frame"):
+        columns = {}
+        for c in want:
+            if c in shared:
+                columns[c] = shared[c]
+            elif c == "時區":
+                columns[c] = rep(tz_labels[1:-1])
+            elif c == "節氣":
+                columns[c] = terms_col.ravel()
+            elif c == "交節時刻":
+                columns[c] = instant_col.ravel()
+            elif c in EXACT_DECODED:
+                key, table = EXACT_DECODED[c]
+                columns[c] = np.where(changed, table[ints[key]], "")
+            else:
+                key, table = DECODED[c]
+                columns[c] = table[ints[key]]
+    return columns
+
+def run_final_calendar(start_str, days, tz_name="Europe/London", columns=None, exact_terms=False):
+    """tz_name 可為單一時區或時區列表；列表時回傳 {時區: DataFrame}，
+    日期、農曆、日柱等與時區無關的部分只計算一次，每多一個時區只多一次投影
+
+    columns 指定只輸出哪些欄位 (依給定順序，可用欄位見 COLUMNS)；用不到的階段整個略過：
+    不要農曆就不查朔望月表，只要日柱、時柱等與時區無關的欄位則不做時區換算、不查交節表。
+
+    exact_terms=True：年、月柱與飛星改為每個時段以其起點的精確交節分類 (預設為每日當地中午)，
+    節氣標在交節所在的時段，另加交節時刻與交節後的年、月柱及飛星欄位 (EXACT_COLUMNS)。
+    """
+    zones = [tz_name] if isinstance(tz_name, str) else list(tz_name)
+    want = select_columns(columns, exact_terms)
+    start_d = np.datetime64(start_str, "D")
+    all_dates = np.arange(start_d - 1, start_d + days + 1)
+    
+    # 共用欄位：日期、農曆 (整段一次查朔望月表)、時段、日柱與時柱 (只依日期，與時區無關)
+    n = len(TIME_SLOTS)
+    dp = ganzhi.day_pillar(ganzhi.day_offset(all_dates))
+    src_gz = np.where(ganzhi.SLOT_LATE, dp[2:, None], dp[1:-1, None])  # 晚子時以翌日日干起時柱
+    day_ints = {"d_gz": np.repeat(dp[1:-1], n), "h_gz": ganzhi.HOUR_GZ_TABLE[src_gz % 10, np.arange(n)].ravel()}
+    shared = {}
+    if "日期" in want or "農曆" in want:
+        dates = all_dates[1:-1].astype(object)
+        shared["日期"] = np.repeat(dates, n)
+    if "農曆" in want:
+        shared["農曆"] = np.repeat(np.array(lunar_strings(dates), dtype=object), n)
+    shared["時段"] = np.tile(SLOT_NAMES, days)
+    shared["時間"] = np.tile(SLOT_PERIODS, days)
+    for c in want:
+        if c in DECODED and DECODED[c][0] in day_ints:
+            key, table = DECODED[c]
+            shared[c] = table[day_ints[key]]
+    
+    out = {}
+    for tz in zones:
+        columns = _zone_columns(all_dates, shared, tz, want, exact_terms)
+        with stage("frame"):
+            out[tz] = pd.DataFrame(columns)
+    return out[tz_name] if isinstance(tz_name, str) else out
 
 # --- 執行設定 ---
 if __name__ == "__main__":
-    # --- 設定區域 1: 英國 (自動切換 GMT/BST) ---
-    print("正在生成英國 (UK) 曆法...")
-    df_uk = run_final_calendar("1976-01-01", 365*70, tz_name="Europe/London")
-    df_uk.to_excel("3.1Calendar_1976_UK_Full.xlsx", index=False)
-    
-    # --- 設定區域 2: 香港 (HKT) ---
-    print("正在生成香港 (HK) 曆法...")
-    df_hk = run_final_calendar("1976-01-01", 365*70, tz_name="Asia/Hong_Kong")
-    df_hk.to_excel("3.1Calendar_1976_HK_Full.xlsx", index=False)
+    # 英國 (自動切換 GMT/BST) 與香港 (HKT) 一次生成：天文與農曆只算一次，逐年串流寫入兩份檔案
+    outputs = {"Europe/London": "3.1Calendar_1976_UK_Full.xlsx", "Asia/Hong_Kong": "3.1Calendar_1976_HK_Full.xlsx"}
+    print("正在生成英國 (UK) 與香港 (HK) 曆法...")
+    writers = {tz: XlsxStreamWriter(path) for tz, path in outputs.items()}
+    # BCCAL_WORKERS > 1 時以行程池分年平行生成 (結果與逐年生成相同)
+    if WORKERS > 1:
+        chunks = iter_parallel_chunks("main3.1", "run_final_calendar", "1976-01-01", 365*70, tz_name=list(outputs), workers=WORKERS)
+    else:
+        chunks = iter_year_chunks(run_final_calendar, "1976-01-01", 365*70, tz_name=list(outputs))
+    for frames in chunks:
+        for tz, df in frames.items():
+            writers[tz].write(df)
+    for w in writers.values():
+        w.close()
     
     print("✅ 完成！已生成兩份檔案 (包含修正後的農曆顯示與月柱計算)：")
     print("1. 3.1Calendar_1976_UK_Full.xlsx")
@@ -245,4 +231,5 @@ if __name__ == "__main__":
     
     # 預覽檢查
     print("\n--- 預覽數據 (包含農曆與修正的月柱) ---")
-    print(df_hk[["日期", "農曆", "時段", "年柱", "月柱", "日柱"]].head(13).to_string())
\ No newline at end of file
+    df_hk = run_final_calendar("1976-01-01", 1, tz_name="Asia/Hong_Kong")
+    print(df_hk[["日期", "農曆", "時段", "年柱", "月柱", "日柱"]].head(13).to_string())
@@ -1,13 +1,13 @@
 import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
-from skyfield import api
+from astro import solar_longitudes
+from solar_terms import get_term_table
+from day_window import DayWindow
+from profiling import stage, staged
 
-# --- 初始化天文引擎 ---
-# 請確保目錄下有 'de421.bsp' 文件
-ts = api.load.timescale()
-eph = api.load('de421.bsp')
-sun, earth = eph['sun'], eph['earth']
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 1. 基礎字典與對照表 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -39,10 +39,8 @@ NAYIN = {
 # --- 2. 核心計算函數 ---
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_gz_prop(gz_str):
     """獲取干支屬性 (如: 陽木陽水)"""
@@ -86,25 +84,24 @@ def get_hour_star_pro(is_yang, day_zhi, hour_idx, is_late_rat=False, next_day_is
         val = (start_val - u_h_idx - 1) % 9 + 1
     return STARS[val]
 
-def get_day_basic_data(dt_date, tz_info):
-    """計算當日基礎參數，需傳入時區以轉換UTC計算節氣"""
-    # 構造當日中午時間，並轉為UTC以獲取精確太陽黃經
+def get_day_basic_data(dt_date, tz_info, term=None):
+    """計算當日基礎參數，需傳入時區以轉換UTC計算節氣 (term 可由交節表批次預先分類)"""
+    # 構造當日中午時間，並轉為UTC後查交節表
     local_noon = datetime.combine(dt_date, time(12, 0))
     local_dt = tz_info.localize(local_noon)
     utc_dt = local_dt.astimezone(pytz.utc)
     
-    lon = get_solar_lon(utc_dt)
-    term_idx = int(lon // 15)
-    is_yang = not (90 <= lon < 270)
+    if term is None:
+        term = get_term_table().classify([utc_dt])[0]
+    term_idx = int(term["term_idx"])
+    is_yang = bool(term["is_yang"])
     
-    # 年、月柱邏輯
-    logic_y = dt_date.year
-    if lon < 315 and dt_date.month <= 3: logic_y -= 1
+    # 年、月柱邏輯 (立春換年)
+    logic_y = int(term["logic_year"])
     
     y_gz = GAN[(logic_y - 4) % 10] + ZHI[(logic_y - 4) % 12]
     
-    shifted_lon = (lon - 315) % 360
-    zhi_yue = int(shifted_lon // 30) + 1
+    zhi_yue = int(term["zhi_yue"])
     m_gz = GAN[(logic_y % 5 * 2 + zhi_yue + 1) % 10] + ZHI[(zhi_yue + 1) % 12]
     
     # 日柱
@@ -141,19 +138,23 @@ def run_final_calendar(start_str, days, tz_name="Europe/London"):
     target_tz = pytz.timezone(tz_name)
     rows = []
     
-    for i in range(days):
+    # 一次查表分類 [前一日 ... 翌日] 的當地中午
+    with stage("terms"):
+        noon_terms = get_term_table().classify([
+            target_tz.localize(datetime.combine(start_d + timedelta(days=i), time(12, 0)))
+            for i in range(-1, days + 1)
+        ])
+    
+    # 滾動窗口：每日基礎數據只計算一次，前一日 / 翌日沿窗口傳遞
+    window = DayWindow(lambda k: get_day_basic_data(start_d + timedelta(days=k), target_tz, noon_terms[k + 1]))
+    
+    for i, prev_d_data, d, d_next in staged("rows", window(days)):
         curr_date = start_d + timedelta(days=i)
-        next_date = curr_date + timedelta(days=1)
-        
-        # 獲取基礎數據
-        d = get_day_basic_data(curr_date, target_tz)
-        d_next = get_day_basic_data(next_date, target_tz)
         
         # 獲取時區標籤 (如 BST, GMT, HKT)
         tz_label = get_tz_label(curr_date, target_tz)
 
         # 節氣顯示
-        prev_d_data = get_day_basic_data(curr_date - timedelta(days=1), target_tz)
         display_term = SOLAR_TERMS[d["term_idx"]] if d["term_idx"] != prev_d_data["term_idx"] else ""
 
         # 定義 13 個時段
@@ -193,20 +194,23 @@ def run_final_calendar(start_str, days, tz_name="Europe/London"):
                 "日星": d["d_s"], "日星五行": STAR_WUXING[d["d_s"]],
                 "時星": h_s,      "時星五行": STAR_WUXING[h_s]
             })
-            
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        return pd.DataFrame(rows)
 
 # --- 執行設定 ---
 if __name__ == "__main__":
     # --- 設定區域 1: 英國 (自動切換 GMT/BST) ---
     print("正在生成英國 (UK) 曆法...")
     df_uk = run_final_calendar("2025-01-01", 365*2, tz_name="Europe/London")
-    df_uk.to_excel("Calendar_2025_UK_Full.xlsx", index=False)
+    with stage("export"):
+        df_uk.to_excel("Calendar_2025_UK_Full.xlsx", index=False)
     
     # --- 設定區域 2: 香港 (HKT) ---
     print("正在生成香港 (HK) 曆法...")
     df_hk = run_final_calendar("2025-01-01", 365*2, tz_name="Asia/Hong_Kong")
-    df_hk.to_excel("Calendar_2025_HK_Full.xlsx", index=False)
+    with stage("export"):
+        df_hk.to_excel("Calendar_2025_HK_Full.xlsx", index=False)
     
     print("✅ 完成！已生成兩份檔案：")
     print("1. Calendar_2025_UK_Full.xlsx (會顯示 GMT 或 BST)")
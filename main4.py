@@ -1,14 +1,13 @@
 import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
-from skyfield import api
-from lunar_python import Lunar  # 需安裝: pip install lunar_python
+from astro import solar_longitudes
+from solar_terms import get_term_table
+from lunar_engine import lunar_strings
+from profiling import stage, staged
 
-# --- 初始化天文引擎 ---
-# 請確保目錄下有 'de421.bsp'
-ts = api.load.timescale()
-eph = api.load('de421.bsp')
-sun, earth = eph['sun'], eph['earth']
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 1. 基礎字典與對照表 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -43,22 +42,16 @@ NAYIN = {
 # --- 2. 核心函數 ---
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_gz_prop(gz_str):
     if not gz_str or len(gz_str) < 2: return ""
     return f"{GAN_PROPS.get(gz_str[0], '')}{ZHI_PROPS.get(gz_str[1], '')}"
 
 def get_lunar_str(dt_date):
-    """取得農曆字串，例如：正月初一"""
-    try:
-        lunar = Lunar.fromDate(dt_date)
-        return f"{lunar.getMonthInChinese()}月 {lunar.getDayInChinese()}"
-    except:
-        return ""
+    """取得農曆字串，例如：正月 初一 (查朔望月表)"""
+    return lunar_strings([dt_date], sep=" ")[0]
 
 def is_yang_tun(lon):
     """
@@ -134,82 +127,40 @@ def get_day_star_accumulated(dt_date, is_yang):
 
 # --- 主生成器 ---
 
-def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
+def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong", last_term_idx=-1):
+    """last_term_idx：上一個時段的節氣索引，用於判斷交節 (-1 = 第一個時段不標節氣)；
+    分段接續生成時傳入上一段 df.attrs["last_term_idx"]"""
     start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
     tz = pytz.timezone(tz_name)
     rows = []
     
-    # 記錄上一個節氣索引，用於判斷交節
-    last_term_idx = -1
+    # 13 個時段定義
+    time_slots = [
+        (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False),
+        (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False),
+        (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False),
+        (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False),
+        (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False),
+        (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
+        (0, "晚子時", "23:00-24:00", True)
+    ]
     
-    for i in range(days):
-        curr_date = start_d + timedelta(days=i)
-        
-        # 計算農曆 (lunar_python)
-        lunar_str = get_lunar_str(curr_date)
-        
-        # 遍歷 12 個時辰 (每2小時)
-        for h in range(0, 24, 2):
-            # 取時辰中間點計算天文數據 (如 01:00 代表子時)
-            hour_center = datetime.combine(curr_date, time(h, 0)) + timedelta(hours=1)
-            # 修正：時辰範圍是 h ~ h+2。我們取 h+1 分鐘作為檢測點 (避開整點邊界)
-            check_time = datetime.combine(curr_date, time(h, 0)) + timedelta(minutes=5)
-            
-            dt_local = tz.localize(check_time)
-            dt_utc = dt_local.astimezone(pytz.utc)
-            
-            # 天文計算
-            lon = get_solar_lon(dt_utc)
-            is_yang = is_yang_tun(lon)
-            term_idx = int(lon / 15)
-            
-            # 節氣偵測
-            term_name = ""
-            if term_idx != last_term_idx and i >= 0:
-                # 簡單檢查：如果現在的 term_idx 變了，標記當下時辰為交節時辰
-                # 但要防止第一筆資料錯誤觸發，實際應用可更精細
-                if last_term_idx != -1:
-                    term_name = SOLAR_TERMS.get(term_idx * 15, "")
-            last_term_idx = term_idx
-
-            # 時區顯示 (BST/GMT/HKT)
-            tz_label = dt_local.tzname()
-            
-            # --- 干支計算 ---
-            # 年柱 (立春界線)
-            logic_year = curr_date.year
-            if lon < 315 and curr_date.month <= 3: logic_year -= 1
-            y_gz = GAN[(logic_year - 4) % 10] + ZHI[(logic_year - 4) % 12]
-            
-            # 月柱 (節氣界線)
-            # 立春=315度 -> 偏移後為0度
-            shifted_lon = (lon - 315) % 360
-            month_idx = int(shifted_lon / 30) # 0=寅月
-            m_gan_idx = (logic_year % 5 * 2 + 2 + month_idx) % 10
-            m_gz = GAN[m_gan_idx] + ZHI[(2 + month_idx) % 12]
-            
-            # 日柱 (基準推算) - 處理晚子時 (23:00後算明天日干)
-            ref_day = datetime(2023, 12, 22).date()
-            real_date_for_gan = curr_date
-            is_late_rat = (h == 23) # 這裡 loop 0,2,4...22，不會有23，晚子時需特殊邏輯
-            
-            # 修正時辰名稱與邏輯
-            # loop h: 0(早子), 2(丑)... 22(亥)。晚子時通常顯示在當天最後
-            # 為了符合表格習慣，我們在 22(亥) 之後，手動加一行晚子? 
-            # 或者按照 loop 0 (早子) ... 22 (亥)
-            # 如果要精確的「晚子」，我們可以把 0點 視為 早子，23點視為晚子。
-            # 但上面的 loop 是 step 2。
-            # 讓我們調整 loop 為：生成 13 個時段
-            
-            pass # 這裡的 loop 結構需要重構以支援 13 行
-            
-    # --- 重構：使用標準 13 時段生成 ---
-    rows = []
-    last_term_idx = -1
+    # 構建所有檢測時間 (取時段內部的時間點)，一次查表分類
+    with stage("terms"):
+        check_times = []
+        for i in range(days):
+            curr_date = start_d + timedelta(days=i)
+            for h_idx, name, period, is_late in time_slots:
+                check_hour = 23 if is_late else (h_idx * 2 + 1 if h_idx > 0 else 0)
+                check_times.append(tz.localize(datetime.combine(curr_date, time(check_hour, 30))))
+        slot_terms = get_term_table().classify(check_times)
     
-    for i in range(days):
+    # 整段日期一次查朔望月表取得農曆
+    lunar_strs = lunar_strings([start_d + timedelta(days=i) for i in range(days)], sep=" ")
+    
+    for i in staged("rows", range(days)):
         curr_date = start_d + timedelta(days=i)
-        lunar_str = get_lunar_str(curr_date)
+        lunar_str = lunar_strs[i]
         
         # 1. 基礎日柱計算 (不含晚子時修正)
         ref_day = datetime(2023, 12, 22).date()
@@ -219,28 +170,14 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
         # 2. 隔日日柱 (給晚子時用)
         d_next_gz_base = GAN[(d_diff + 1) % 10] + ZHI[(d_diff + 1) % 12]
 
-        time_slots = [
-            (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False),
-            (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False),
-            (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False),
-            (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False),
-            (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False),
-            (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
-            (0, "晚子時", "23:00-24:00", True)
-        ]
-        
-        for h_idx, name, period, is_late in time_slots:
-            # 構建檢測時間 (取時段內部的時間點)
-            check_hour = 23 if is_late else (h_idx * 2 + 1 if h_idx > 0 else 0)
-            check_dt = datetime.combine(curr_date, time(check_hour, 30)) # 取 xx:30 檢測
-            
-            dt_local = tz.localize(check_dt)
-            dt_utc = dt_local.astimezone(pytz.utc)
+        for s, (h_idx, name, period, is_late) in enumerate(time_slots):
+            k = i * len(time_slots) + s
+            dt_local = check_times[k]
             
-            # 天文計算
-            lon = get_solar_lon(dt_utc)
-            is_yang = is_yang_tun(lon)
-            term_idx = int(lon / 15)
+            # 交節表分類
+            term = slot_terms[k]
+            is_yang = bool(term["is_yang"])
+            term_idx = int(term["term_idx"])
             
             term_name = ""
             if term_idx != last_term_idx:
@@ -250,12 +187,10 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
                 last_term_idx = term_idx
             
             # 年月柱計算
-            logic_year = curr_date.year
-            if lon < 315 and curr_date.month <= 3: logic_year -= 1
+            logic_year = int(term["logic_year"])
             y_gz = GAN[(logic_year - 4) % 10] + ZHI[(logic_year - 4) % 12]
             
-            shifted_lon = (lon - 315) % 360
-            zhi_yue = int(shifted_lon / 30) + 1 # 1=寅
+            zhi_yue = int(term["zhi_yue"]) # 1=寅
             m_gz = GAN[(logic_year % 5 * 2 + zhi_yue + 1) % 10] + ZHI[(zhi_yue + 1) % 12]
             
             # 日柱 & 時柱
@@ -302,8 +237,11 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
                 "年星": y_s, "月星": m_s, "日星": d_s,
                 "時星": h_s, "時星五行": STAR_WUXING[h_s]
             })
-            
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        df = pd.DataFrame(rows)
+    df.attrs["last_term_idx"] = last_term_idx  # 供下一段接續
+    return df
 
 if __name__ == "__main__":
     # 範例：生成 2026 年初 (農曆正月初一前後)
@@ -311,7 +249,8 @@ if __name__ == "__main__":
     df = run_metaphysics_calendar("2025-01-01", 600, "Asia/Hong_Kong")
     
     filename = "Full_Lunar_Calendar_2026.xlsx"
-    df.to_excel(filename, index=False)
+    with stage("export"):
+        df.to_excel(filename, index=False)
     print(f"✅ 完成！已包含農曆日期、五行屬性、節氣、飛星修正。\n檔案: {filename}")
     
     # 預覽
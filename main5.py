@@ -1,20 +1,13 @@
 import pandas as pd
 from datetime import datetime, timedelta, time
 import pytz
-from skyfield import api
-# 務必確認安裝: pip install lunar_python
-from lunar_python import Lunar 
-
-# --- 初始化天文引擎 ---
-# 請確保目錄下有 'de421.bsp' 文件
-ts = api.load.timescale()
-try:
-    eph = api.load('de421.bsp')
-except:
-    print("❌ 找不到 de421.bsp 文件，請確保該文件在同一目錄下。")
-    exit()
-    
-sun, earth = eph['sun'], eph['earth']
+from astro import solar_longitudes
+from solar_terms import get_term_table
+from lunar_engine import lunar_strings
+from profiling import stage, staged
+
+# --- 天文引擎 ---
+# 星曆於第一次需要天文計算時才載入 (astro.get_engine)，匯入本檔不需 skyfield
 
 # --- 1. 基礎字典與對照表 ---
 STARS = {1: "一白", 2: "二黑", 3: "三碧", 4: "四綠", 5: "五黃", 6: "六白", 7: "七赤", 8: "八白", 9: "九紫"}
@@ -48,10 +41,8 @@ NAYIN = {
 # --- 2. 核心函數 ---
 
 def get_solar_lon(dt_utc):
-    t = ts.from_datetime(dt_utc)
-    astrometric = earth.at(t).observe(sun)
-    _, lon, _ = astrometric.ecliptic_latlon()
-    return lon.degrees
+    """太陽黃經 (度)；星曆在第一次呼叫時才載入"""
+    return float(solar_longitudes([dt_utc])[0])
 
 def get_gz_prop(gz_str):
     if not gz_str or len(gz_str) < 2: return ""
@@ -59,17 +50,8 @@ def get_gz_prop(gz_str):
 
 # --- 修正後的農曆函數 ---
 def get_lunar_str(dt_date):
-    """
-    取得農曆字串，例如：正月初一
-    修正：強制將 date 轉換為 datetime，避免 'datetime.date' object has no attribute 'hour' 錯誤
-    """
-    try:
-        # 將 date 轉為 datetime (設為中午 12:00)
-        dt_full = datetime.combine(dt_date, time(12, 0))
-        lunar = Lunar.fromDate(dt_full)
-        return f"{lunar.getMonthInChinese()} {lunar.getDayInChinese()}"
-    except Exception as e:
-        return f"Error: {e}"
+    """取得農曆字串，例如：正 初一 (查朔望月表，超出範圍時拋出 ValueError)"""
+    return lunar_strings([dt_date], month_suffix="", sep=" ")[0]
 
 def is_yang_tun(lon):
     # 冬至(270) ~ 夏至(90) -> 陽遁
@@ -126,18 +108,42 @@ def get_day_star_accumulated(dt_date, is_yang):
 
 # --- 主生成器 ---
 
-def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
+def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong", last_term_idx=-1):
+    """last_term_idx：上一個時段的節氣索引，用於判斷交節 (-1 = 第一個時段不標節氣)；
+    分段接續生成時傳入上一段 df.attrs["last_term_idx"]"""
     start_d = datetime.strptime(start_str, "%Y-%m-%d").date()
     tz = pytz.timezone(tz_name)
     rows = []
     
-    last_term_idx = -1
+    # 13 個時段定義
+    time_slots = [
+        (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False),
+        (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False),
+        (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False),
+        (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False),
+        (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False),
+        (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
+        (0, "晚子時", "23:00-24:00", True)
+    ]
+    
+    # 構建所有檢測時間 (取時段內部的時間點)，一次查表分類
+    with stage("terms"):
+        check_times = []
+        for i in range(days):
+            curr_date = start_d + timedelta(days=i)
+            for h_idx, name, period, is_late in time_slots:
+                check_hour = 23 if is_late else (h_idx * 2 + 1 if h_idx > 0 else 0)
+                check_times.append(tz.localize(datetime.combine(curr_date, time(check_hour, 30))))
+        slot_terms = get_term_table().classify(check_times)
+    
+    # 整段日期一次查朔望月表取得農曆
+    lunar_strs = lunar_strings([start_d + timedelta(days=i) for i in range(days)], month_suffix="", sep=" ")
     
-    for i in range(days):
+    for i in staged("rows", range(days)):
         curr_date = start_d + timedelta(days=i)
         
-        # 1. 取得農曆 (使用修正後的函數)
-        lunar_str = get_lunar_str(curr_date)
+        # 1. 取得農曆 (整段預先查表)
+        lunar_str = lunar_strs[i]
         
         # 2. 基礎日柱計算
         ref_day = datetime(2023, 12, 22).date()
@@ -145,27 +151,13 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
         day_gz_base = GAN[d_diff % 10] + ZHI[d_diff % 12]
         d_next_gz_base = GAN[(d_diff + 1) % 10] + ZHI[(d_diff + 1) % 12]
 
-        # 13 個時段定義
-        time_slots = [
-            (0, "早子時", "00:00-01:00", False), (1, "丑時", "01:00-03:00", False),
-            (2, "寅時", "03:00-05:00", False), (3, "卯時", "05:00-07:00", False),
-            (4, "辰時", "07:00-09:00", False), (5, "巳時", "09:00-11:00", False),
-            (6, "午時", "11:00-13:00", False), (7, "未時", "13:00-15:00", False),
-            (8, "申時", "15:00-17:00", False), (9, "酉時", "17:00-19:00", False),
-            (10, "戌時", "19:00-21:00", False), (11, "亥時", "21:00-23:00", False),
-            (0, "晚子時", "23:00-24:00", True)
-        ]
-        
-        for h_idx, name, period, is_late in time_slots:
-            check_hour = 23 if is_late else (h_idx * 2 + 1 if h_idx > 0 else 0)
-            check_dt = datetime.combine(curr_date, time(check_hour, 30))
-            
-            dt_local = tz.localize(check_dt)
-            dt_utc = dt_local.astimezone(pytz.utc)
+        for s, (h_idx, name, period, is_late) in enumerate(time_slots):
+            k = i * len(time_slots) + s
+            dt_local = check_times[k]
             
-            lon = get_solar_lon(dt_utc)
-            is_yang = is_yang_tun(lon)
-            term_idx = int(lon / 15)
+            term = slot_terms[k]
+            is_yang = bool(term["is_yang"])
+            term_idx = int(term["term_idx"])
             
             term_name = ""
             if term_idx != last_term_idx:
@@ -174,12 +166,10 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
                 last_term_idx = term_idx
             
             # 年月柱
-            logic_year = curr_date.year
-            if lon < 315 and curr_date.month <= 3: logic_year -= 1
+            logic_year = int(term["logic_year"])
             y_gz = GAN[(logic_year - 4) % 10] + ZHI[(logic_year - 4) % 12]
             
-            shifted_lon = (lon - 315) % 360
-            zhi_yue = int(shifted_lon / 30) + 1
+            zhi_yue = int(term["zhi_yue"])
             m_gz = GAN[(logic_year % 5 * 2 + zhi_yue + 1) % 10] + ZHI[(zhi_yue + 1) % 12]
             
             # 日柱 & 時柱
@@ -217,8 +207,11 @@ def run_metaphysics_calendar(start_str, days, tz_name="Asia/Hong_Kong"):
                 "年星": y_s, "月星": m_s, "日星": d_s,
                 "時星": h_s, "時星五行": STAR_WUXING[h_s]
             })
-            
-    return pd.DataFrame(rows)
+
+    with stage("frame"):
+        df = pd.DataFrame(rows)
+    df.attrs["last_term_idx"] = last_term_idx  # 供下一段接續
+    return df
 
 if __name__ == "__main__":
     print("正在生成農曆修正版曆法...")
@@ -226,7 +219,8 @@ if __name__ == "__main__":
     df = run_metaphysics_calendar("2025-01-01", 365*2, "Asia/Hong_Kong")
     
     filename = "Lunar_Fixed_1978.xlsx"
-    df.to_excel(filename, index=False)
+    with stage("export"):
+        df.to_excel(filename, index=False)
     print(f"✅ 完成！檔案已儲存為: {filename}")
     
     # 預覽檢查
@@ -0,0 +1,60 @@
+import importlib.util
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from export import year_spans
+from lunar_engine import get_lunar_table
+from solar_terms import get_term_table
+
+# --- 多行程分年生成 ---
+# 日期範圍依西曆年切成分片，由行程池平行計算；每個工作行程只載入一次腳本
+# (星曆、交節表、朔望月表)。結果依日期順序合併，與單行程逐年生成的內容完全相同。
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKERS = int(os.environ.get("BCCAL_WORKERS", "1"))
+
+_WORKER = {}
+
+def load_script(name):
+    """以模組方式載入專案根目錄的腳本 (支援 main3.1 這類含點的檔名)"""
+    spec = importlib.util.spec_from_file_location(name.replace(".", "_"), os.path.join(ROOT, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _init_worker(script):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    _WORKER["module"] = load_script(script)
+    # 預先映射交節表與朔望月表，之後每個分片都直接查表
+    get_term_table()
+    get_lunar_table()
+
+def _run_shard(task):
+    func, start_str, days, args, kwargs = task
+    return getattr(_WORKER["module"], func)(start_str, days, *args, **kwargs)
+
+def iter_parallel_chunks(script, func, start_str, days, *args, workers=None, **kwargs):
+    """與 export.iter_year_chunks 相同的逐年分片，改由行程池計算；依日期順序產出
+
+    script 為腳本名稱 (如 'main3.1')，func 為其生成函數名稱 (如 'run_final_calendar')。
+    """
+    tasks = [(func, s, n, args, kwargs) for s, n in year_spans(start_str, days)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(script,)) as pool:
+        # map 依提交順序回傳，合併結果與單行程逐年生成相同
+        yield from pool.map(_run_shard, tasks)
+
+def merge_chunks(chunks):
+    """依序合併分片；多時區的分片 ({時區: DataFrame}) 則逐時區合併"""
+    chunks = list(chunks)
+    if chunks and isinstance(chunks[0], dict):
+        return {tz: pd.concat([c[tz] for c in chunks], ignore_index=True) for tz in chunks[0]}
+    return pd.concat(chunks, ignore_index=True)
+
+def run_parallel(script, func, start_str, days, *args, workers=None, **kwargs):
+    """平行版的 run_*：回傳與單一次呼叫相同的 DataFrame (或 {時區: DataFrame})"""
+    return merge_chunks(iter_parallel_chunks(script, func, start_str, days, *args, workers=workers, **kwargs))
@@ -0,0 +1,170 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pytz
+
+import ganzhi
+from lunar_engine import get_lunar_table
+from solar_terms import SOLAR_TERMS, TERM_SPAN, get_term_table, local_times_utc
+
+# --- 單點查詢：任一時刻的四柱、飛星、胎元、命宮 ---
+# 每個時區第一次查詢時，以交節表對整段範圍 (TERM_SPAN) 的每日做一次向量化計算，
+# 結果轉成 Python 列表保存；之後每次查詢只是整數索引與查表，不做任何星曆計算。
+# 欄位與 main3.1 run_final_calendar 的每一列相同。
+
+# 晚子時 (23:00-24:00) 的處理方式
+#   split    : 日柱仍屬當日，時柱、時星取翌日 (與 run_final_calendar 相同，預設)
+#   next_day : 23:00 起整個換日，等同翌日早子時
+#   same_day : 不換日，時柱、時星皆以當日起算
+LATE_RAT_POLICIES = ("split", "next_day", "same_day")
+
+TERM_NAMES = np.array(SOLAR_TERMS, dtype=object)
+
+class ZoneDays:
+    """單一時區每一日的日級數據 (整數與字串皆為 Python 列表，供逐點查詢)"""
+
+    def __init__(self, tz_name, span=TERM_SPAN):
+        self.tz_name = tz_name
+        self.tz = pytz.timezone(tz_name)
+        # 可查詢日期：span 首日 ~ 朔望月表表尾前一日；前後各多算一日 (前一日節氣、翌日晚子時)
+        first = np.datetime64(f"{span[0]}-01-01", "D")
+        last = min(np.datetime64(f"{span[1]}-12-31", "D"), get_lunar_table(span).month_start[-1] - 1)
+        all_dates = np.arange(first - 1, last + 2)
+        self.first = first.astype(object)
+        self.last = last.astype(object)
+
+        noon_utc, labels = local_times_utc(all_dates, tz_name)
+        core = ganzhi.day_arrays(all_dates, get_term_table(span).classify(noon_utc))
+        self.days = {k: v.tolist() for k, v in core.items()}
+        self.tz_labels = labels.tolist()
+        self.dates = all_dates.astype(object).tolist()
+        self.lunar = [""] + get_lunar_table(span).strings(all_dates[1:-1]) + [""]
+        new_term = np.r_[False, core["term_idx"][1:] != core["term_idx"][:-1]]
+        self.display_term = np.where(new_term, TERM_NAMES[core["term_idx"]], "").tolist()
+        # 反查索引：(年柱, 月柱, 日柱) 合成鍵排序，同鍵的日索引相鄰 (前後補算的兩日不列入)
+        key = (core["y_gz"].astype(np.int32) * 60 + core["m_gz"]) * 60 + core["d_gz"]
+        order = np.argsort(key[1:-1], kind="stable") + 1
+        self.key_sorted, self.key_days = key[order], order
+
+    def index(self, local_date):
+        """當地日期 -> 列表索引"""
+        if not (self.first <= local_date <= self.last):
+            raise ValueError(f"日期超出查詢範圍 {self.first} ~ {self.last}")
+        return (local_date - self.first).days + 1
+
+_ZONES = {}
+
+def get_zone_days(tz_name):
+    """取得 (並在本行程內重用) 指定時區的每日數據"""
+    if tz_name not in _ZONES:
+        _ZONES[tz_name] = ZoneDays(tz_name)
+    return _ZONES[tz_name]
+
+# 查表結果直接用 Python 列表索引 (比 numpy 純量索引快)
+_GZ_NAMES, _GZ_PROPS, _GZ_NAYIN = ganzhi.GZ_NAMES.tolist(), ganzhi.GZ_PROPS.tolist(), ganzhi.GZ_NAYIN.tolist()
+_TAI_YUAN = ganzhi.TAI_YUAN.tolist()
+_STAR_NAMES, _STAR_WUXING = ganzhi.STAR_NAMES.tolist(), ganzhi.STAR_WUXING_TABLE.tolist()
+_GONG_NAMES = ganzhi.GONG_NAMES.tolist()
+_HOUR_GZ, _HOUR_STAR, _MING_GONG = ganzhi.HOUR_GZ_TABLE.tolist(), ganzhi.HOUR_STAR_TABLE.tolist(), ganzhi.MING_GONG_TABLE.tolist()
+_SLOT_NAMES, _SLOT_PERIODS = ganzhi.SLOT_NAMES.tolist(), ganzhi.SLOT_PERIODS.tolist()
+
+def row_at(zone, i, slot, late_rat_policy="split"):
+    """第 i 日 (ZoneDays 索引) 第 slot 時段的完整一列 (dict，欄位與 run_final_calendar 相同)"""
+    if late_rat_policy not in LATE_RAT_POLICIES:
+        raise ValueError(f"late_rat_policy 須為 {', '.join(LATE_RAT_POLICIES)} 之一")
+    if slot == 12 and late_rat_policy == "next_day":
+        i, slot = i + 1, 0
+    src = i + 1 if slot == 12 and late_rat_policy == "split" else i  # 時柱、時星的起算日
+    d = zone.days
+    y_gz, m_gz, d_gz = d["y_gz"][i], d["m_gz"][i], d["d_gz"][i]
+    h_gz = _HOUR_GZ[d["d_gz"][src] % 10][slot]
+    h_s = _HOUR_STAR[d["is_yang"][src]][d["d_gz"][src] % 12][slot]
+    tai = _TAI_YUAN[m_gz]
+
+    row = {
+        "日期": zone.dates[i], "農曆": zone.lunar[i],
+        "時段": _SLOT_NAMES[slot], "時間": _SLOT_PERIODS[slot], "時區": zone.tz_labels[i],
+        "節氣": zone.display_term[i] if slot == 0 else "",
+    }
+    for label, gz in (("年", y_gz), ("月", m_gz), ("日", d_gz), ("時", h_gz)):
+        row[label + "柱"], row[label + "屬性"], row[label + "納音"] = _GZ_NAMES[gz], _GZ_PROPS[gz], _GZ_NAYIN[gz]
+    row["胎元"], row["胎元屬性"] = _GZ_NAMES[tai], _GZ_PROPS[tai]
+    row["命宮"] = _GONG_NAMES[_MING_GONG[d["zhi_yue"][i] - 1][slot]]
+    for label, v in (("年星", d["y_s"][i]), ("月星", d["m_s"][i]), ("日星", d["d_s"][i]), ("時星", h_s)):
+        row[label], row[label + "五行"] = _STAR_NAMES[v], _STAR_WUXING[v]
+    return row
+
+def pillars_at(dt, tz="Asia/Hong_Kong", late_rat_policy="split"):
+    """查詢任一時刻的四柱、飛星、胎元、命宮
+
+    dt 為 naive datetime 時視為 tz 的當地時間，aware datetime 則先換算到 tz。
+    """
+    zone = get_zone_days(tz)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(zone.tz)
+    return row_at(zone, zone.index(dt.date()), ganzhi.slot_of_hour(dt.hour), late_rat_policy)
+
+def pillars_range(start, days, tz="Asia/Hong_Kong", late_rat_policy="split"):
+    """連續 days 日、每日 13 個時段的列 (dict 列表)"""
+    zone = get_zone_days(tz)
+    i0 = zone.index(start)
+    if days > 0:
+        zone.index(start + timedelta(days=days - 1))  # 檢查範圍
+    return [row_at(zone, i0 + k, slot, late_rat_policy) for k in range(days) for slot in range(len(_SLOT_NAMES))]
+
+# --- 反查：由四柱找出所有符合的時段 ---
+# 年、月、日柱以索引鍵二分搜尋找出候選日 (六十甲子配合節氣，全範圍通常只有數日)，
+# 時柱的地支決定時段、天干由五鼠遁驗證，不需掃描整張表。
+# 年柱、月柱與日曆相同，以每日當地中午的節氣為準。
+
+_GZ_INDEX = {name: i for i, name in enumerate(_GZ_NAMES)}
+
+def _gz_index(name):
+    if name not in _GZ_INDEX:
+        raise ValueError(f"無效的干支 {name}")
+    return _GZ_INDEX[name]
+
+def _slot_window(day, slot):
+    """時段 -> 當地 (開始, 結束) naive datetime"""
+    start = datetime.combine(day, time(0 if slot == 0 else 23 if slot == 12 else slot * 2 - 1))
+    return start, start + timedelta(hours=1 if slot in (0, 12) else 2)
+
+def find_pillars(year, month, day, hour, tz="Asia/Hong_Kong", late_rat_policies=LATE_RAT_POLICIES):
+    """反查四柱 (如 "甲辰", "丙寅", "甲子", "甲子")：回傳所有符合的時段 (依時間排序的 dict 列表)
+
+    子時兩種以上的晚子時處理方式結果不同，每一列的「晚子規則」列出該時段在哪些規則下成立：
+    早子時與丑 ~ 亥時在所有規則下相同；晚子時 (23:00-24:00) 在 split 下日柱屬當日、時柱取翌日，
+    same_day 下時柱亦取當日，next_day 下整個屬於翌日。
+    """
+    policies = tuple(late_rat_policies)
+    if set(policies) - set(LATE_RAT_POLICIES):
+        raise ValueError(f"late_rat_policy 須為 {', '.join(LATE_RAT_POLICIES)} 之一")
+    zone = get_zone_days(tz)
+    y, m, d, h = (_gz_index(v) for v in (year, month, day, hour))
+    key = (y * 60 + m) * 60 + d
+    lo, hi = np.searchsorted(zone.key_sorted, [key, key + 1])
+    d_gz, h_zhi = zone.days["d_gz"], h % 12
+
+    hits = {}  # (日索引, 時段) -> 成立的規則
+    for i in zone.key_days[lo:hi].tolist():
+        if h_zhi:
+            if _HOUR_GZ[d_gz[i] % 10][h_zhi] == h:
+                hits.setdefault((i, h_zhi), []).extend(policies)
+            continue
+        if _HOUR_GZ[d_gz[i] % 10][0] == h:
+            hits.setdefault((i, 0), []).extend(policies)
+            if "same_day" in policies:
+                hits.setdefault((i, 12), []).append("same_day")
+            if "next_day" in policies and i > 1:
+                hits.setdefault((i - 1, 12), []).append("next_day")  # 前一日晚子時已屬本日
+        if "split" in policies and _HOUR_GZ[d_gz[i + 1] % 10][0] == h:  # 表尾已多算翌日，最後一日亦可比對
+            hits.setdefault((i, 12), []).append("split")
+
+    rows = []
+    for i, slot in sorted(hits):
+        start, end = _slot_window(zone.dates[i], slot)
+        rows.append({
+            "日期": zone.dates[i], "時段": _SLOT_NAMES[slot], "時間": _SLOT_PERIODS[slot],
+            "開始": start, "結束": end, "時區": zone.tz_labels[i], "晚子規則": hits[i, slot],
+        })
+    return rows
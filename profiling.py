@@ -0,0 +1,118 @@
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+# --- 分段計時 (選用) ---
+# 設定 BCCAL_PROFILE 後，各產生器按階段累計呼叫次數與耗時，行程結束時輸出統計：
+#   BCCAL_PROFILE=1            印到 stderr
+#   BCCAL_PROFILE=profile.json 印到 stderr 並另存 JSON
+# 未啟用時 stage() 只回傳共用的空 context，幾乎沒有額外成本。
+# 階段可巢狀 (如建交節表時呼叫星曆)：「總計」含內層，「自身」扣除內層，各階段自身時間相加不重複。
+# 以行程池平行生成 (BCCAL_WORKERS > 1) 時，只統計主行程。
+
+STAGES = {
+    "ephemeris": "星曆計算 (skyfield / Chebyshev)",
+    "terms": "交節表建表與分類",
+    "lunar": "農曆 (朔望月表)",
+    "day": "日級數據",
+    "hours": "時辰展開 (向量化)",
+    "overlay": "時區對照 (UTC 區間疊合)",
+    "rows": "逐列組成 (含時辰展開)",
+    "frame": "建立 DataFrame",
+    "export": "匯出 (openpyxl / CSV / Parquet)",
+}
+
+_SETTING = os.environ.get("BCCAL_PROFILE", "")
+ENABLED = _SETTING not in ("", "0")
+
+_NULL = nullcontext()
+_stats = {}   # 階段 -> [呼叫次數, 總計秒數, 自身秒數]
+_stack = []   # [階段, 開始時間, 內層耗時]
+_depth = {}   # 階段 -> 目前巢狀深度 (同名階段遞迴時總計只算最外層)
+_t0 = time.perf_counter()
+
+class _Stage:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _depth[self.name] = _depth.get(self.name, 0) + 1
+        _stack.append([self.name, time.perf_counter(), 0.0])
+
+    def __exit__(self, *exc):
+        name, start, inner = _stack.pop()
+        elapsed = time.perf_counter() - start
+        _depth[name] -= 1
+        s = _stats.setdefault(name, [0, 0.0, 0.0])
+        s[0] += 1
+        s[2] += elapsed - inner
+        if not _depth[name]:
+            s[1] += elapsed
+        if _stack:
+            _stack[-1][2] += elapsed
+        return False
+
+_STAGE_OBJECTS = {}
+
+def stage(name):
+    """`with stage("lunar"): ...`：啟用時累計該階段的次數與耗時，未啟用時不做任何事"""
+    if not ENABLED:
+        return _NULL
+    ctx = _STAGE_OBJECTS.get(name)
+    if ctx is None:
+        ctx = _STAGE_OBJECTS[name] = _Stage(name)
+    return ctx
+
+def staged(name, iterable):
+    """`for x in staged("rows", items):`：整個迴圈 (含迴圈本體) 計入該階段，迴圈不必縮排進 with"""
+    if not ENABLED:
+        return iterable
+    return _staged(name, iterable)
+
+def _staged(name, iterable):
+    with stage(name):
+        yield from iterable
+
+def enable():
+    """在程式內啟用 (等同設定 BCCAL_PROFILE=1，但不會在結束時自動輸出)"""
+    global ENABLED
+    ENABLED = True
+
+def reset():
+    """清除統計並重新起算總時間"""
+    global _t0
+    _stats.clear()
+    _t0 = time.perf_counter()
+
+def summary():
+    """回傳統計 dict：總時間、各階段 (依自身時間排序) 與未歸入任何階段的時間"""
+    wall = time.perf_counter() - _t0
+    stages = [
+        {"stage": k, "desc": STAGES.get(k, ""), "calls": v[0], "total_s": v[1], "self_s": v[2]}
+        for k, v in sorted(_stats.items(), key=lambda kv: -kv[1][2])
+    ]
+    tracked = sum(s["self_s"] for s in stages)
+    return {"wall_s": wall, "stages": stages, "untracked_s": max(wall - tracked, 0.0)}
+
+def report(path=None, file=None):
+    """印出各階段統計；path 指定時另存 JSON"""
+    s = summary()
+    file = file or sys.stderr
+    wall = s["wall_s"] or 1.0
+    print(f"\n--- 分段計時 (總計 {s['wall_s']:.2f} 秒) ---", file=file)
+    print(f"{'階段':<10} {'次數':>9} {'總計 s':>9} {'自身 s':>9} {'自身 %':>7}  說明", file=file)
+    for r in s["stages"]:
+        print(f"{r['stage']:<10} {r['calls']:>9} {r['total_s']:>9.3f} {r['self_s']:>9.3f} {r['self_s'] / wall * 100:>6.1f}%  {r['desc']}", file=file)
+    print(f"{'(其他)':<10} {'':>9} {'':>9} {s['untracked_s']:>9.3f} {s['untracked_s'] / wall * 100:>6.1f}%", file=file)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(s, f, ensure_ascii=False, indent=1)
+    return s
+
+if ENABLED:
+    atexit.register(report, None if _SETTING == "1" else _SETTING)
@@ -0,0 +1,204 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import ganzhi
+from lunar_engine import lunar_strings
+from profiling import stage
+from solar_terms import SOLAR_TERMS, get_term_table, local_times_utc
+
+# --- 規則變體引擎 ---
+# 各腳本之間的規則差異整理成宣告式的規則集 (dict)。同一次執行中，日期、農曆、
+# 當地時間換算與交節分類 (同一種取樣方式) 只算一次；每個規則集只是在共用的整數陣列上
+# 做幾個向量運算再解碼，多比較一個變體的成本遠小於重跑一次產生器。
+# 輸出欄位一律與 main3.1 run_final_calendar 相同，方便逐欄比較。
+
+TERM_NAMES = np.array(SOLAR_TERMS, dtype=object)
+_SLOTS = np.arange(len(ganzhi.TIME_SLOTS))
+
+# 逐時段取樣的當地時刻 (13 個 (時, 分))
+SLOT_MIDPOINTS = ((0, 30),) + tuple((h * 2, 0) for h in range(1, 12)) + ((23, 30),)
+# main4 / main5 的取樣：早子 00:30、晚子 23:30，其餘為時段結束後半小時 (如丑時取 03:30)
+MAIN4_SLOT_TIMES = ((0, 30),) + tuple((h * 2 + 1, 30) for h in range(1, 12)) + ((23, 30),)
+
+# 規則欄位與預設值 (即 main3.1 的規則)
+RULE_DEFAULTS = {
+    "sampling": "noon",              # noon: 每日以當地中午分類節氣；slot: 每個時段各自取樣 (slot_times)
+    "slot_times": SLOT_MIDPOINTS,
+    "month_stem": "year_gan",        # 月干起法：year_gan = 年干 % 5；logic_year = 術數年 % 5
+    "month_star_base": (8, 2, 5),    # 月星起星：年支 子午卯酉 / 寅申巳亥 / 辰戌丑未
+    "year_star": (3, 2024),          # 年星：(起星, 起算年)
+    "day_pillar_ref": "2025-12-21",  # 日柱基準日 (甲子)
+    "day_star_ref": "2025-12-21",    # 日星基準日
+    "day_star_start": (1, 9),        # 日星：(陽遁起星, 陰遁起星)
+    "late_rat_day_pillar": "same",   # 晚子時的日柱：same = 當日；next = 翌日
+}
+
+RULESETS = {
+    "main3.1": {},
+    "main3": {"month_stem": "logic_year"},
+    "main4": {
+        "sampling": "slot", "slot_times": MAIN4_SLOT_TIMES, "month_stem": "logic_year",
+        "year_star": (11, 2000), "day_pillar_ref": "2023-12-22", "day_star_ref": "2023-12-22",
+        "day_star_start": (1, 1), "late_rat_day_pillar": "next",
+    },
+    # 月星起星 寅申巳亥 與 辰戌丑未 對調 (比較用)
+    "month_star_852": {"month_star_base": (8, 5, 2)},
+}
+
+def resolve_ruleset(rules):
+    """規則集名稱或 dict -> 完整規則 (dict 可用 "base" 指定以哪個預設規則集為底)"""
+    if isinstance(rules, str):
+        if rules not in RULESETS:
+            raise ValueError(f"未知規則集 {rules} (可用: {', '.join(RULESETS)})")
+        rules = RULESETS[rules]
+    rules = dict(rules)
+    base = rules.pop("base", None)
+    unknown = set(rules) - set(RULE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"未知規則欄位: {', '.join(sorted(unknown))}")
+    out = {**RULE_DEFAULTS, **(resolve_ruleset(base) if base else {}), **rules}
+    if out["sampling"] not in ("noon", "slot"):
+        raise ValueError("sampling 須為 noon 或 slot")
+    if out["month_stem"] not in ganzhi.MONTH_STEM_RULES:
+        raise ValueError(f"month_stem 須為 {' / '.join(ganzhi.MONTH_STEM_RULES)}")
+    if out["late_rat_day_pillar"] not in ("same", "next"):
+        raise ValueError("late_rat_day_pillar 須為 same 或 next")
+    if len(out["slot_times"]) != len(_SLOTS):
+        raise ValueError(f"slot_times 須有 {len(_SLOTS)} 個 (時, 分)")
+    return out
+
+def _samples(all_dates, tz_name, rules, cache):
+    """共用取樣：回傳 (交節分類 (日數, 取樣數), 時區名稱 (日數, 取樣數))；同一種取樣方式只換算、分類一次"""
+    key = (tz_name, "noon" if rules["sampling"] == "noon" else tuple(map(tuple, rules["slot_times"])))
+    if key not in cache:
+        times = [(12, 0)] if key[1] == "noon" else key[1]
+        with stage("terms"):
+            utc, labels = zip(*(local_times_utc(all_dates, tz_name, h, m) for h, m in times))
+            terms = get_term_table().classify(np.stack(utc, axis=1).ravel()).reshape(len(all_dates), len(times))
+        cache[key] = (terms, np.stack(labels, axis=1))
+    return cache[key]
+
+def apply_rules(rules, all_dates, terms, labels):
+    """單一規則集：共用的日期與交節分類 -> (日數 x 13) 的柱、星、命宮整數陣列與節氣、時區欄"""
+    shape = (len(all_dates) - 2, len(_SLOTS))
+    full = lambda a: np.broadcast_to(a, shape)
+    late = ganzhi.SLOT_LATE
+    t = terms[1:-1]
+    logic_y, zhi_yue, yang = t["logic_year"], t["zhi_yue"], t["is_yang"]
+
+    with stage("day"):
+        dp = ganzhi.day_pillar(ganzhi.day_offset(all_dates, rules["day_pillar_ref"]))
+        src_gz = np.where(late, dp[2:, None], dp[1:-1, None])  # 時柱、時星的起算日 (晚子時取翌日)
+        out = {
+            "y_gz": full(ganzhi.year_pillar(logic_y)),
+            "m_gz": full(ganzhi.month_pillar(logic_y, zhi_yue, rules["month_stem"])),
+            "d_gz": src_gz if rules["late_rat_day_pillar"] == "next" else full(dp[1:-1, None]),
+            "y_s": full(ganzhi.year_star(logic_y, *rules["year_star"])),
+            "m_s": full(ganzhi.month_star(logic_y, zhi_yue, np.array(rules["month_star_base"]))),
+            "d_s": full(ganzhi.day_star(ganzhi.day_offset(all_dates[1:-1], rules["day_star_ref"])[:, None],
+                                        yang, *rules["day_star_start"])),
+        }
+    with stage("hours"):
+        # 時星的陰陽遁：每日取樣時晚子時沿用翌日 (同 main3.1)，逐時段取樣則用該時段本身的分類
+        h_yang = np.where(late, terms["is_yang"][2:], yang) if terms.shape[1] == 1 else yang
+        out["h_gz"] = ganzhi.HOUR_GZ_TABLE[src_gz % 10, _SLOTS]
+        out["h_s"] = ganzhi.HOUR_STAR_TABLE[h_yang.astype(np.intp), src_gz % 12, _SLOTS]
+        out["ming_gong"] = ganzhi.MING_GONG_TABLE[full(zhi_yue).astype(np.intp) - 1, _SLOTS]
+
+    # 節氣：與前一個取樣點不同時標出 (每日取樣標在早子時)
+    term_col = np.full(shape, "", dtype=object)
+    k = terms["term_idx"]
+    if terms.shape[1] == 1:
+        new = k[1:-1, 0] != k[:-2, 0]
+        term_col[:, 0] = np.where(new, TERM_NAMES[k[1:-1, 0]], "")
+    else:
+        flat = k[:-1].ravel()
+        cur, prev = flat[len(_SLOTS):], flat[len(_SLOTS) - 1:-1]
+        term_col = np.where(cur != prev, TERM_NAMES[cur], "").reshape(shape)
+    out["節氣"] = term_col
+    out["時區"] = full(labels[1:-1])
+    return out
+
+def _decode(shared, ints):
+    """整數陣列 -> main3.1 的欄位 (字串以查找表解碼)"""
+    columns = {k: shared[k] for k in ("日期", "農曆", "時段", "時間")}
+    columns["時區"] = ints["時區"].ravel()
+    columns["節氣"] = ints["節氣"].ravel()
+    for label, key in (("年", "y_gz"), ("月", "m_gz"), ("日", "d_gz"), ("時", "h_gz")):
+        gz = ints[key].ravel()
+        columns[label + "柱"] = ganzhi.GZ_NAMES[gz]
+        columns[label + "屬性"] = ganzhi.GZ_PROPS[gz]
+        columns[label + "納音"] = ganzhi.GZ_NAYIN[gz]
+    tai = ganzhi.TAI_YUAN[ints["m_gz"].ravel()]
+    columns["胎元"] = ganzhi.GZ_NAMES[tai]
+    columns["胎元屬性"] = ganzhi.GZ_PROPS[tai]
+    columns["命宮"] = ganzhi.GONG_NAMES[ints["ming_gong"].ravel()]
+    for label, key in (("年星", "y_s"), ("月星", "m_s"), ("日星", "d_s"), ("時星", "h_s")):
+        v = ints[key].ravel()
+        columns[label] = ganzhi.STAR_NAMES[v]
+        columns[label + "五行"] = ganzhi.STAR_WUXING_TABLE[v]
+    return columns
+
+def run_rulesets(start_str, days, tz_name="Asia/Hong_Kong", rulesets=("main3.1",), decode=True):
+    """一次執行多個規則集，回傳 {規則集名稱: DataFrame}
+
+    rulesets 為名稱列表，或 {標籤: 規則集名稱 / dict}。
+    decode=False 時不解碼字串，回傳 apply_rules 的整數陣列 (只做比較時最省)。
+    """
+    if not isinstance(rulesets, dict):
+        rulesets = {name: name for name in rulesets}
+    resolved = {label: resolve_ruleset(r) for label, r in rulesets.items()}
+
+    start_d = np.datetime64(start_str, "D")
+    all_dates = np.arange(start_d - 1, start_d + days + 1)
+    cache = {}
+    if not decode:
+        return {label: apply_rules(rules, all_dates, *_samples(all_dates, tz_name, rules, cache))
+                for label, rules in resolved.items()}
+
+    dates = all_dates[1:-1].astype(object)
+    n = len(_SLOTS)
+    shared = {
+        "日期": np.repeat(dates, n),
+        "農曆": np.repeat(np.array(lunar_strings(dates), dtype=object), n),
+        "時段": np.tile(ganzhi.SLOT_NAMES, days),
+        "時間": np.tile(ganzhi.SLOT_PERIODS, days),
+    }
+    out = {}
+    for label, rules in resolved.items():
+        ints = apply_rules(rules, all_dates, *_samples(all_dates, tz_name, rules, cache))
+        with stage("frame"):
+            out[label] = pd.DataFrame(_decode(shared, ints))
+    return out
+
+def compare_rulesets(frames, base=None):
+    """各規則集與 base (預設為第一個) 逐欄比較，回傳每欄不同的列數 (列 = 規則集，欄 = 欄位)"""
+    labels = list(frames)
+    base = base or labels[0]
+    ref = frames[base]
+    cols = [c for c in ref.columns if c not in ("日期", "農曆", "時段", "時間")]
+    rows = {label: {c: int((frames[label][c].values != ref[c].values).sum()) for c in cols}
+            for label in labels if label != base}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=cols)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一次執行多個規則集並逐欄比較差異")
+    parser.add_argument("--start", default="1976-01-01")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tz", default="Asia/Hong_Kong")
+    parser.add_argument("--rulesets", nargs="+", default=list(RULESETS), choices=list(RULESETS))
+    parser.add_argument("--out", help="另存各規則集與差異摘要為 XLSX")
+    args = parser.parse_args()
+
+    frames = run_rulesets(args.start, args.days, args.tz, args.rulesets)
+    diff = compare_rulesets(frames)
+    print(f"與 {args.rulesets[0]} 不同的列數 (共 {len(frames[args.rulesets[0]])} 列)：")
+    print(diff.loc[:, (diff != 0).any()].to_string())
+    if args.out:
+        with pd.ExcelWriter(args.out) as xw:
+            diff.to_excel(xw, sheet_name="差異摘要")
+            for label, df in frames.items():
+                df.to_excel(xw, sheet_name=label, index=False)
+        print(f"✅ 已寫入 {args.out}")
@@ -0,0 +1,161 @@
+import argparse
+import json
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytz
+
+from lunar_engine import get_lunar_table
+from pillars import LATE_RAT_POLICIES, find_pillars, get_zone_days, pillars_at, pillars_range
+from solar_terms import get_term_table
+
+# --- 本機 HTTP 曆法服務 ---
+# 啟動時載入交節表、朔望月表並預建各時區的每日數據，之後每個請求只做查表。
+# 回傳欄位與 main3.1 run_final_calendar 的每一列相同 (JSON，日期為 ISO 字串)。
+#
+#   GET  /health
+#   GET  /pillars?t=2025-03-05T23:10&tz=Asia/Hong_Kong&late_rat=split
+#   GET  /range?start=2025-01-01&days=7&tz=Europe/London
+#   GET  /search?year=甲辰&month=丙寅&day=甲子&hour=甲子&tz=Asia/Hong_Kong&late_rat=split,next_day
+#        反查四柱：回傳所有符合的時段 (late_rat 省略時列出全部規則)
+#   POST /batch   {"tz": "...", "late_rat": "split", "instants": ["2025-03-05T23:10", ...]}
+#                 instants 的每一項也可以是 {"t": "...", "tz": "..."}
+# 時區只限啟動時載入的 (--tz)，其他時區回傳 400。
+
+DEFAULT_TZ = "Asia/Hong_Kong"
+MAX_RANGE_DAYS = 3660
+MAX_BATCH = 10000
+
+def _json_default(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    raise TypeError(f"無法序列化 {type(v).__name__}")
+
+def _policy(value):
+    value = value or "split"
+    if value not in LATE_RAT_POLICIES:
+        raise ValueError(f"late_rat 須為 {', '.join(LATE_RAT_POLICIES)} 之一")
+    return value
+
+def _zone(tz, zones):
+    """只接受服務啟動時載入的時區 (每個時區的每日數據涵蓋整段範圍，不隨請求無限增加)"""
+    if zones is not None and tz not in zones:
+        raise ValueError(f"時區 {tz} 未載入 (可用: {', '.join(sorted(zones))})")
+    return tz
+
+def query_single(params, zones=None):
+    tz = _zone(params.get("tz", DEFAULT_TZ), zones)
+    if "t" not in params:
+        raise ValueError("缺少參數 t")
+    return pillars_at(datetime.fromisoformat(params["t"]), tz, _policy(params.get("late_rat")))
+
+def query_range(params, zones=None):
+    tz = _zone(params.get("tz", DEFAULT_TZ), zones)
+    days = int(params.get("days", 1))
+    if not 0 < days <= MAX_RANGE_DAYS:
+        raise ValueError(f"days 須介於 1 ~ {MAX_RANGE_DAYS}")
+    return pillars_range(date.fromisoformat(params["start"]), days, tz, _policy(params.get("late_rat")))
+
+def query_search(params, zones=None):
+    tz = _zone(params.get("tz", DEFAULT_TZ), zones)
+    policies = [_policy(p) for p in params["late_rat"].split(",")] if params.get("late_rat") else LATE_RAT_POLICIES
+    return find_pillars(params["year"], params["month"], params["day"], params["hour"], tz, policies)
+
+def query_batch(body, zones=None):
+    if not isinstance(body, dict):
+        raise ValueError("請求內容須為 JSON 物件")
+    tz = _zone(body.get("tz", DEFAULT_TZ), zones)
+    policy = _policy(body.get("late_rat"))
+    instants = body.get("instants", [])
+    if not isinstance(instants, list):
+        raise ValueError("instants 須為列表")
+    if len(instants) > MAX_BATCH:
+        raise ValueError(f"每批最多 {MAX_BATCH} 個時刻")
+    rows = []
+    for item in instants:
+        if isinstance(item, dict):
+            rows.append(pillars_at(datetime.fromisoformat(item["t"]), _zone(item.get("tz", tz), zones), policy))
+        else:
+            rows.append(pillars_at(datetime.fromisoformat(item), tz, policy))
+    return rows
+
+class CalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # 標頭與內容分開送出時，避免 Nagle + delayed ACK 的 40ms 延遲
+    server_version = "BaseCCalendar/1.0"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, fn, arg):
+        try:
+            self._send(200, fn(arg, self.server.zones))
+        except pytz.UnknownTimeZoneError as e:
+            self._send(400, {"error": f"未知時區 {e}"})
+        except KeyError as e:
+            self._send(400, {"error": f"缺少欄位 {e}"})
+        except (ValueError, TypeError, OverflowError) as e:  # OverflowError：接近 datetime 上下限的時刻
+            self._send(400, {"error": str(e)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/health":
+            self._send(200, {"status": "ok", "zones": sorted(self.server.zones)})
+        elif url.path == "/pillars":
+            self._handle(query_single, params)
+        elif url.path == "/range":
+            self._handle(query_range, params)
+        elif url.path == "/search":
+            self._handle(query_search, params)
+        else:
+            self._send(404, {"error": f"未知路徑 {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/batch":
+            self._send(404, {"error": f"未知路徑 {url.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "請求內容不是有效的 JSON"})
+            return
+        self._handle(query_batch, body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=8765, zones=(DEFAULT_TZ, "Europe/London"), quiet=True):
+    """建立服務並預先載入交節表、朔望月表與各時區的每日數據"""
+    get_term_table()
+    get_lunar_table()
+    for tz in zones:
+        get_zone_days(tz)
+    server = ThreadingHTTPServer((host, port), CalendarHandler)
+    server.daemon_threads = True
+    server.zones = set(zones)
+    server.quiet = quiet
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本機 HTTP 曆法服務")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tz", nargs="+", default=[DEFAULT_TZ, "Europe/London"], help="啟動時預先載入的時區 (其他時區的請求回傳 400)")
+    parser.add_argument("--verbose", action="store_true", help="記錄每個請求")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.tz, quiet=not args.verbose)
+    print(f"✅ 服務已啟動: http://{args.host}:{args.port} (時區: {', '.join(args.tz)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+from datetime import timezone
+
+import numpy as np
+
+# --- 太陽黃經 Chebyshev 模型 (不需 skyfield / 星曆的快速路徑) ---
+# 產生步驟 (需 skyfield + de421.bsp)：以每年一段的 Chebyshev 多項式擬合太陽黃經，存成小型資料檔。
+# 執行時只需 NumPy：UTC -> TT (資料檔內附 skyfield 的 TT-UTC 表) -> 所屬年段 -> Clenshaw 求值。
+#
+# 兩種黃經各擬合一組係數：
+#   j2000    : J2000 黃道幾何黃經，與 get_solar_lon / 交節表相同
+#   apparent : 真黃道與真春分點 (of date) 視黃經，與農曆中氣相同
+# 誤差上限 (verify_solar_cheb.py 全段驗證)：黃經 < 0.02″；太陽每秒約移動 0.041″，即交節時刻 < 0.5 秒。
+# 農曆朔望月表需要月球位置 (無法以太陽黃經模型取代)，因此產生時一併以星曆建表、存入同一資料檔。
+
+CHEB_FILE = os.environ.get("BCCAL_SOLAR_CHEB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "solar_cheb.npz"))
+KINDS = ("j2000", "apparent")
+DEGREE = 144  # 每年一段；月週期項 (地月質心、章動短週期) 需要較高階數
+ERROR_BOUND_ARCSEC = 0.02
+UNIX_EPOCH_JD = 2440587.5
+LUNAR_ARRAYS = ("month_start", "month_num", "is_leap")
+
+def _utc64(utc_instants):
+    """aware datetime 列表或 datetime64 陣列 -> UTC datetime64[ns]"""
+    arr = np.asarray(utc_instants)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[ns]")
+    return np.array([dt.astimezone(timezone.utc).replace(tzinfo=None) for dt in utc_instants], dtype="datetime64[ns]")
+
+class SolarCheb:
+    """逐年 Chebyshev 係數 + TT-UTC 表；longitudes() 只用 NumPy"""
+
+    def __init__(self, bounds, coef, leap_days, leap_offsets, meta, lunar=None):
+        self.bounds = np.asarray(bounds, dtype=np.float64)                 # 各段邊界 (TT 秒，自 1970-01-01 起)
+        self.coef_t = {k: np.ascontiguousarray(np.asarray(coef[k]).T) for k in KINDS}  # (階數+1, 段數)
+        self.leap_days = np.asarray(leap_days, dtype="datetime64[D]")       # TT-UTC 改變的 UTC 日期
+        self.leap_offsets = np.asarray(leap_offsets, dtype=np.float64)     # 該日起的 TT-UTC (秒)
+        self.meta = meta
+        self.lunar = lunar  # 星曆建好的朔望月表陣列 (lunar_engine.build_lunar_table 的格式)；舊資料檔沒有
+
+    def tt_seconds(self, utc_instants):
+        """UTC -> TT 秒 (自 1970-01-01 起)；閏秒規則與 skyfield 相同 (1972 年以前固定 TAI-UTC = 10 秒)"""
+        t = _utc64(utc_instants)
+        idx = np.searchsorted(self.leap_days, t.astype("datetime64[D]"), side="right") - 1
+        return t.view(np.int64) / 1e9 + self.leap_offsets[np.maximum(idx, 0)]
+
+    def longitudes(self, utc_instants, kind="j2000"):
+        """批次計算太陽黃經 (度，0 ~ 360)"""
+        s = self.tt_seconds(utc_instants)
+        seg = np.searchsorted(self.bounds, s, side="right") - 1
+        if len(s) and (seg.min() < 0 or seg.max() >= len(self.bounds) - 1):
+            raise ValueError(f"時刻超出 Chebyshev 模型範圍 {self.meta['segments'][0]} ~ {self.meta['segments'][-1]}")
+        a, b = self.bounds[seg], self.bounds[seg + 1]
+        x = (2 * s - a - b) / (b - a)
+        return _clenshaw(self.coef_t[kind], seg, x) % 360
+
+def _clenshaw(coef_t, seg, x):
+    """各點以所屬年段的係數求 Chebyshev 級數值 (逐階取係數，記憶體只需 O(點數))"""
+    b1 = np.zeros_like(x)
+    b2 = np.zeros_like(x)
+    x2 = 2 * x
+    for k in range(len(coef_t) - 1, 0, -1):
+        b1, b2 = coef_t[k][seg] + x2 * b1 - b2, b1
+    return coef_t[0][seg] + x * b1 - b2
+
+def load_solar_cheb(path=CHEB_FILE):
+    with np.load(path, allow_pickle=False) as z:
+        coef = {k: z[f"coef_{k}"] for k in KINDS}
+        lunar = {k: z["lunar_" + k] for k in LUNAR_ARRAYS} if "lunar_month_start" in z.files else None
+        return SolarCheb(z["bounds"], coef, z["leap_days"], z["leap_offsets"], json.loads(str(z["meta"])), lunar)
+
+_MODEL = {}
+
+def get_solar_cheb(path=CHEB_FILE):
+    """取得 (並在本行程內重用) Chebyshev 模型"""
+    if path not in _MODEL:
+        _MODEL[path] = load_solar_cheb(path)
+    return _MODEL[path]
+
+# --- 產生步驟 (需 skyfield) ---
+
+def _segment_edges(span):
+    """各段起點的 UTC 日期：span 首年前一年 10 月 1 日、span 內 (及後一年) 每年 1 月 1 日，末端為 span 後兩年 1 月 1 日
+
+    涵蓋交節表 (前一年 12 月 ~ 後一年 2 月) 與朔望月表 (前一年 11 月 ~ 後一年 3 月) 的取樣範圍。
+    """
+    years = np.arange(span[0], span[1] + 3)
+    return np.r_[np.datetime64(f"{span[0] - 1}-10-01", "D"), years.astype(str).astype("datetime64[D]")]
+
+def _tt_minus_utc(days):
+    """skyfield 在各 UTC 日期 0h 的 TT-UTC (秒)"""
+    from astro import to_time_array
+    t = to_time_array(days.astype("datetime64[ns]"))
+    return np.round((t.tt - (days.astype(np.int64) + UNIX_EPOCH_JD)) * 86400, 6)
+
+def _skyfield_longitudes(tt_seconds, kind):
+    from astro import get_engine
+    e = get_engine()
+    t = e["ts"].tt_jd(UNIX_EPOCH_JD, tt_seconds / 86400)
+    obs = e["earth"].at(t).observe(e["sun"])
+    if kind == "j2000":
+        _, lon, _ = obs.ecliptic_latlon()
+    else:
+        _, lon, _ = obs.apparent().frame_latlon(e["ecliptic_frame"])
+    return lon.degrees
+
+def fit_solar_cheb(span, degree=DEGREE):
+    """以星曆擬合 span 範圍 (前後各留一段) 的逐年係數，回傳可直接存檔的陣列 dict"""
+    from numpy.polynomial import chebyshev as C
+
+    from ephem_cache import kernel_fingerprint
+
+    edges = _segment_edges(span)
+    all_days = np.arange(edges[0], edges[-1] + 1)
+    off = _tt_minus_utc(all_days)
+    change = np.flatnonzero(np.r_[True, off[1:] != off[:-1]])
+    leap_days, leap_offsets = all_days[change], off[change]
+
+    bounds = edges.astype("datetime64[s]").astype(np.int64) + off[(edges - edges[0]).astype(np.int64)]
+    n = 2 * (degree + 1)  # 最小平方擬合，取樣點數為階數的兩倍
+    x = np.cos(np.pi * (np.arange(n) + 0.5) / n)
+    a, b = bounds[:-1, None], bounds[1:, None]
+    s = ((a + b) / 2 + (b - a) / 2 * x).ravel()
+
+    arrays = {"bounds": bounds, "leap_days": leap_days.astype(np.int64), "leap_offsets": leap_offsets}
+    for kind in KINDS:
+        lon = _skyfield_longitudes(s, kind).reshape(len(edges) - 1, n)
+        lon = np.degrees(np.unwrap(np.radians(lon), axis=1))  # 段內連續，不在 360 -> 0 處折返
+        arrays[f"coef_{kind}"] = C.chebfit(x, lon.T, degree).T
+    meta = {
+        "span": list(span), "degree": degree, "kernel": kernel_fingerprint(),
+        "segments": [str(edges[0]), str(edges[-1])], "error_bound_arcsec": ERROR_BOUND_ARCSEC,
+    }
+    # 朔望月表 (以星曆計算，與有星曆時的 build_lunar_table 結果相同)
+    from lunar_engine import build_month_table
+    starts, nums, leaps = build_month_table(*span)
+    arrays.update(lunar_month_start=starts.astype(np.int64), lunar_month_num=nums, lunar_is_leap=leaps)
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+def save_solar_cheb(path, arrays):
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    from solar_terms import TERM_SPAN
+
+    parser = argparse.ArgumentParser(description="以星曆擬合太陽黃經的逐年 Chebyshev 係數並存檔")
+    parser.add_argument("--span", type=int, nargs=2, default=list(TERM_SPAN), metavar=("START", "END"))
+    parser.add_argument("--degree", type=int, default=DEGREE)
+    parser.add_argument("--out", default=CHEB_FILE)
+    args = parser.parse_args()
+
+    arrays = fit_solar_cheb(tuple(args.span), args.degree)
+    save_solar_cheb(args.out, arrays)
+    n_seg, n_coef = arrays["coef_j2000"].shape
+    print(f"✅ 已寫入 {args.out}：{n_seg} 段 × {n_coef} 係數 × {len(KINDS)} 種黃經 ({os.path.getsize(args.out) / 1024:.0f} KB)")
@@ -0,0 +1,173 @@
+from datetime import datetime, time
+
+import numpy as np
+import pytz
+
+from astro import solar_longitudes
+from ephem_cache import load_cached, save_cached
+from profiling import stage
+
+# --- 節氣交節時刻表 (精確 UTC 時刻，查表取代逐日取樣) ---
+
+# 24 節氣名稱 (索引 = 黃經 // 15，春分 = 0)
+SOLAR_TERMS = ["春分", "清明", "穀雨", "立夏", "小滿", "芒種", "夏至", "小暑", "大暑", "立秋", "處暑", "白露", "秋分", "寒露", "霜降", "立冬", "小雪", "大雪", "冬至", "小寒", "大寒", "立春", "雨水", "驚蟄"]
+LICHUN = 21  # 立春 (315 度)
+
+# de421.bsp 覆蓋 1899-07 ~ 2053-10；需要 2100 請換用 de440s 等星曆
+TERM_SPAN = (1900, 2050)
+
+# 分類結果的欄位 (每個時刻一筆)
+TERM_DTYPE = np.dtype([("term_idx", np.int8), ("logic_year", np.int16), ("zhi_yue", np.int8), ("is_yang", np.bool_)])
+
+_NS_PER_DAY = 86400 * 10**9
+
+def to_utc64(instants):
+    """將 aware datetime 列表 (或 datetime64 陣列) 轉成 UTC datetime64[ns]"""
+    arr = np.asarray(instants)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[ns]")
+    return np.array([dt.astimezone(pytz.utc).replace(tzinfo=None) for dt in instants], dtype="datetime64[ns]")
+
+def local_times_utc(dates, tz_name, hour=12, minute=0, is_dst=False):
+    """每日當地 hour:minute -> (UTC datetime64[ns], 時區名稱陣列)
+
+    以 pandas 向量化換算 (結果與 pytz localize 相同，含 is_dst 的歧義處理)；
+    時區名稱 (如 GMT / BST) 只在 UTC 偏移改變的日子查詢一次。
+    """
+    import pandas as pd  # 只有時區換算需要 pandas，延後載入
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    local = pd.DatetimeIndex(dates.astype("datetime64[ns]") + np.timedelta64(hour * 60 + minute, "m"))
+    aware = local.tz_localize(tz_name, ambiguous=np.full(len(local), is_dst), nonexistent="shift_forward")
+    utc = aware.tz_convert("UTC").tz_localize(None).values
+    offset = local.values - utc
+    starts = np.flatnonzero(np.r_[True, offset[1:] != offset[:-1]]) if len(dates) else np.array([], dtype=int)
+    tz = pytz.timezone(tz_name)
+    names = [tz.localize(datetime.combine(d, time(hour, minute)), is_dst=is_dst).tzname() for d in dates[starts].astype(object)]
+    labels = np.repeat(np.array(names, dtype=object), np.diff(np.r_[starts, len(dates)]))
+    return utc, labels
+
+def slot_bounds_utc(dates, tz_name, start_hours):
+    """每日各時段 [起點, 終點) 的 UTC 時刻 (日數 x 時段數)；起點為當地 start_hours 時，最後一段止於翌日 0 時
+
+    夏令時間結束時重複的鐘點取第一次出現 (牆上時鐘第一次走到該鐘點時即進入該時段)，
+    不存在的鐘點則順延到跳過之後。
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    bound = lambda d, h: local_times_utc(d, tz_name, int(h), is_dst=True)[0]
+    starts = np.stack([bound(dates, h) for h in start_hours], axis=1)
+    ends = np.concatenate([starts[:, 1:], bound(dates + 1, 0)[:, None]], axis=1)
+    return starts, ends
+
+def daily_longitudes(start_year, end_year, lon_fn=solar_longitudes):
+    """[start_year-1 年 12 月, end_year+1 年 2 月] 每日 0h UTC 的太陽黃經，回傳 (首日, 黃經陣列)"""
+    t0 = np.datetime64(f"{start_year - 1}-12-01", "D")
+    t1 = np.datetime64(f"{end_year + 1}-02-01", "D")
+    return t0, lon_fn(np.arange(t0, t1 + 1).astype("datetime64[ns]"))
+
+def find_term_instants(start_year, end_year, tol_seconds=1e-3, daily=None, lon_fn=solar_longitudes):
+    """以求根法找出 span 內每一次交節 (黃經 = 15k 度) 的 UTC 時刻
+
+    先以每日取樣 (daily_longitudes) 找出跨越區間，再對所有交節同時做牛頓迭代
+    (每次迭代只做一次批次黃經計算)。預設黃經定義與 get_solar_lon 相同，
+    農曆中氣則傳入 lon_fn=apparent_solar_longitudes。
+    回傳 (instants: datetime64[ns], term_k: int8)。
+    """
+    day0, lon = daily if daily is not None else daily_longitudes(start_year, end_year, lon_fn)
+    days = (day0 + np.arange(len(lon))).astype("datetime64[ns]")
+
+    # 找出每日之間的跨越
+    k = (lon // 15).astype(int)
+    cross = np.nonzero(k[1:] != k[:-1])[0]
+    term_k = k[cross + 1]
+    target = term_k * 15.0
+
+    # 牛頓迭代：局部速率 (度/日) 由前後兩日黃經估計，約 0.95 ~ 1.02
+    rate = (lon[cross + 1] - lon[cross]) % 360
+    t = days[cross] + ((((target - lon[cross]) % 360) / rate) * _NS_PER_DAY).astype("timedelta64[ns]")
+    for _ in range(8):
+        err = (lon_fn(t) - target + 180) % 360 - 180
+        step = (err / rate * _NS_PER_DAY).astype("timedelta64[ns]")
+        t = t - step
+        if np.abs(step / np.timedelta64(1, "s")).max() < tol_seconds:
+            break
+    return t, term_k.astype(np.int8)
+
+class TermTable:
+    """交節時刻表：任一時刻的節氣、術數年、支月、陰陽遁皆以 searchsorted 查表求得"""
+
+    def __init__(self, instants, term_k, span, daily=None):
+        self.instants = np.asarray(instants, dtype="datetime64[ns]")
+        self.term_k = np.asarray(term_k, dtype=np.int8)
+        self.span = tuple(span)
+        self.daily = daily  # (首日 datetime64[D], 每日 0h UTC 黃經)
+        # 小寒、大寒落在一月，屬於上一個術數年；其餘節氣屬交節當年
+        years = self.instants.astype("datetime64[Y]").astype(int) + 1970
+        self.logic_year = (years - np.isin(self.term_k, (19, 20))).astype(np.int16)
+
+    def locate(self, instants):
+        """回傳每個時刻之前最近一次交節在表中的位置"""
+        t = to_utc64(instants)
+        pos = np.searchsorted(self.instants, t, side="right") - 1
+        if len(pos) and (pos.min() < 0 or t.max() >= self.instants[-1]):
+            raise ValueError(f"時刻超出節氣表範圍 {self.span[0]}-{self.span[1]}")
+        return pos
+
+    def classify(self, instants):
+        """批次分類：回傳 TERM_DTYPE 結構陣列 (term_idx, logic_year, zhi_yue, is_yang)"""
+        with stage("terms"):
+            pos = self.locate(instants)
+            k = self.term_k[pos]
+            out = np.empty(len(pos), dtype=TERM_DTYPE)
+            out["term_idx"] = k
+            out["logic_year"] = self.logic_year[pos]
+            out["zhi_yue"] = (k - LICHUN) % 24 // 2 + 1  # 1=寅 ... 12=丑
+            out["is_yang"] = ~((k >= 6) & (k < 18))     # 冬至 ~ 夏至 為陽遁
+            return out
+
+    def transitions(self, starts, ends):
+        """區間 (starts, ends] 內的交節：回傳 (起點分類, 終點分類, 交節時刻 (區間內無交節為 NaT))
+
+        交節正好落在起點時起點分類已是新節氣，歸入前一個區間；區間須短於一個節氣 (約 14 日)。
+        """
+        pre, post = self.classify(starts), self.classify(ends)
+        instants = np.where(pre["term_idx"] != post["term_idx"], self.instants[self.locate(ends)], np.datetime64("NaT"))
+        return pre, post, instants
+
+    def term_start(self, instants):
+        """回傳每個時刻所屬節氣的交節時刻 (UTC datetime64[ns])"""
+        return self.instants[self.locate(instants)]
+
+    def daily_longitude(self, dates):
+        """查詢每日 0h UTC 的太陽黃經 (取自建表時的每日取樣，不做星曆計算)"""
+        day0, lon = self.daily
+        idx = (np.asarray(dates, dtype="datetime64[D]") - day0).astype(np.int64)
+        if len(idx) and (idx.min() < 0 or idx.max() >= len(lon)):
+            raise ValueError(f"日期超出節氣表範圍 {self.span[0]}-{self.span[1]}")
+        return lon[idx]
+
+_TABLES = {}
+
+def build_term_table(span=TERM_SPAN, use_cache=True):
+    """建立交節時刻表；有效的磁碟快取存在時直接映射，不載入星曆"""
+    span = tuple(span)
+    arrays = load_cached("terms", span) if use_cache else None
+    if arrays is None:
+        day0, lon = daily_longitudes(*span)
+        instants, term_k = find_term_instants(*span, daily=(day0, lon))
+        arrays = {
+            "instants": instants.view(np.int64), "term_k": term_k,
+            "day0": np.array([day0.astype(np.int64)]), "daily_lon": lon,
+        }
+        if use_cache:
+            save_cached("terms", span, arrays)
+    daily = (np.datetime64(int(arrays["day0"][0]), "D"), arrays["daily_lon"])
+    return TermTable(arrays["instants"].view("datetime64[ns]"), arrays["term_k"], span, daily)
+
+def get_term_table(span=TERM_SPAN):
+    """取得 (並在本行程內重用) 指定年份範圍的交節時刻表"""
+    span = tuple(span)
+    if span not in _TABLES:
+        with stage("terms"):
+            _TABLES[span] = build_term_table(span)
+    return _TABLES[span]
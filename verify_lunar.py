@@ -0,0 +1,39 @@
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+from lunar_python import Solar  # 需安裝: pip install lunar_python
+
+from lunar_engine import get_lunar_table
+from solar_terms import TERM_SPAN
+
+# --- 驗證朔望月表與 lunar_python 逐日一致 ---
+# de421.bsp 只覆蓋到 2053 年；驗證 1900-2100 請以 BCCAL_EPHEMERIS 指定 de440s.bsp 並傳入 --span 1900 2100
+
+def reference_lookup(dates):
+    """lunar_python 的 (月序, 是否閏月, 日)"""
+    month, leap, day = [], [], []
+    for d in dates:
+        lunar = Solar.fromYmd(d.year, d.month, d.day).getLunar()
+        month.append(abs(lunar.getMonth()))
+        leap.append(lunar.getMonth() < 0)
+        day.append(lunar.getDay())
+    return np.array(month), np.array(leap), np.array(day)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐日比對朔望月表與 lunar_python")
+    parser.add_argument("--span", type=int, nargs=2, default=list(TERM_SPAN), metavar=("START", "END"))
+    parser.add_argument("--show", type=int, default=20, help="最多列出幾筆不一致")
+    args = parser.parse_args()
+
+    table = get_lunar_table(tuple(args.span))
+    start, end = date(args.span[0], 1, 1), date(args.span[1], 12, 1)
+    dates = [start + timedelta(days=i) for i in range((end - start).days)]
+
+    month, leap, day = table.lookup(dates)
+    ref_month, ref_leap, ref_day = reference_lookup(dates)
+    bad = np.nonzero((month != ref_month) | (leap != ref_leap) | (day != ref_day))[0]
+
+    print(f"比對 {len(dates)} 日 ({start} ~ {end})：{len(bad)} 日不一致")
+    for i in bad[:args.show]:
+        print(f"  {dates[i]}  表: {'闰' if leap[i] else ''}{month[i]}月{day[i]}  lunar_python: {'闰' if ref_leap[i] else ''}{ref_month[i]}月{ref_day[i]}")
@@ -0,0 +1,128 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+import astro
+from parallel import load_script
+from solar_cheb import ERROR_BOUND_ARCSEC, get_solar_cheb
+from solar_terms import TERM_SPAN, find_term_instants
+
+# --- 驗證 Chebyshev 太陽黃經模型與星曆 (get_solar_lon) 的誤差 ---
+# 1. 全段等間隔取樣的黃經誤差 (j2000 對 get_solar_lon、apparent 對農曆用的視黃經)
+# 2. 全段每一次交節時刻的誤差 (秒)
+# 3. 隨機時刻直接呼叫 main3.1 的 get_solar_lon 抽查
+# 4. 沒有星曆檔且封鎖 skyfield 時 (子行程，auto -> cheb) main3.1 預設欄位 (含農曆) 的輸出須與星曆版相同
+
+astro.SOLAR_BACKEND = "skyfield"  # 參考值一律以星曆計算
+
+REFERENCE = {"j2000": astro.solar_longitudes, "apparent": astro.apparent_solar_longitudes}
+
+# 子行程：星曆指向不存在的路徑，並封鎖 skyfield (import 即失敗，版本查詢視為未安裝)，
+# 執行 main3.1 的預設欄位並存成 pickle
+_NO_KERNEL_RUN = """
+import importlib.metadata, sys
+sys.modules["skyfield"] = None
+_version = importlib.metadata.version
+def _blocked_version(name):
+    if name == "skyfield":
+        raise importlib.metadata.PackageNotFoundError(name)
+    return _version(name)
+importlib.metadata.version = _blocked_version
+from parallel import load_script
+frames = load_script("main3.1").run_final_calendar({start!r}, {days}, {zones!r})
+import pandas as pd
+pd.to_pickle(frames, {out!r})
+"""
+
+def no_kernel_calendar(start, days, zones):
+    """在沒有星曆檔的子行程中產生日曆 (回傳 {時區: DataFrame})"""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "frames.pkl")
+        env = {**os.environ, "BCCAL_EPHEMERIS": os.path.join(tmp, "missing.bsp"), "BCCAL_SOLAR_BACKEND": "auto"}
+        code = _NO_KERNEL_RUN.format(start=start, days=days, zones=list(zones), out=out)
+        subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), env=env, check=True)
+        return pd.read_pickle(out)
+
+def arcsec_diff(a, b):
+    return ((a - b + 180) % 360 - 180) * 3600
+
+def grid_errors(model, kind, span, step_hours):
+    """逐年取樣，回傳 (各年最大誤差 ″, 全段 RMS ″, 取樣點數)"""
+    worst, sq, n = {}, 0.0, 0
+    for year in range(span[0], span[1] + 1):
+        t = np.arange(np.datetime64(f"{year}-01-01T00", "h"), np.datetime64(f"{year + 1}-01-01T00", "h"), step_hours)
+        t = t.astype("datetime64[ns]")
+        err = arcsec_diff(model.longitudes(t, kind), REFERENCE[kind](t))
+        worst[year] = np.abs(err).max()
+        sq += (err ** 2).sum()
+        n += len(t)
+    return worst, np.sqrt(sq / n), n
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比對 Chebyshev 太陽黃經模型與星曆 (get_solar_lon)")
+    parser.add_argument("--span", type=int, nargs=2, default=list(TERM_SPAN), metavar=("START", "END"))
+    parser.add_argument("--step-hours", type=int, default=6, help="黃經取樣間隔 (小時)")
+    parser.add_argument("--samples", type=int, default=2000, help="直接呼叫 get_solar_lon 抽查的時刻數")
+    parser.add_argument("--calendar-start", default="1976-01-01", help="無星曆日曆比對的起始日")
+    parser.add_argument("--calendar-days", type=int, default=3650, help="無星曆日曆比對的天數")
+    args = parser.parse_args()
+    span = tuple(args.span)
+
+    model = get_solar_cheb()
+    print(f"模型: 每段 {model.meta['degree']} 階，範圍 {model.meta['segments'][0]} ~ {model.meta['segments'][1]}，"
+          f"誤差上限 {ERROR_BOUND_ARCSEC}″ (約 {ERROR_BOUND_ARCSEC / 0.041:.2f} 秒)")
+    ok = True
+
+    for kind in ("j2000", "apparent"):
+        worst, rms, n = grid_errors(model, kind, span, args.step_hours)
+        y_max = max(worst, key=worst.get)
+        ok &= worst[y_max] < ERROR_BOUND_ARCSEC
+        print(f"[{kind:>8}] 黃經 {n} 點: 最大 {worst[y_max]:.5f}″ ({y_max} 年), RMS {rms:.5f}″")
+
+        ref_t, ref_k = find_term_instants(*span, lon_fn=REFERENCE[kind])
+        cheb_t, cheb_k = find_term_instants(*span, lon_fn=lambda t: model.longitudes(t, kind))
+        if len(ref_t) != len(cheb_t) or (ref_k != cheb_k).any():
+            ok = False
+            print(f"[{kind:>8}] 交節數不一致: 星曆 {len(ref_t)}，模型 {len(cheb_t)}")
+            continue
+        dt = np.abs((cheb_t - ref_t) / np.timedelta64(1, "s"))
+        ok &= dt.max() < 1.0
+        print(f"[{kind:>8}] 交節 {len(dt)} 次: 最大 {dt.max():.3f} 秒 ({ref_t[dt.argmax()].astype('datetime64[s]')}), "
+              f"平均 {dt.mean():.3f} 秒")
+
+    # 直接以腳本的 get_solar_lon 抽查 (逐點呼叫，與產生日曆時相同的路徑)
+    get_solar_lon = load_script("main3.1").get_solar_lon
+    random.seed(0)
+    base = datetime(span[0], 1, 1, tzinfo=pytz.utc)
+    instants = [base + timedelta(seconds=random.randrange(0, (span[1] - span[0] + 1) * 365 * 86400)) for _ in range(args.samples)]
+    t0 = time.perf_counter()
+    ref = np.array([get_solar_lon(dt) for dt in instants])
+    t_ref = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cheb = model.longitudes(instants, "j2000")
+    t_cheb = time.perf_counter() - t0
+    err = np.abs(arcsec_diff(cheb, ref))
+    ok &= err.max() < ERROR_BOUND_ARCSEC
+    print(f"get_solar_lon 抽查 {len(instants)} 點: 最大 {err.max():.5f}″；"
+          f"逐點星曆 {t_ref * 1000:.0f} ms，模型批次 {t_cheb * 1000:.1f} ms")
+
+    # 沒有星曆檔時的完整路徑 (交節表以模型建表、農曆用資料檔內附的朔望月表)
+    zones = ["Asia/Hong_Kong", "Europe/London"]
+    t0 = time.perf_counter()
+    cheb_frames = no_kernel_calendar(args.calendar_start, args.calendar_days, zones)
+    t_cheb = time.perf_counter() - t0
+    ref_frames = load_script("main3.1").run_final_calendar(args.calendar_start, args.calendar_days, zones)
+    for tz in zones:
+        diff = (cheb_frames[tz] != ref_frames[tz]).any(axis=1)
+        ok &= not diff.any()
+        print(f"無星曆 main3.1 預設欄位 {tz}: {len(diff)} 列，{int(diff.sum())} 列與星曆版不同 (子行程 {t_cheb:.1f} 秒)")
+    print("✅ 全部在誤差上限內" if ok else "❌ 超出誤差上限")